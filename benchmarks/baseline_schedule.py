@@ -0,0 +1,100 @@
+"""The DataFrame schedule lookup that answered next departure queries before the departure index,
+and the string service matching that resolved its services before the precomputed service codes.
+
+Nothing in the package uses them any more: they are the baselines the benchmarks compare with.
+"""
+import datetime
+
+import numpy
+import pandas
+from synthetic_feed import data_parser
+
+from transit_schedule.const import _LOGGER
+from transit_schedule.departure_index import format_gtfs_time
+from transit_schedule.service_calendar import base_service_ids
+
+
+def service_ids_on(service_calendar, date: datetime.date) -> list[str]:
+    """List the service_ids running on a date."""
+    return service_calendar.service_ids[service_calendar.active_mask(date)].tolist()
+
+
+def get_service_ids(transit_data, date: datetime.date) -> list[str]:
+    """Retrieve the service_ids for a given date, handling exceptions in calendar_dates.txt."""
+    matching_service_ids = service_ids_on(transit_data.service_calendar, date)
+    if not matching_service_ids:
+        raise data_parser.NoServiceFoundError(f"No service found for date {date}")
+
+    return matching_service_ids
+
+
+def service_mask(index, service_ids) -> numpy.ndarray:
+    """Departure index mask over service codes (plus missing codes) for an exact service_id match."""
+    return numpy.append(numpy.isin(index.service_ids, list(service_ids)), False)
+
+
+def base_service_mask(index, service_ids) -> numpy.ndarray:
+    """Like service_mask, matching on the part before the first '-'."""
+    bases = base_service_ids([str(sid) for sid in service_ids])
+    return numpy.append(numpy.isin(base_service_ids(index.service_ids), bases), False)
+
+
+def string_service_mask(transit_data, stop_id: str, when: datetime.datetime) -> numpy.ndarray:
+    """Match the services of a day by their service_id strings on every query, falling back to the base ones."""
+    index = transit_data.departure_index
+    service_ids = get_service_ids(transit_data, when.date())
+    mask = service_mask(index, service_ids)
+    if not index.has_service(stop_id, mask):
+        mask = base_service_mask(index, service_ids)
+    return mask
+
+
+def get_today_schedule(transit_data, service_ids: list[str], stop_id: str) -> pandas.DataFrame:
+    """Get the schedule for a given list of service IDs and stop ID."""
+    try:
+        stop_times_for_stop = transit_data.stop_times.loc[[stop_id]]
+    except KeyError:
+        return pandas.DataFrame()
+
+    # Join the trips per query, ignoring the trip attributes denormalized onto stop_times at load
+    results = stop_times_for_stop.drop(columns=['route_id', 'service_id', 'trip_headsign'], errors='ignore')
+    results = results.merge(transit_data.trips, how='left', on='trip_id', validate='many_to_one')
+    # Try exact match first
+    final_results = results[results['service_id'].isin(service_ids)].copy()
+
+    # If no results, try fuzzy match (many agencies append extra info to service_id in trips.txt)
+    if final_results.empty and not results.empty:
+        base_service_ids = [str(sid).split('-')[0] for sid in service_ids]
+        final_results = results[results['service_id'].astype(str).str.split('-').str[0].isin(base_service_ids)].copy()
+
+    if 'arrival_time' not in final_results:
+        # Compact loading keeps only the parsed seconds
+        final_results['arrival_time'] = [format_gtfs_time(secs) for secs in final_results['arrival_secs']]
+
+    return final_results
+
+
+def calculate_arrival_datetimes(schedule, date):
+    """Calculate the arrival datetimes for the schedule."""
+
+    def calculate_arrival(row):
+        try:
+            time_str = row["arrival_time"]
+            h, m, s = map(int, time_str.split(':'))
+            # GTFS allows times like 25:30:00 for trips that start on one day
+            # and end on the next. h can be >= 24.
+            return datetime.datetime.combine(date, datetime.time.min) + datetime.timedelta(hours=h, minutes=m, seconds=s)
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error calculating arrival datetime for {row.get('arrival_time')}: {e}")
+            return None
+
+    schedule['arrival_datetime'] = schedule.apply(calculate_arrival, axis=1)
+    return schedule.dropna(subset=['arrival_datetime']).sort_values(by=['arrival_datetime'])
+
+
+def next_departure(transit_data, stop_id: str, when: datetime.datetime) -> pandas.Series:
+    """Select the stop rows, compute their arrival datetimes and keep the first one after when."""
+    service_ids = get_service_ids(transit_data, when.date())
+    schedule = get_today_schedule(transit_data, service_ids, stop_id)
+    schedule = calculate_arrival_datetimes(schedule, when.date())
+    return schedule[schedule['arrival_datetime'] > when].iloc[0]
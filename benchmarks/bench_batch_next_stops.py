@@ -0,0 +1,57 @@
+"""Measure a 50-stop refresh: one get_next_stop call per stop against one get_next_stops batch.
+
+This is what a multi-stop dashboard or a 50-stop STOPS_CONFIG costs on every refresh.
+
+Usage: python benchmarks/bench_batch_next_stops.py [--stops N] [--number N]
+"""
+import argparse
+import datetime
+import logging
+import os
+import tempfile
+import timeit
+
+from synthetic_feed import data_parser, parser_environment, write_feed
+
+
+def report(label, func, number, n_stops):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{label:<28} {seconds * 1e3:8.2f} ms/refresh {seconds * 1e6 / n_stops:8.1f} us/stop")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stops', type=int, default=50)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("transit-schedule").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_feed(os.path.join(data_dir, 'gtfs_bench.zip'))
+        with parser_environment(data_dir, 'gtfs_bench.zip'):
+            transit_data = data_parser.ParseTransitData()
+
+            # The busiest stops, half of them filtered on a route like a STOPS_CONFIG entry would
+            index = transit_data.departure_index
+            stop_ids = transit_data.stop_times.index.value_counts().index[:args.stops]
+            stop_requests = []
+            for n, stop_id in enumerate(stop_ids):
+                start, _ = index.stop_range(stop_id)
+                route_id = str(index.route_ids[index.route_codes[start]]) if n % 2 else None
+                stop_requests.append((stop_id, route_id, None))
+            when = datetime.datetime(2025, 9, 29, 17, 0, 0)
+
+            def one_by_one():
+                return [transit_data.get_next_stop(stop_id, when, target_route=route_id, target_direction=direction)
+                        for stop_id, route_id, direction in stop_requests]
+
+            assert all(a.equals(b) for a, b in zip(one_by_one(), transit_data.get_next_stops(stop_requests, when),
+                                                   strict=True))
+            print(f"{len(stop_requests)} stops")
+            report("get_next_stop per stop", one_by_one, args.number, len(stop_requests))
+            report("get_next_stops batch", lambda: transit_data.get_next_stops(stop_requests, when), args.number,
+                   len(stop_requests))
+
+
+if __name__ == '__main__':
+    main()
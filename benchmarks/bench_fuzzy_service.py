@@ -0,0 +1,52 @@
+"""Measure the fuzzy (base service_id) service matching on an RTL-style synthetic feed.
+
+In an RTL-style feed, trips.txt appends a suffix to the calendar.txt service_ids (SEM-B3 for
+SEM), so every lookup falls back to matching on the base service_id. Compares the string
+matching done per query with the base service codes precomputed at load.
+
+Usage: python benchmarks/bench_fuzzy_service.py [--number N]
+"""
+import argparse
+import datetime
+import logging
+import os
+import tempfile
+import timeit
+
+import baseline_schedule
+from synthetic_feed import data_parser, parser_environment, write_feed
+
+
+def report(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{label:<34} {seconds * 1e6:10.1f} us/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+    logging.getLogger("transit-schedule").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_feed(os.path.join(data_dir, 'gtfs_bench.zip'), rtl_style=True)
+        with parser_environment(data_dir, 'gtfs_bench.zip'):
+            transit_data = data_parser.ParseTransitData()
+
+            stop_id = transit_data.stop_times.index.value_counts().index[0]
+            when = datetime.datetime(2025, 9, 29, 17, 0, 0)
+            service_ids = baseline_schedule.get_service_ids(transit_data, when.date())
+            print(f"Stop {stop_id}, services {service_ids}, "
+                  f"{transit_data.departure_index.service_ids.size} service_ids in trips.txt")
+
+            report("service mask, string matching", lambda: baseline_schedule.string_service_mask(transit_data, stop_id, when),
+                   args.number)
+            report("service mask, precomputed", lambda: transit_data._get_service_mask(when.date(), stop_id),
+                   args.number)
+            report("schedule filter, baseline", lambda: baseline_schedule.get_today_schedule(transit_data, service_ids, stop_id),
+                   args.number // 10)
+            report("get_next_stop (end to end)", lambda: transit_data.get_next_stop(stop_id, when), args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Measure /transit-schedule/nextstop throughput of the Flask dev server against gunicorn.
+
+Each server runs in its own process on a synthetic feed, with the HTTP departure cache disabled
+so that every request goes through the engine. Concurrent clients request the busiest stops
+over fresh connections for a fixed time.
+
+Usage: python benchmarks/bench_http_throughput.py [--clients N] [--seconds N] [--workers N] [--threads N]
+"""
+import argparse
+import concurrent.futures
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from unittest.mock import patch
+
+import pandas
+from synthetic_feed import parser_environment, write_feed
+
+ZIP_NAME = 'gtfs_bench.zip'
+
+
+def serve(args):
+    """Run start_http_server on the feed of args.data_dir, configured like the HTTP_* settings would."""
+    import transit_schedule.http_server as http_server
+
+    logging.getLogger("transit-schedule").setLevel(logging.WARNING)
+    with parser_environment(args.data_dir, ZIP_NAME), \
+         patch.object(http_server, 'HTTP_SERVER', args.serve), \
+         patch.object(http_server, 'HTTP_PORT', args.port), \
+         patch.object(http_server, 'HTTP_WORKERS', args.workers), \
+         patch.object(http_server, 'HTTP_THREADS', args.threads), \
+         patch.object(http_server, 'HTTP_CACHE_SIZE', 0):
+        http_server.start_http_server()
+
+
+def busiest_stop_codes(data_dir, count):
+    with zipfile.ZipFile(os.path.join(data_dir, ZIP_NAME)) as zf, zf.open('stop_times.txt') as f:
+        stop_ids = pandas.read_csv(f, usecols=['stop_id'])['stop_id'].value_counts().index[:count]
+    # write_feed numbers stop codes from 50000
+    return [50000 + int(stop_id) for stop_id in stop_ids]
+
+
+def wait_ready(url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise TimeoutError(url)
+
+
+def load(base_url, stop_codes, clients, seconds):
+    """Request the stops round-robin from concurrent clients; return (requests/s, latencies, errors)."""
+    stop = threading.Event()
+    latencies, errors = [], []
+
+    def client(n):
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(f"{base_url}/transit-schedule/nextstop/{stop_codes[i % len(stop_codes)]}",
+                                            timeout=30) as response:
+                    response.read()
+                latencies.append(time.perf_counter() - start)
+            except (urllib.error.URLError, ConnectionError) as e:
+                errors.append(e)
+            i += clients
+
+    with concurrent.futures.ThreadPoolExecutor(clients) as pool:
+        started = time.perf_counter()
+        for n in range(clients):
+            pool.submit(client, n)
+        time.sleep(seconds)
+        stop.set()
+    return len(latencies) / (time.perf_counter() - started), latencies, errors
+
+
+def bench(label, server_args, args, stop_codes):
+    port = args.port
+    process = subprocess.Popen([sys.executable, __file__, '--data-dir', args.data_dir, '--port', str(port),
+                                *server_args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(f"{base_url}/health", process)
+        load(base_url, stop_codes, args.clients, 1)  # warm up
+        throughput, latencies, errors = load(base_url, stop_codes, args.clients, args.seconds)
+    finally:
+        process.terminate()
+        process.wait()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{label:<36} {throughput:8.1f} req/s  p50 {quantiles[49] * 1e3:7.1f} ms"
+          f"  p95 {quantiles[94] * 1e3:7.1f} ms  errors {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--serve', choices=['flask', 'gunicorn'], help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        args.data_dir = data_dir
+        write_feed(os.path.join(data_dir, ZIP_NAME))
+        stop_codes = busiest_stop_codes(data_dir, 50)
+        print(f"{args.clients} clients, {os.cpu_count()} CPUs")
+        bench("Flask dev server", ['--serve', 'flask'], args, stop_codes)
+        bench(f"gunicorn {args.workers} workers x {args.threads} threads",
+              ['--serve', 'gunicorn', '--workers', str(args.workers), '--threads', str(args.threads)], args, stop_codes)
+
+
+if __name__ == '__main__':
+    main()
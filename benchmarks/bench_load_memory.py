@@ -0,0 +1,58 @@
+"""Report resident memory of a loaded feed for each GTFS_LOAD_MODE.
+
+Each mode is measured in a fresh interpreter so the numbers do not leak into each other.
+The filtered mode keeps the departures of a few stops, like an MQTT deployment would.
+
+Usage: python benchmarks/bench_load_memory.py [--trips-per-service N]
+"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+
+from synthetic_feed import data_parser, parser_environment, write_feed
+
+MODES = ('full', 'compact', 'filtered')
+# Stop codes of the synthetic feed served by the filtered mode
+FILTERED_STOP_CODES = ['54680', '52000', '50010']
+
+
+def proc_status_mb(field: str) -> float:
+    """Read a memory field (VmRSS, VmHWM) from /proc/self/status (Linux)."""
+    with open('/proc/self/status') as fdesc:
+        for line in fdesc:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def measure(data_dir: str, mode: str) -> None:
+    before = proc_status_mb('VmRSS')
+    with parser_environment(data_dir, 'gtfs_bench.zip', load_mode=mode):
+        transit_data = data_parser.ParseTransitData(stop_codes=FILTERED_STOP_CODES if mode == 'filtered' else None)
+    gc.collect()
+    tables = transit_data.stop_times.memory_usage(deep=True).sum() + transit_data.trips.memory_usage(deep=True).sum()
+    print(f"{mode:<8} rss +{proc_status_mb('VmRSS') - before:7.1f} MB   peak {proc_status_mb('VmHWM'):7.1f} MB   "
+          f"stop_times+trips {tables / 2**20:7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trips-per-service', type=int, default=60)
+    parser.add_argument('--measure', nargs=2, metavar=('DATA_DIR', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        rows = write_feed(os.path.join(data_dir, 'gtfs_bench.zip'), trips_per_service=args.trips_per_service)
+        print(f"Synthetic feed: {rows} stop_times rows")
+        for mode in MODES:
+            subprocess.run([sys.executable, __file__, '--measure', data_dir, mode], check=True)
+
+
+if __name__ == '__main__':
+    main()
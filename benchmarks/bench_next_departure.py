@@ -0,0 +1,52 @@
+"""Measure next-departure lookups at the busiest stop of a synthetic feed.
+
+Compares the DataFrame pipeline of baseline_schedule (select stop rows, compute arrival
+datetimes, filter) with the departure index lookup used by ParseTransitData.get_next_stop.
+
+Usage: python benchmarks/bench_next_departure.py [--number N]
+"""
+import argparse
+import datetime
+import logging
+import os
+import tempfile
+import timeit
+
+import baseline_schedule
+from synthetic_feed import data_parser, parser_environment, write_feed
+
+
+def index_lookup(parser, stop_id, when):
+    service_mask = parser._get_service_mask(when.date(), stop_id)
+    return parser._find_next_departures(stop_id, when, service_mask)[0]
+
+
+def report(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{label:<28} {seconds * 1e6:10.1f} us/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("transit-schedule").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_feed(os.path.join(data_dir, 'gtfs_bench.zip'))
+        with parser_environment(data_dir, 'gtfs_bench.zip'):
+            transit_data = data_parser.ParseTransitData()
+
+            stop_id = transit_data.stop_times.index.value_counts().index[0]
+            when = datetime.datetime(2025, 9, 29, 17, 0, 0)
+            print(f"Stop {stop_id}: {int((transit_data.stop_times.index == stop_id).sum())} stop_times rows")
+
+            report("DataFrame pipeline", lambda: baseline_schedule.next_departure(transit_data, stop_id, when), args.number)
+            report("departure index", lambda: index_lookup(transit_data, stop_id, when), args.number)
+            index = transit_data.departure_index
+            service_mask = transit_data._get_service_mask(when.date(), stop_id)
+            report("  index search only", lambda: index.next_departures(stop_id, 61200, service_mask), args.number * 100)
+            report("get_next_stop (end to end)", lambda: transit_data.get_next_stop(stop_id, when), args.number)
+
+if __name__ == '__main__':
+    main()
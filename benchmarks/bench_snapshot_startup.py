@@ -0,0 +1,45 @@
+"""Compare ParseTransitData startup from the GTFS zip (cold) and from its columnar snapshot.
+
+Usage: python benchmarks/bench_snapshot_startup.py [--trips-per-service N]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from synthetic_feed import data_parser, parser_environment, write_feed
+
+
+def time_startup(data_dir: str, zip_name: str, use_snapshot: bool, repeat: int) -> list[float]:
+    timings = []
+    with parser_environment(data_dir, zip_name, snapshot=use_snapshot):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data_parser.ParseTransitData()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trips-per-service', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        rows = write_feed(os.path.join(data_dir, 'gtfs_bench.zip'), trips_per_service=args.trips_per_service)
+        print(f"Synthetic feed: {rows} stop_times rows")
+
+        cold = time_startup(data_dir, 'gtfs_bench.zip', use_snapshot=False, repeat=args.repeat)
+        # First snapshot-enabled run parses the zip and writes the snapshot.
+        time_startup(data_dir, 'gtfs_bench.zip', use_snapshot=True, repeat=1)
+        warm = time_startup(data_dir, 'gtfs_bench.zip', use_snapshot=True, repeat=args.repeat)
+
+    print(f"cold (CSV parse):  median {statistics.median(cold):.3f}s")
+    print(f"snapshot (.npz):   median {statistics.median(warm):.3f}s")
+    print(f"speedup:           {statistics.median(cold) / statistics.median(warm):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Report the memory of N concurrent worker processes, with and without the shared feed store.
+
+Each worker loads the feed like a gunicorn worker calling create_app() would, then all of them
+report their resident (RSS) and proportional (PSS) memory while alive at the same time. PSS
+splits shared pages between the processes mapping them, so it shows what each worker really costs.
+
+Usage: python benchmarks/bench_worker_memory.py [--workers N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy
+from synthetic_feed import data_parser, parser_environment, write_feed
+
+
+def memory_mb() -> tuple[float, float]:
+    """Return (RSS, PSS) of the current process in MB (Linux)."""
+    def read_kb(path, field):
+        with open(path) as fdesc:
+            for line in fdesc:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+        raise KeyError(field)
+    return read_kb('/proc/self/status', 'VmRSS') / 1024, read_kb('/proc/self/smaps_rollup', 'Pss') / 1024
+
+
+def worker(data_dir: str, feed_store: bool) -> None:
+    rss_before, pss_before = memory_mb()
+    with parser_environment(data_dir, 'gtfs_bench.zip', feed_store=feed_store):
+        transit_data = data_parser.ParseTransitData()
+    # Touch every page of the departure index, like a worker that served queries for a while
+    for array in transit_data.departure_index.arrays().values():
+        array.view(numpy.uint8).sum()
+    print("ready", flush=True)
+    sys.stdin.readline()
+    rss, pss = memory_mb()
+    print(f"{rss - rss_before:.1f} {pss - pss_before:.1f}", flush=True)
+    del transit_data
+
+
+def run(data_dir: str, workers: int, feed_store: bool) -> None:
+    args = [sys.executable, __file__, '--worker', data_dir, str(int(feed_store))]
+    if feed_store:
+        # Build the store first, like the preloading master or the first worker would
+        subprocess.run(args, input="\n", capture_output=True, text=True, check=True)
+    procs = [subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+    for proc in procs:
+        assert proc.stdout.readline().strip() == "ready"
+    results = []
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+        results.append([float(value) for value in proc.stdout.readline().split()])
+        proc.wait()
+    rss = sum(r[0] for r in results) / workers
+    pss = sum(r[1] for r in results) / workers
+    label = "feed store" if feed_store else "private tables"
+    print(f"{label:<15} {workers} workers: +{rss:6.1f} MB RSS, +{pss:6.1f} MB PSS per worker, "
+          f"+{pss * workers:7.1f} MB PSS total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker', nargs=2, metavar=('DATA_DIR', 'FEED_STORE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args.worker[0], args.worker[1] == '1')
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        rows = write_feed(os.path.join(data_dir, 'gtfs_bench.zip'))
+        print(f"Synthetic feed: {rows} stop_times rows")
+        for feed_store in (False, True):
+            run(data_dir, args.workers, feed_store)
+
+
+if __name__ == '__main__':
+    main()
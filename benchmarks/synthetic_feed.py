@@ -0,0 +1,94 @@
+"""Generate synthetic GTFS feeds shaped like a large agency, for the benchmarks in this folder."""
+import contextlib
+import os
+import sys
+import zipfile
+from unittest.mock import patch
+
+import numpy
+import pandas
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from transit_schedule import data_parser  # noqa: E402
+
+SERVICES = {
+    'SEM': (1, 1, 1, 1, 1, 0, 0),
+    'SAM': (0, 0, 0, 0, 0, 1, 0),
+    'DIM': (0, 0, 0, 0, 0, 0, 1),
+}
+
+
+def write_feed(path: str, n_stops: int = 8000, n_routes: int = 200, trips_per_service: int = 60,
+               stops_per_trip: int = 40, seed: int = 0, rtl_style: bool = False) -> int:
+    """Write a GTFS zip to path and return the number of stop_times rows.
+
+    With rtl_style, trips.txt appends a suffix to the calendar.txt service_ids (e.g. SEM-B3),
+    like the RTL feed does, so that only the fuzzy service matching finds the trips.
+    """
+    rng = numpy.random.default_rng(seed)
+
+    stops = pandas.DataFrame({
+        'stop_id': [str(i) for i in range(n_stops)],
+        'stop_code': [str(50000 + i) for i in range(n_stops)],
+        'stop_name': [f'Stop {i}' for i in range(n_stops)],
+        'stop_lat': rng.uniform(45.4, 45.7, n_stops).round(6),
+        'stop_lon': rng.uniform(-73.9, -73.4, n_stops).round(6),
+    })
+
+    calendar = pandas.DataFrame(
+        [[sid, *days, 20250101, 20271231] for sid, days in SERVICES.items()],
+        columns=['service_id', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+                 'saturday', 'sunday', 'start_date', 'end_date'],
+    )
+
+    trip_rows = []
+    for route in range(n_routes):
+        for service_id in SERVICES:
+            for n in range(trips_per_service):
+                trip_service_id = f'{service_id}-B{route % 8}' if rtl_style else service_id
+                trip_rows.append((str(route + 1), trip_service_id, f'{route + 1}-{service_id}-{n}',
+                                  f'Direction {"Nord" if n % 2 else "Sud"} {route + 1}'))
+    trips = pandas.DataFrame(trip_rows, columns=['route_id', 'service_id', 'trip_id', 'trip_headsign'])
+
+    # Each route serves a fixed run of stops; trips leave every few minutes from 05:00 to past midnight.
+    route_first_stop = rng.integers(0, n_stops - stops_per_trip, n_routes)
+    trip_route = trips['route_id'].astype(int).to_numpy() - 1
+    trip_start = 5 * 3600 + (numpy.arange(len(trips)) % trips_per_service) * (20 * 3600 // trips_per_service)
+    seq = numpy.tile(numpy.arange(stops_per_trip), len(trips))
+    trip_pos = numpy.repeat(numpy.arange(len(trips)), stops_per_trip)
+    arrival = trip_start[trip_pos] + seq * 90
+    h, rem = divmod(arrival, 3600)
+    m, s = divmod(rem, 60)
+    stop_times = pandas.DataFrame({
+        'trip_id': trips['trip_id'].to_numpy()[trip_pos],
+        'arrival_time': [f'{a:02d}:{b:02d}:{c:02d}' for a, b, c in zip(h, m, s, strict=True)],
+        'stop_id': (route_first_stop[trip_route[trip_pos]] + seq).astype(str),
+        'stop_sequence': seq + 1,
+        'pickup_type': 0,
+        'drop_off_type': 0,
+        'shape_dist_traveled': (seq * 0.35).round(3),
+    })
+    stop_times.insert(2, 'departure_time', stop_times['arrival_time'])
+
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('stops.txt', stops.to_csv(index=False))
+        zf.writestr('calendar.txt', calendar.to_csv(index=False))
+        zf.writestr('trips.txt', trips.to_csv(index=False))
+        zf.writestr('stop_times.txt', stop_times.to_csv(index=False))
+    return len(stop_times)
+
+
+@contextlib.contextmanager
+def parser_environment(data_dir: str, zip_name: str, snapshot: bool = False, load_mode: str = 'compact',
+                       feed_store: bool = False):
+    """Point ParseTransitData at a local feed, without the live scraper or network access."""
+    with patch.object(data_parser, 'HastusScraper'), \
+         patch.object(data_parser.config, 'gtfs_data_dir', data_dir), \
+         patch.object(data_parser.config, 'gtfs_zip_file', zip_name), \
+         patch.object(data_parser.config, 'retrieval_method', 'gtfs'), \
+         patch.object(data_parser.config, 'transit', 'STM'), \
+         patch.object(data_parser, 'GTFS_SNAPSHOT_ENABLED', snapshot), \
+         patch.object(data_parser, 'GTFS_FEED_STORE_ENABLED', feed_store), \
+         patch.object(data_parser, 'GTFS_LOAD_MODE', load_mode):
+        yield
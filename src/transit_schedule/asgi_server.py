@@ -0,0 +1,260 @@
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import time
+import urllib.parse
+
+import transit_schedule.data_parser as data_parser
+import transit_schedule.http_api as http_api
+from transit_schedule.const import (
+    _LOGGER,
+    HTTP_CACHE_SIZE,
+    HTTP_LIVE_DEADLINE,
+    HTTP_LIVE_MAX_PENDING,
+    HTTP_PORT,
+    HTTP_THREADS,
+    HTTP_WARMUP_STOPS,
+)
+from transit_schedule.departure_cache import DepartureCache
+from transit_schedule.http_api import SATURATED, TIMED_OUT
+from transit_schedule.metrics import CONTENT_TYPE, REGISTRY, REQUEST_DURATION, track_transit_data
+from transit_schedule.single_flight import SingleFlight
+from transit_schedule.warmup import StartupWarmup
+
+# Routes with parameters, matched to label the request metrics like the Flask app does
+PATTERN_ROUTES = tuple((http_api.route_pattern(route), route)
+                       for route in (http_api.NEXTSTOP_ROUTE, http_api.DEPARTURES_ROUTE))
+FIXED_ROUTES = (*http_api.PROBE_ROUTES, http_api.BATCH_ROUTE)
+
+
+class AsyncTransitApp:
+    """ASGI app serving the HTTP mode endpoints from an asyncio event loop.
+
+    GTFS lookups take well under a millisecond and run inline. Lookups that need the live
+    scraper, whose requests block for seconds, run in a pool of live_threads threads and are
+    awaited until live_deadline: slow scraper responses then tie up that pool, never the loop,
+    and other clients keep being served. Requests for the same stop, route and direction share
+    one lookup, and at most live_max_pending lookups are queued or running: past that, requests
+    needing another get a 503 error. A lookup past its deadline answers with the GTFS look-ahead
+    departures when there are some; the lookup is cancelled if it has not started, or else keeps
+    running to fill the scraper cache.
+    """
+
+    def __init__(self, transit_data, live_deadline: float = HTTP_LIVE_DEADLINE, live_threads: int = HTTP_THREADS,
+                 cache_size: int = HTTP_CACHE_SIZE, warmup: StartupWarmup | None = None,
+                 live_max_pending: int = HTTP_LIVE_MAX_PENDING):
+        self.transit_data = transit_data
+        self.warmup = warmup if warmup is not None else StartupWarmup(transit_data, [])
+        self.live_deadline = live_deadline
+        self.live_executor = concurrent.futures.ThreadPoolExecutor(max(live_threads, 1), thread_name_prefix='live-lookup')
+        self.live_flights = SingleFlight()
+        self.live_max_pending = max(live_max_pending, 1)
+        self.departure_cache = DepartureCache(cache_size)
+        if transit_data is not None:
+            track_transit_data(transit_data)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        start = time.perf_counter()
+        path = scope['path']
+        http_api.log_request(scope['method'], path, (scope.get('client') or ('', 0))[0])
+        try:
+            status, payload, headers = await self._dispatch(scope, receive)
+        except Exception as e:
+            _LOGGER.exception(e)
+            status, payload, headers = 500, {"error": "Internal server error"}, {}
+
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), CONTENT_TYPE
+        else:
+            body, content_type = b'' if status == 304 else json.dumps(payload).encode(), 'application/json'
+        response_headers = [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+        response_headers += [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': body})
+        REQUEST_DURATION.observe(time.perf_counter() - start, _route_params(path)[0], scope['method'], str(status))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.transit_data is not None:
+                    self.transit_data.stop_background_refresh()
+                self.live_executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _dispatch(self, scope, receive):
+        path, method = scope['path'], scope['method']
+        query = urllib.parse.parse_qs(scope['query_string'].decode())
+        request_headers = {name.decode().lower(): value.decode() for name, value in scope['headers']}
+
+        if path == '/health' and method == 'GET':
+            return http_api.health_response(self.transit_data)
+        if path == '/ready' and method == 'GET':
+            return http_api.ready_response(self.warmup)
+        if path == '/metrics' and method == 'GET':
+            return 200, REGISTRY.render(), {}
+        route, params = _route_params(path)
+        if route == 'unmatched':
+            return http_api.error_response(404, "Not found")
+        allowed = ('GET', 'POST') if route == http_api.BATCH_ROUTE else ('GET',)
+        if method not in allowed:
+            return http_api.error_response(405, "Method not allowed")
+        if self.transit_data is None:
+            return http_api.TRANSIT_DATA_MISSING
+        if_none_match = request_headers.get('if-none-match')
+        if route == http_api.NEXTSTOP_ROUTE:
+            return await self.next_stop(int(params['stop_code']), if_none_match)
+        if route == http_api.BATCH_ROUTE:
+            if method == 'POST':
+                stops = http_api.stops_from_body(await _read_body(receive))
+            else:
+                stops = http_api.stops_from_query(query.get('stops', [''])[0])
+            return await self.next_stops(stops, if_none_match)
+        return await self.departures(int(params['stop_code']), {name: values[0] for name, values in query.items()})
+
+    async def _run_live(self, lookups) -> list:
+        """Run blocking (key, call) lookups in the live pool, awaiting them together until the live deadline.
+
+        A lookup whose key is in flight for another request shares its call. Returns their results
+        in order, TIMED_OUT for those still running and SATURATED for those refused.
+        """
+        if not lookups:
+            return []
+        futures = [self.live_flights.submit(self.live_executor, key, call, limit=self.live_max_pending)
+                   for key, call in lookups]
+        awaited = [asyncio.wrap_future(future) if future is not None else None for future in futures]
+        pending = set()
+        if any(future is not None for future in futures):
+            _, pending = await asyncio.wait([future for future in awaited if future is not None],
+                                            timeout=self.live_deadline)
+
+        results, cancelled = [], 0
+        for (key, _), future, waiter in zip(lookups, futures, awaited, strict=True):
+            if future is None:
+                results.append(SATURATED)
+            elif waiter in pending:
+                cancelled += self.live_flights.release(key, future)
+                results.append(TIMED_OUT)
+            else:
+                results.append(waiter.result())
+        if pending:
+            _LOGGER.warning(f"{len(pending)} live lookup(s) not done after {self.live_deadline}s, {cancelled} of them "
+                            f"cancelled before starting; answering without them.")
+        if None in futures:
+            _LOGGER.warning(f"{self.live_max_pending} live lookups pending; refused {futures.count(None)} more.")
+        return results
+
+    async def _next_stops(self, stop_requests, current_datetime: datetime.datetime, stop_code=None):
+        """Next departure of each (stop_id, route, direction), from the cache, GTFS, or else the live scraper.
+
+        Returns the departures, and None when they are all final or else why a live lookup is
+        missing: TIMED_OUT, or SATURATED when one was refused.
+        """
+        transit_data = self.transit_data
+        feed_version = getattr(transit_data, 'loaded_at', None)
+        next_stops, live = http_api.lookup_next_stops(transit_data, self.departure_cache, stop_requests,
+                                                      current_datetime, stop_code=stop_code, live=False)
+
+        def live_lookup(stop_id, target_route, target_direction):
+            return lambda: transit_data.get_next_stop(stop_id, current_datetime, stop_code=stop_code,
+                                                      target_route=target_route, target_direction=target_direction)
+
+        unresolved = None
+        live_stops = await self._run_live([(('nextstop', *stop_requests[pos]), live_lookup(*stop_requests[pos]))
+                                           for pos in live])
+        for pos, next_stop_row in zip(live, live_stops, strict=True):
+            if next_stop_row is TIMED_OUT or next_stop_row is SATURATED:
+                if unresolved is not SATURATED:
+                    unresolved = next_stop_row
+                continue
+            self.departure_cache.put(stop_requests[pos], next_stop_row, feed_version)
+            next_stops[pos] = next_stop_row
+        return next_stops, unresolved
+
+    async def next_stop(self, stop_code: int, if_none_match: str | None):
+        stop_id, error = http_api.stop_lookup(self.transit_data, stop_code)
+        if error:
+            return error
+        current_datetime = datetime.datetime.now().replace(microsecond=0)
+        (next_stop_row,), unresolved = await self._next_stops([(stop_id, None, None)], current_datetime,
+                                                              stop_code=stop_code)
+        return http_api.next_stop_response(next_stop_row, current_datetime, if_none_match, stop_code, unresolved)
+
+    async def next_stops(self, stops, if_none_match: str | None):
+        """Next departure of many stops, like /transit-schedule/nextstop of the Flask app."""
+        error = http_api.batch_stops_error(stops)
+        if error:
+            return http_api.error_response(400, error)
+
+        results, stop_requests = http_api.batch_stop_requests(stops, self.transit_data)
+        current_datetime = datetime.datetime.now().replace(microsecond=0)
+        next_stops, unresolved = await self._next_stops([stop_request for _, stop_request in stop_requests],
+                                                        current_datetime)
+        return http_api.next_stops_response(results, stop_requests, next_stops, current_datetime, if_none_match,
+                                            unresolved)
+
+    async def departures(self, stop_code: int, args: dict):
+        stop_id, query, error = http_api.departures_query(self.transit_data, stop_code, args)
+        if error:
+            return error
+        current_datetime = datetime.datetime.now().replace(microsecond=0)
+        departures = self.transit_data.get_next_departures(stop_id, current_datetime, live=False, **query)
+        if self.transit_data.needs_live_lookup(departures):
+            key = ('departures', stop_id, query['target_route'], query['target_direction'], query['limit'])
+            live_departures, = await self._run_live(
+                [(key, lambda: self.transit_data.get_next_departures(stop_id, current_datetime, **query))])
+            if live_departures is not TIMED_OUT and live_departures is not SATURATED:
+                departures = live_departures
+            elif not departures:
+                return http_api.live_unavailable(live_departures)
+        return http_api.departures_response(stop_code, departures, current_datetime)
+
+
+def _route_params(path: str):
+    """The route of a path, 'unmatched' if none, and its parameters."""
+    if path in FIXED_ROUTES:
+        return path, {}
+    for pattern, route in PATTERN_ROUTES:
+        if match := pattern.fullmatch(path):
+            return route, match.groupdict()
+    return 'unmatched', {}
+
+
+async def _read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+def create_asgi_app(transit_data=None) -> AsyncTransitApp:
+    """Build the ASGI app, loading the transit data unless it is given."""
+    if transit_data is None:
+        try:
+            transit_data = data_parser.ParseTransitData()
+            transit_data.start_background_refresh()
+        except Exception as e:
+            _LOGGER.exception(e)
+            # Like the Flask app, keep serving health checks without transit data
+            transit_data = None
+    warmup = StartupWarmup(transit_data, HTTP_WARMUP_STOPS)
+    warmup.start()
+    return AsyncTransitApp(transit_data, warmup=warmup)
+
+
+def start_asgi_server():
+    import uvicorn
+
+    _LOGGER.info(f"Starting the asyncio server on port {HTTP_PORT}, with {HTTP_THREADS} live lookup threads.")
+    uvicorn.run(create_asgi_app(), host='0.0.0.0', port=HTTP_PORT, access_log=False)
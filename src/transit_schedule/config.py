@@ -19,6 +19,50 @@ class Config:
         self.gtfs_url = os.environ.get("GTFS_URL", default_urls.get(self.transit, default_urls["RTL"]))
         self.gtfs_zip_file = os.environ.get("GTFS_ZIP_FILE", f"gtfs_{self.transit.lower()}.zip")
         self.gtfs_data_dir = os.environ.get("GTFS_DATA_DIR", "data")
+        self.gtfs_load_mode = os.environ.get("GTFS_LOAD_MODE", "compact").lower()
+        self.gtfs_snapshot_enabled = os.environ.get("GTFS_SNAPSHOT", "True").lower() == "true"
+        self.gtfs_feed_store_enabled = os.environ.get("GTFS_FEED_STORE", "True").lower() == "true"
+        try:
+            self.gtfs_refresh_interval = int(os.environ.get("GTFS_REFRESH_INTERVAL", 3600))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing GTFS_REFRESH_INTERVAL: {e}. Using default 3600.")
+            self.gtfs_refresh_interval = 3600
+        try:
+            self.gtfs_lookahead_days = int(os.environ.get("GTFS_LOOKAHEAD_DAYS", 7))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing GTFS_LOOKAHEAD_DAYS: {e}. Using default 7.")
+            self.gtfs_lookahead_days = 7
+        try:
+            self.http_cache_size = int(os.environ.get("HTTP_CACHE_SIZE", 1024))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing HTTP_CACHE_SIZE: {e}. Using default 1024.")
+            self.http_cache_size = 1024
+        self.http_server = os.environ.get("HTTP_SERVER", "gunicorn").lower()
+        try:
+            self.http_port = int(os.environ.get("HTTP_PORT", 80))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing HTTP_PORT: {e}. Using default 80.")
+            self.http_port = 80
+        try:
+            self.http_workers = int(os.environ.get("HTTP_WORKERS", 2))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing HTTP_WORKERS: {e}. Using default 2.")
+            self.http_workers = 2
+        try:
+            self.http_threads = int(os.environ.get("HTTP_THREADS", 4))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing HTTP_THREADS: {e}. Using default 4.")
+            self.http_threads = 4
+        try:
+            self.http_live_deadline = float(os.environ.get("HTTP_LIVE_DEADLINE", 5))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing HTTP_LIVE_DEADLINE: {e}. Using default 5.")
+            self.http_live_deadline = 5.0
+        try:
+            self.http_live_max_pending = int(os.environ.get("HTTP_LIVE_MAX_PENDING", 32))
+        except (ValueError, TypeError) as e:
+            _LOGGER.error(f"Error parsing HTTP_LIVE_MAX_PENDING: {e}. Using default 32.")
+            self.http_live_max_pending = 32
         self.retrieval_method = os.environ.get("RETRIEVAL_METHOD", "gtfs" if self.transit != "RTL" else "live").lower()
         self.timezone = os.environ.get("TZ", "America/Montreal")
         self.language = os.environ.get("LANGUAGE", "fr").lower()
@@ -72,6 +116,18 @@ class Config:
         # Compatibility for single stop code
         self._stop_code = self.stops[0]['stop_code'] if self.stops else None
 
+        # Stops resolved at HTTP startup before /ready reports ready; the configured stops by default
+        warmup_stops = os.environ.get("HTTP_WARMUP_STOPS")
+        if warmup_stops is None:
+            self.http_warmup_stops = list(self.stops)
+        else:
+            self.http_warmup_stops = []
+            for stop_code in (code.strip() for code in warmup_stops.split(',')):
+                if stop_code.isdigit():
+                    self.http_warmup_stops.append({"stop_code": stop_code, "route_id": None, "direction": None})
+                elif stop_code:
+                    _LOGGER.error(f"Ignoring invalid stop code in HTTP_WARMUP_STOPS: {stop_code}")
+
         # Home Assistant Discovery
         self.hass_discovery_enabled = os.environ.get("HASS_DISCOVERY_ENABLED", "False").lower() == "true"
         self.hass_discovery_prefix = os.environ.get("HASS_DISCOVERY_PREFIX", "homeassistant")
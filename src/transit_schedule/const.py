@@ -7,6 +7,19 @@ _LOGGER = logging.getLogger("transit-schedule")
 TRANSIT = config.transit
 GTFS_URL = config.gtfs_url
 GTFS_ZIP_FILE = config.gtfs_zip_file
+GTFS_LOAD_MODE = config.gtfs_load_mode
+GTFS_SNAPSHOT_ENABLED = config.gtfs_snapshot_enabled
+GTFS_FEED_STORE_ENABLED = config.gtfs_feed_store_enabled
+GTFS_REFRESH_INTERVAL = config.gtfs_refresh_interval
+GTFS_LOOKAHEAD_DAYS = config.gtfs_lookahead_days
+HTTP_CACHE_SIZE = config.http_cache_size
+HTTP_SERVER = config.http_server
+HTTP_PORT = config.http_port
+HTTP_WORKERS = config.http_workers
+HTTP_THREADS = config.http_threads
+HTTP_LIVE_DEADLINE = config.http_live_deadline
+HTTP_LIVE_MAX_PENDING = config.http_live_max_pending
+HTTP_WARMUP_STOPS = config.http_warmup_stops
 DEFAULT_TIMEZONE = config.timezone
 RETRIEVAL_METHOD = config.retrieval_method
 LANGUAGE = config.language
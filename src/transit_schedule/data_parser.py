@@ -1,7 +1,12 @@
 import datetime
+import hashlib
 import os
+import tempfile
+import threading
+import time
 import zipfile
 
+import numpy
 import pandas
 import requests
 from pandas import Series, read_csv
@@ -9,19 +14,73 @@ from pandas import Series, read_csv
 from transit_schedule.config import config
 from transit_schedule.const import (
     _LOGGER,
+    GTFS_FEED_STORE_ENABLED,
+    GTFS_LOAD_MODE,
+    GTFS_LOOKAHEAD_DAYS,
+    GTFS_REFRESH_INTERVAL,
+    GTFS_SNAPSHOT_ENABLED,
     GTFS_URL,
 )
+from transit_schedule.departure_index import format_gtfs_time, parse_gtfs_times
+from transit_schedule.feed_store import feed_store_lock, feed_store_path, open_feed_store, write_feed_store
+from transit_schedule.gtfs_feed import GtfsFeed
+from transit_schedule.gtfs_snapshot import (
+    file_digest,
+    load_snapshot,
+    remove_stale_snapshots,
+    save_snapshot,
+    snapshot_path,
+)
 from transit_schedule.hastus_scraper import HastusScraper
-from transit_schedule.util import is_file_expired
+from transit_schedule.metrics import ENGINE_STAGE_DURATION, FEED_LOAD_DURATION
+from transit_schedule.service_calendar import base_service_ids
+from transit_schedule.util import is_file_expired, settings_from_file
+
+# Columns of trips.txt used by the schedule lookups (trip_headsign is optional in GTFS)
+TRIPS_COLUMNS = ('route_id', 'service_id', 'trip_id', 'trip_headsign')
+
+# Size of the chunks streamed to disk while downloading the GTFS zip
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Rows of stop_times.txt read at once by the filtered load mode
+STOP_TIMES_CHUNK_SIZE = 100_000
+
+# Fields of a GTFS departure row (see ParseTransitData._departure_row), as a shared Series index
+DEPARTURE_FIELDS = pandas.Index(['trip_id', 'arrival_time', 'route_id', 'service_id', 'trip_headsign',
+                                 'arrival_datetime', 'retrieve_method', 'lookahead_days'])
 
 
 class NoServiceFoundError(ValueError):
     """Exception raised when no service is found for a given date."""
     pass
 
+def _feed_attribute(name: str) -> property:
+    """Expose a field of the current GtfsFeed as an attribute of ParseTransitData."""
+    def getter(self):
+        return getattr(self._feed, name)
+
+    def setter(self, value):
+        self._feed = self._feed.replace(**{name: value})
+
+    return property(getter, setter)
+
+
 class ParseTransitData:
-    def __init__(self):
+    stops = _feed_attribute('stops')
+    calendar = _feed_attribute('calendar')
+    stop_times = _feed_attribute('stop_times')
+    trips = _feed_attribute('trips')
+    calendar_dates = _feed_attribute('calendar_dates')
+    service_calendar = _feed_attribute('service_calendar')
+    departure_index = _feed_attribute('departure_index')
+    min_date = _feed_attribute('min_date')
+    max_date = _feed_attribute('max_date')
+    loaded_at = _feed_attribute('loaded_at')
+
+    def __init__(self, stop_codes=None):
+        """stop_codes restricts the filtered load mode to the departures of these stops."""
         self.schedule_zipfile = config.gtfs_zip_file
+        self.stop_codes = sorted({str(stop_code) for stop_code in stop_codes}) if stop_codes else None
         _LOGGER.info("ParseTransitData init")
 
         self.data_dir = config.gtfs_data_dir
@@ -32,13 +91,13 @@ class ParseTransitData:
             
         self.file_path = os.path.join(self.data_dir, self.schedule_zipfile)
         self.scraper = HastusScraper()
-        self.stops = pandas.DataFrame()
-        self.calendar = pandas.DataFrame()
-        self.stop_times = pandas.DataFrame()
-        self.trips = pandas.DataFrame()
-        self.calendar_dates = pandas.DataFrame()
-        self.min_date = None
-        self.max_date = None
+        # Queries read the current feed through this single reference; refreshes swap it.
+        self._feed = GtfsFeed.empty()
+        self._load_lock = threading.Lock()
+        self._refresh_stop = threading.Event()
+        self._refresh_thread = None
+        # Identity of the feed store file currently mapped, to notice its replacement
+        self._feed_store_stat = None
         
         try:
             self._load_data()
@@ -51,39 +110,15 @@ class ParseTransitData:
 
     def _load_data(self, force_download=False):
         """Download and load GTFS data into memory."""
+        start = time.perf_counter()
         try:
-            if force_download or not (os.path.isfile(self.file_path)) or is_file_expired(self.file_path):
-                _LOGGER.info(f"Downloading a new zip file from [{GTFS_URL}]")
-                self._download_gtfs_file(self.file_path)
-
-            with zipfile.ZipFile(self.file_path) as my_zip:
-                _LOGGER.info(f"Loading GTFS data from {self.file_path} into memory...")
-                self.stops = read_csv(my_zip.open('stops.txt'), dtype={'stop_code': str}, index_col='stop_code')
-                self.calendar = read_csv(my_zip.open('calendar.txt'), dtype={'service_id': str})
-                self.stop_times = read_csv(
-                    my_zip.open('stop_times.txt'),
-                    dtype={'stop_id': str, 'trip_id': str},
-                    index_col='stop_id'
-                )
-                self.trips = read_csv(
-                    my_zip.open('trips.txt'),
-                    dtype={'trip_id': str, 'service_id': str, 'route_id': str}
-                )
-                
-                # Calculate global schedule range for diagnostics
-                self.min_date = self.calendar['start_date'].min()
-                self.max_date = self.calendar['end_date'].max()
-
-                _LOGGER.info(f"Successfully loaded stops ({len(self.stops)}), calendar ({len(self.calendar)}), stop_times ({len(self.stop_times)}), and trips ({len(self.trips)})")
-                _LOGGER.info(f"Global GTFS schedule range: {self.min_date} to {self.max_date}")
-                
-                # Load calendar_dates if it exists (it's optional in GTFS but common in RTL)
-                try:
-                    self.calendar_dates = read_csv(my_zip.open('calendar_dates.txt'), dtype={'service_id': str})
-                    _LOGGER.info(f"Loaded calendar_dates.txt ({len(self.calendar_dates)} entries)")
-                except KeyError:
-                    self.calendar_dates = pandas.DataFrame(columns=['service_id', 'date', 'exception_type'])
-                    _LOGGER.info("calendar_dates.txt not found in GTFS, using empty DataFrame")
+            if GTFS_FEED_STORE_ENABLED:
+                # Only one process downloads and builds the shared feed store at a time
+                with feed_store_lock(self._get_feed_store_path()):
+                    self._load_feed(force_download)
+            else:
+                self._load_feed(force_download)
+            FEED_LOAD_DURATION.set(time.perf_counter() - start)
 
         except FileNotFoundError:
             _LOGGER.error(f"GTFS file not found at {self.file_path}. Please check the file path and permissions.")
@@ -92,200 +127,540 @@ class ParseTransitData:
             _LOGGER.error(f"An error occurred while parsing the GTFS file: {e}")
             raise
 
-    def refresh(self, force=False):
-        """Check if data needs to be refreshed and reload if necessary."""
-        if force or is_file_expired(self.file_path):
-            _LOGGER.info(f"Refreshing GTFS data (force={force})...")
-            self._load_data(force_download=force)
+    def _load_feed(self, force_download=False):
+        if force_download or not (os.path.isfile(self.file_path)) or is_file_expired(self.file_path):
+            _LOGGER.info(f"Downloading a new zip file from [{GTFS_URL}]")
+            not_modified = not self._download_gtfs_file(self.file_path)
+            if not_modified and self._feed.loaded_at is not None and self._feed.variant == self._get_load_variant():
+                _LOGGER.info("Keeping the loaded GTFS data")
+                return
+
+        digest = self._get_zip_digest()
+        feed = self._map_feed_store(digest)
+        if feed is None:
+            snapshot_file = self._get_snapshot_path(digest)
+            tables = load_snapshot(snapshot_file) if snapshot_file else None
+            if tables is not None:
+                _LOGGER.info(f"Loading GTFS data from snapshot {snapshot_file}")
+            else:
+                tables = self._read_gtfs_tables()
+                if snapshot_file:
+                    save_snapshot(snapshot_file, tables)
+                    remove_stale_snapshots(self.file_path, keep=snapshot_file, variant=self._get_load_variant())
+
+            # Build the complete feed first, then swap it in with a single assignment
+            feed = GtfsFeed.build(tables, variant=self._get_load_variant())
+            _LOGGER.info(f"Successfully loaded stops ({len(feed.stops)}), calendar ({len(feed.calendar)}), stop_times ({len(feed.stop_times)}), and trips ({len(feed.trips)})")
+            if GTFS_FEED_STORE_ENABLED and digest:
+                arrays, meta = feed.store_arrays()
+                meta.update(zip_digest=digest)
+                if write_feed_store(self._get_feed_store_path(), arrays, meta):
+                    # Serve from the mapping too, so that this process shares its pages with the others
+                    feed = self._map_feed_store(digest) or feed
+
+        self._feed = feed
+        _LOGGER.info(f"Global GTFS schedule range: {feed.min_date} to {feed.max_date}")
+
+    def _get_zip_digest(self) -> str | None:
+        """Return the digest of the GTFS zip, or None if it is not needed or cannot be read."""
+        if not (GTFS_SNAPSHOT_ENABLED or GTFS_FEED_STORE_ENABLED):
+            return None
+        try:
+            return file_digest(self.file_path)
+        except OSError as e:
+            _LOGGER.warning(f"Could not hash {self.file_path}: {e}")
+            return None
 
-    @staticmethod
-    def _download_gtfs_file(zipfile_location) -> None:
-        """ Download the GTFS file from the website, write it on disk. """
-        my_file = requests.get(GTFS_URL, allow_redirects=True, timeout=60)
-        my_file.raise_for_status()
-        with open(zipfile_location, 'wb') as my_zip:
-            my_zip.write(my_file.content)
+    def _get_snapshot_path(self, digest: str | None) -> str | None:
+        """Return the snapshot path for the current zip, or None if snapshots are disabled or unavailable."""
+        if not GTFS_SNAPSHOT_ENABLED or not digest:
+            return None
+        return snapshot_path(self.file_path, digest, variant=self._get_load_variant())
 
-    def get_stop_id(self, stop_code: int) -> str | None:
-        """ Retrieve the stop_id based on a stop_code """
-        if not self.stops.empty:
-            self.refresh()
-            
-        if self.stops.empty:
-            _LOGGER.debug(f"Stops data is empty, cannot resolve stop_code {stop_code}")
+    def _get_feed_store_path(self) -> str:
+        return feed_store_path(self.file_path, variant=self._get_load_variant())
+
+    def _map_feed_store(self, digest: str | None) -> GtfsFeed | None:
+        """Map the feed store if it was built from the current zip, else return None."""
+        if not GTFS_FEED_STORE_ENABLED or not digest:
             return None
-            
-        sc_str = str(stop_code)
-        if sc_str not in self.stops.index:
-            _LOGGER.error(f"Stop code {stop_code} not found in the GTFS data.")
+        path = self._get_feed_store_path()
+        stat = self._get_feed_store_stat()
+        store = open_feed_store(path)
+        if store is None:
             return None
-        
-        stop_info = self.stops.loc[sc_str]
-        if isinstance(stop_info, pandas.DataFrame):
-            return str(stop_info.iloc[0]["stop_id"])
-        return str(stop_info["stop_id"])
-
-    def _get_service_ids(self, date: datetime.date) -> list[str]:
-        """ Retrieve the service_ids for a given date, handling exceptions in calendar_dates.txt """
-        curr_weekday = date.weekday()
-        curr_date_int = int(date.strftime("%Y%m%d"))
-        matching_service_ids = []
-
-        # 1. Check calendar_dates.txt for explicit additions (exception_type=1)
-        if not self.calendar_dates.empty:
-            added_services = self.calendar_dates[
-                (self.calendar_dates["date"] == curr_date_int) &
-                (self.calendar_dates["exception_type"] == 1)
-            ]
-            matching_service_ids.extend(added_services["service_id"].tolist())
-
-        # 2. Check calendar.txt for regular service
-        weekday_map = {
-            0: "monday", 1: "tuesday", 2: "wednesday", 3: "thursday",
-            4: "friday", 5: "saturday", 6: "sunday"
-        }
-        weekday_str = weekday_map.get(curr_weekday)
-
-        if weekday_str:
-            regular_services = self.calendar[
-                (self.calendar[weekday_str] == 1) &
-                (self.calendar["end_date"] >= curr_date_int) &
-                (self.calendar["start_date"] <= curr_date_int)
-            ]
-            
-            # 3. Filter out regular services that are explicitly removed in calendar_dates.txt (exception_type=2)
-            for _, service_row in regular_services.iterrows():
-                service_id = service_row["service_id"]
-                if not self.calendar_dates.empty:
-                    removed_service = self.calendar_dates[
-                        (self.calendar_dates["service_id"] == service_id) &
-                        (self.calendar_dates["date"] == curr_date_int) &
-                        (self.calendar_dates["exception_type"] == 2)
-                    ]
-                    if not removed_service.empty:
-                        continue # This service is removed for today
-                
-                matching_service_ids.append(service_id)
-            
-        if not matching_service_ids:
-            raise NoServiceFoundError(f"No service found for date {date}")
-            
-        return list(set(matching_service_ids))
+        arrays, meta = store
+        if meta.get('zip_digest') != digest or meta.get('variant') != self._get_load_variant():
+            _LOGGER.info(f"GTFS feed store {path} was built from another zip file")
+            return None
+
+        self._feed_store_stat = stat
+        feed = GtfsFeed.from_store(arrays, meta)
+        _LOGGER.info(f"Mapped GTFS feed store {path}: stops ({len(feed.stops)}), departures ({len(feed.departure_index)})")
+        return feed
 
-    def _get_today_schedule(self, service_ids: list[str], stop_id: str) -> pandas.DataFrame:
-        """Get the schedule for a given list of service IDs and stop ID."""
+    def _get_feed_store_stat(self) -> tuple[int, int] | None:
         try:
-            stop_times_for_stop = self.stop_times.loc[[stop_id]]
-        except KeyError:
-            return pandas.DataFrame()
+            stat = os.stat(self._get_feed_store_path())
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _feed_store_replaced(self) -> bool:
+        """Tell whether another process replaced the feed store this process maps."""
+        return self._feed_store_stat is not None and self._get_feed_store_stat() != self._feed_store_stat
+
+    def _get_load_mode(self) -> str:
+        """Return the effective load mode: filtering needs stop codes, else the whole feed is loaded compactly."""
+        if GTFS_LOAD_MODE == "filtered" and not self.stop_codes:
+            return "compact"
+        return GTFS_LOAD_MODE
+
+    def _get_load_variant(self) -> str:
+        """Name the table layout built from the zip, which keys the snapshots and the feed store."""
+        mode = self._get_load_mode()
+        if mode == "filtered":
+            # Each stop list gets its own files, so changing STOPS_CONFIG never reuses a stale filter
+            return f"{mode}-{hashlib.sha256(','.join(self.stop_codes).encode()).hexdigest()[:12]}"
+        return mode
+
+    def _read_gtfs_tables(self) -> dict[str, pandas.DataFrame]:
+        """Parse the GTFS tables from the zip file."""
+        mode = self._get_load_mode()
+        compact = mode != "full"
+        with zipfile.ZipFile(self.file_path) as my_zip:
+            _LOGGER.info(f"Loading GTFS data from {self.file_path} into memory (mode: {mode})...")
+            tables = {
+                'stops': read_csv(my_zip.open('stops.txt'), dtype={'stop_code': str}, index_col='stop_code'),
+                'calendar': read_csv(my_zip.open('calendar.txt'), dtype={'service_id': str}),
+            }
+            tables['trips'] = self._read_trips(my_zip, compact)
+            if mode == "filtered":
+                stop_ids = tables['stops'].loc[tables['stops'].index.isin(self.stop_codes), 'stop_id'].astype(str)
+                _LOGGER.info(f"Keeping the stop_times of stops {self.stop_codes} (stop_ids {stop_ids.tolist()})")
+                tables['stop_times'] = self._read_filtered_stop_times(my_zip, tables['trips'], set(stop_ids))
+            else:
+                tables['stop_times'] = self._read_stop_times(my_zip, tables['trips'], compact)
 
-        results = stop_times_for_stop.merge(self.trips, how='left', on='trip_id', validate='many_to_one')
+            # Load calendar_dates if it exists (it's optional in GTFS but common in RTL)
+            try:
+                tables['calendar_dates'] = read_csv(my_zip.open('calendar_dates.txt'), dtype={'service_id': str})
+                _LOGGER.info(f"Loaded calendar_dates.txt ({len(tables['calendar_dates'])} entries)")
+            except KeyError:
+                tables['calendar_dates'] = pandas.DataFrame(columns=['service_id', 'date', 'exception_type'])
+                _LOGGER.info("calendar_dates.txt not found in GTFS, using empty DataFrame")
 
-        # Try exact match first
-        final_results = results[results['service_id'].isin(service_ids)].copy()
+        if mode == "filtered":
+            self._keep_referenced_trips(tables)
+        self._denormalize_trips(tables['stop_times'], tables['trips'])
+        return tables
 
-        # If no results, try fuzzy match (many agencies append extra info to service_id in trips.txt)
-        if final_results.empty and not results.empty:
-            base_service_ids = [str(sid).split('-')[0] for sid in service_ids]
-            final_results = results[results['service_id'].astype(str).str.split('-').str[0].isin(base_service_ids)].copy()
+    @staticmethod
+    def _read_trips(my_zip: zipfile.ZipFile, compact: bool) -> pandas.DataFrame:
+        """Read trips.txt. In compact mode, only the used columns are kept, as categoricals."""
+        if not compact:
+            return read_csv(
+                my_zip.open('trips.txt'),
+                dtype={'trip_id': str, 'service_id': str, 'route_id': str}
+            )
+        return read_csv(
+            my_zip.open('trips.txt'),
+            usecols=lambda column: column in TRIPS_COLUMNS,
+            dtype={'trip_id': str, 'service_id': 'category', 'route_id': 'category', 'trip_headsign': 'category'}
+        )
 
-        return final_results
+    @staticmethod
+    def _read_stop_times(my_zip: zipfile.ZipFile, trips: pandas.DataFrame, compact: bool) -> pandas.DataFrame:
+        """Read stop_times.txt, indexed by stop_id, with arrival times as int32 seconds (arrival_secs).
+
+        In compact mode, only the used columns are read, the arrival_time strings are dropped
+        and trip_id is stored as a categorical whose codes point into trips.
+        """
+        if not compact:
+            stop_times = read_csv(
+                my_zip.open('stop_times.txt'),
+                dtype={'stop_id': str, 'trip_id': str},
+                index_col='stop_id'
+            )
+            stop_times['arrival_secs'] = parse_gtfs_times(stop_times['arrival_time'])
+            return stop_times
+
+        stop_times = read_csv(
+            my_zip.open('stop_times.txt'),
+            usecols=['trip_id', 'arrival_time', 'stop_id'],
+            dtype={
+                'stop_id': 'category',
+                'trip_id': pandas.CategoricalDtype(trips['trip_id'].unique()),
+                'arrival_time': 'category',
+            },
+            index_col='stop_id'
+        )
+        stop_times['arrival_secs'] = parse_gtfs_times(stop_times['arrival_time'])
+        return stop_times.drop(columns=['arrival_time'])
 
+    @staticmethod
+    def _read_filtered_stop_times(my_zip: zipfile.ZipFile, trips: pandas.DataFrame, stop_ids: set[str]) -> pandas.DataFrame:
+        """Stream stop_times.txt in chunks and keep the rows of the given stops, in the compact layout."""
+        reader = read_csv(
+            my_zip.open('stop_times.txt'),
+            usecols=['trip_id', 'arrival_time', 'stop_id'],
+            dtype={'stop_id': str, 'trip_id': str, 'arrival_time': str},
+            chunksize=STOP_TIMES_CHUNK_SIZE,
+        )
+        chunks = [chunk[chunk['stop_id'].isin(stop_ids)] for chunk in reader]
+        if chunks:
+            stop_times = pandas.concat(chunks, ignore_index=True)
+        else:
+            stop_times = pandas.DataFrame(columns=['trip_id', 'arrival_time', 'stop_id'], dtype=str)
 
-    def _calculate_arrival_datetimes(self, schedule, date):
-        """Calculate the arrival datetimes for the schedule."""
-        
-        def calculate_arrival(row):
-            try:
-                time_str = row["arrival_time"]
-                h, m, s = map(int, time_str.split(':'))
-                # GTFS allows times like 25:30:00 for trips that start on one day 
-                # and end on the next. h can be >= 24.
-                return datetime.datetime.combine(date, datetime.time.min) + datetime.timedelta(hours=h, minutes=m, seconds=s)
-            except (ValueError, TypeError) as e:
-                _LOGGER.error(f"Error calculating arrival datetime for {row.get('arrival_time')}: {e}")
-                return None
-
-        schedule['arrival_datetime'] = schedule.apply(calculate_arrival, axis=1)
-        return schedule.dropna(subset=['arrival_datetime']).sort_values(by=['arrival_datetime'])
-
-    def _get_stop_date_range(self, stop_id: str):
-        """Find the oldest and newest dates in the schedule for a given stop_id."""
-        # 1. Get all trip_ids for this stop
-        stop_id_str = str(stop_id)
-        stop_times_for_stop = self.stop_times.loc[self.stop_times.index == stop_id_str]
-        if stop_times_for_stop.empty:
-            return None, None
-        
-        trip_ids = stop_times_for_stop['trip_id'].unique()
-        
-        # 2. Get all service_ids for these trips
-        service_ids = self.trips[self.trips['trip_id'].isin(trip_ids)]['service_id'].unique()
-        
-        # 3. Find date ranges in calendar.txt
-        relevant_calendar = self.calendar[self.calendar['service_id'].isin(service_ids)]
-        min_date = relevant_calendar['start_date'].min() if not relevant_calendar.empty else None
-        max_date = relevant_calendar['end_date'].max() if not relevant_calendar.empty else None
-        
-        # 4. Find date ranges in calendar_dates.txt
-        if not self.calendar_dates.empty:
-            relevant_dates = self.calendar_dates[self.calendar_dates['service_id'].isin(service_ids)]
-            if not relevant_dates.empty:
-                min_exception = relevant_dates['date'].min()
-                max_exception = relevant_dates['date'].max()
-                
-                if min_date is None or min_exception < min_date:
-                    min_date = min_exception
-                if max_date is None or max_exception > max_date:
-                    max_date = max_exception
-        
-        return min_date, max_date
+        stop_times['stop_id'] = stop_times['stop_id'].astype('category')
+        stop_times['trip_id'] = stop_times['trip_id'].astype(pandas.CategoricalDtype(trips['trip_id'].unique()))
+        stop_times['arrival_secs'] = parse_gtfs_times(stop_times['arrival_time'])
+        return stop_times.drop(columns=['arrival_time']).set_index('stop_id')
 
-    def get_next_stop(self, stop_id: str, parm_datetime: datetime.datetime, stop_code: str | None = None, is_lookahead: bool = False, target_route: str | None = None, target_direction: str | None = None) -> Series | None:
-        """Retrieve the next stop information, optionally looking ahead to the next day."""
-        self.refresh()
-        
-        stop_id = str(stop_id)
+    @staticmethod
+    def _keep_referenced_trips(tables: dict[str, pandas.DataFrame]) -> None:
+        """Drop the trips and services that none of the kept stop_times reference."""
+        stop_times = tables['stop_times']
+        trips = tables['trips']
+        trips = trips[trips['trip_id'].isin(stop_times['trip_id'].dropna().unique())].reset_index(drop=True)
+        for column in trips.select_dtypes('category'):
+            trips[column] = trips[column].cat.remove_unused_categories()
+        tables['trips'] = trips
+        stop_times['trip_id'] = stop_times['trip_id'].cat.set_categories(trips['trip_id'])
+
+        # Compare base service_ids, as trips.txt may append extra info to those of the calendar
+        bases = base_service_ids(trips['service_id'].astype(str))
+        for name in ('calendar', 'calendar_dates'):
+            table = tables[name]
+            tables[name] = table[numpy.isin(base_service_ids(table['service_id'].astype(str)), bases)].reset_index(drop=True)
 
-        # If stop_code isn't provided, try to find it from stop_id (inefficient but good for logs)
-        if stop_code is None and not self.stops.empty:
-            matches = self.stops[self.stops['stop_id'] == stop_id]
-            if not matches.empty:
-                stop_code = matches.index[0]
+    @staticmethod
+    def _denormalize_trips(stop_times: pandas.DataFrame, trips: pandas.DataFrame) -> None:
+        """Copy route_id, service_id and trip_headsign of each trip onto stop_times, as categoricals.
+
+        The codes point into small per-column lookup tables, so no query needs to join with trips.
+        """
+        trip_rows = pandas.Index(trips['trip_id']).get_indexer(stop_times['trip_id'])
+        for column in ('route_id', 'service_id', 'trip_headsign'):
+            if column not in trips:
+                continue
+            values = pandas.Categorical(trips[column])
+            codes = numpy.where(trip_rows >= 0, values.codes[trip_rows], -1)
+            stop_times[column] = pandas.Categorical.from_codes(codes, values.categories)
 
-        display_stop = f"{stop_code} (ID: {stop_id})" if stop_code else f"ID: {stop_id}"
-        _LOGGER.info(f"Retrieving next stop for stop {display_stop} at {parm_datetime} (Method: {config.retrieval_method})")
+    def refresh(self, force=False):
+        """Check if data needs to be refreshed and reload if necessary.
+
+        Queries keep being served from the current feed while the new one is built.
+        """
+        with self._load_lock:
+            with ENGINE_STAGE_DURATION.time('refresh_check'):
+                expired = force or is_file_expired(self.file_path) or self._feed_store_replaced()
+            if expired:
+                _LOGGER.info(f"Refreshing GTFS data (force={force})...")
+                self._load_data(force_download=force)
+
+    @property
+    def snapshot_age(self) -> datetime.timedelta | None:
+        """How long ago the GTFS data being served was loaded, or None if nothing is loaded."""
+        age = self._feed.age
+        return datetime.timedelta(seconds=age) if age is not None else None
+
+    def start_background_refresh(self, interval: float = GTFS_REFRESH_INTERVAL) -> None:
+        """Check for expired GTFS data every interval seconds in a background thread."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_stop.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(interval,), name="gtfs-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+        _LOGGER.info(f"Started background GTFS refresh (every {interval}s)")
+
+    def stop_background_refresh(self) -> None:
+        """Stop the background refresh thread and wait for it to exit."""
+        self._refresh_stop.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    def _refresh_loop(self, interval: float) -> None:
+        while not self._refresh_stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                _LOGGER.error(f"Background GTFS refresh failed: {e}. Still serving data loaded {self.snapshot_age} ago.")
 
-        if config.retrieval_method != "live" and not self.stops.empty:
+    @staticmethod
+    def _download_gtfs_file(zipfile_location) -> bool:
+        """ Download the GTFS file from the website, write it on disk.
+
+        The request is conditional on the ETag / Last-Modified of the previous download, and the
+        zip is streamed to a temporary file that replaces the current one only once it is complete
+        and valid. Returns False if the server reports that the feed did not change.
+        """
+        metadata_file = f"{zipfile_location}.meta.json"
+        metadata = settings_from_file(metadata_file) if os.path.isfile(zipfile_location) else {}
+        headers = {}
+        if metadata and metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata and metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+
+        with requests.get(GTFS_URL, headers=headers, allow_redirects=True, timeout=60, stream=True) as response:
+            if response.status_code == 304:
+                _LOGGER.info(f"GTFS feed at [{GTFS_URL}] not modified since the last download")
+                # Restart the expiry clock of the current file
+                os.utime(zipfile_location)
+                return False
+            response.raise_for_status()
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(zipfile_location) or ".", suffix=".tmp")
             try:
-                today_service_ids = self._get_service_ids(parm_datetime.date())
-                today_schedule = self._get_today_schedule(today_service_ids, stop_id)
+                with os.fdopen(fd, 'wb') as my_zip:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        my_zip.write(chunk)
+                with zipfile.ZipFile(tmp_path) as downloaded:
+                    bad_member = downloaded.testzip()
+                if bad_member is not None:
+                    raise zipfile.BadZipFile(f"Corrupted member {bad_member} in the downloaded GTFS zip")
+                os.replace(tmp_path, zipfile_location)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+            settings_from_file(metadata_file, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            })
+        return True
+
+    def get_stop_id(self, stop_code: int) -> str | None:
+        """ Retrieve the stop_id based on a stop_code """
+        stop_lookup = self._feed.stop_lookup
+        if not len(stop_lookup):
+            _LOGGER.debug(f"Stops data is empty, cannot resolve stop_code {stop_code}")
+            return None
 
-                if today_schedule.empty:
-                    raise NoServiceFoundError(f"Empty schedule for service_ids {today_service_ids}")
+        stop_id = stop_lookup.stop_id(stop_code)
+        if stop_id is None:
+            _LOGGER.error(f"Stop code {stop_code} not found in the GTFS data.")
+        return stop_id
+
+    @ENGINE_STAGE_DURATION.time('service_resolution')
+    def _get_service_mask(self, date: datetime.date, stop_id: str, feed: GtfsFeed | None = None):
+        """Build the departure index service mask of a date for a stop, falling back to base service_id matching."""
+        feed = feed or self._feed
+        day_masks = self._get_day_service_masks(date, feed)
+        if day_masks is None:
+            raise NoServiceFoundError(f"No service found for date {date}")
 
-                today_schedule_with_arrivals = self._calculate_arrival_datetimes(today_schedule, parm_datetime.date())
+        service_mask = self._select_service_mask(stop_id, day_masks, feed)
+        if service_mask is None:
+            active = feed.service_calendar.active_mask(date)
+            raise NoServiceFoundError(f"Empty schedule for service_ids {feed.service_calendar.service_ids[active].tolist()}")
+        return service_mask
 
-                # Apply filters if provided
-                if target_route:
-                    today_schedule_with_arrivals = today_schedule_with_arrivals[today_schedule_with_arrivals['route_id'].astype(str) == str(target_route)]
-                
-                if target_direction:
-                    today_schedule_with_arrivals = today_schedule_with_arrivals[today_schedule_with_arrivals['trip_headsign'].str.contains(target_direction, case=False, na=False)]
+    @staticmethod
+    def _get_day_service_masks(date: datetime.date, feed: GtfsFeed) -> tuple | None:
+        """Departure index masks of the services running on a date, matched on exact and on base service_ids.
+
+        Returns None if no service runs that day. The masks do not depend on the stop, so a batch
+        of lookups shares them.
+        """
+        active = feed.service_calendar.active_mask(date)
+        if not active.any():
+            return None
+        return feed.service_matcher.exact_mask(active), feed.service_matcher.base_mask(active)
 
-                next_stop = today_schedule_with_arrivals[today_schedule_with_arrivals['arrival_datetime'] > parm_datetime]
+    @staticmethod
+    def _select_service_mask(stop_id: str, day_masks: tuple, feed: GtfsFeed):
+        """Pick the exact service mask of a day for a stop, or else the base one; None if neither serves it."""
+        index = feed.departure_index
+        for service_mask in day_masks:
+            # Many agencies append extra info to service_id in trips.txt: the base mask comes second
+            if index.has_service(stop_id, service_mask):
+                return service_mask
+        return None
+
+    def _find_next_departures(self, stop_id: str, parm_datetime: datetime.datetime, service_mask,
+                              target_route: str | None = None, target_direction: str | None = None,
+                              feed: GtfsFeed | None = None, service_date: datetime.date | None = None,
+                              lookahead_days: int = 0, limit: int = 1) -> list[Series]:
+        """Look up the first departures after parm_datetime in the departure index, at most limit.
+
+        service_mask selects the services of service_date, the day of parm_datetime by default.
+        """
+        feed = feed or self._feed
+        index = feed.departure_index
+        service_day = datetime.datetime.combine(service_date or parm_datetime.date(), datetime.time.min)
+        after_secs = (parm_datetime - service_day).total_seconds()
+        # Plain clock reads: a timer block per stage would cost about as much as the search itself
+        start = time.perf_counter()
+        trip_mask = index.trip_filter(target_route, target_direction) if target_route or target_direction else None
+        filtered = time.perf_counter()
+        positions = index.next_departures(stop_id, after_secs, service_mask, trip_mask, limit)
+        searched = time.perf_counter()
+        departures = [self._departure_row(position, service_day, feed, lookahead_days) for position in positions]
+        if trip_mask is not None:
+            ENGINE_STAGE_DURATION.observe(filtered - start, 'filtering')
+        ENGINE_STAGE_DURATION.observe(searched - filtered, 'departure_search')
+        ENGINE_STAGE_DURATION.observe(time.perf_counter() - searched, 'arrival_computation')
+        return departures
+
+    def _find_previous_day_departures(self, stop_id: str, parm_datetime: datetime.datetime,
+                                      target_route: str | None = None, target_direction: str | None = None,
+                                      feed: GtfsFeed | None = None, limit: int = 1) -> list[Series]:
+        """Look up the first departures after parm_datetime among the trips of the previous service day.
+
+        GTFS times like 25:30:00 run past midnight, so right after midnight the previous day's
+        trips may still stop. Stops whose last departure is before midnight are skipped for free.
+        """
+        feed = feed or self._feed
+        service_date = parm_datetime.date() - datetime.timedelta(days=1)
+        after_secs = (parm_datetime - datetime.datetime.combine(service_date, datetime.time.min)).total_seconds()
+        last_arrival_secs = feed.departure_index.last_arrival_secs(stop_id)
+        if last_arrival_secs is None or last_arrival_secs <= after_secs:
+            return []
+        try:
+            service_mask = self._get_service_mask(service_date, stop_id, feed)
+        except NoServiceFoundError:
+            return []
+        return self._find_next_departures(stop_id, parm_datetime, service_mask, target_route, target_direction, feed,
+                                          service_date, limit=limit)
+
+    def _find_departures_ahead(self, stop_id: str, parm_datetime: datetime.datetime, days: int,
+                               target_route: str | None = None, target_direction: str | None = None,
+                               feed: GtfsFeed | None = None, limit: int = 1, first_day: int = 1) -> list[Series]:
+        """Look up the first departures of the following days, from first_day up to days ahead of parm_datetime.
+
+        Each day only costs a service bitmap row and an index search, and the search stops at the
+        last day the stop has service or once limit departures are found.
+        """
+        feed = feed or self._feed
+        _, last_date = self._get_stop_date_range(stop_id, feed)
+        if last_date is None:
+            return []
+        last_date = datetime.datetime.strptime(str(last_date), '%Y%m%d').date()
+
+        departures = []
+        for days_ahead in range(first_day, days + 1):
+            date = parm_datetime.date() + datetime.timedelta(days=days_ahead)
+            if date > last_date or len(departures) >= limit:
+                break
+            try:
+                service_mask = self._get_service_mask(date, stop_id, feed)
+            except NoServiceFoundError:
+                continue
+            day_start = datetime.datetime.combine(date, datetime.time.min)
+            departures += self._find_next_departures(stop_id, day_start, service_mask, target_route, target_direction,
+                                                     feed, lookahead_days=days_ahead, limit=limit - len(departures))
+        return departures
+
+    @ENGINE_STAGE_DURATION.time('scraper_fallback')
+    def _find_live_departures(self, stop_id: str, parm_datetime: datetime.datetime, target_route: str | None = None,
+                              target_direction: str | None = None, lookahead_days: int = 0,
+                              limit: int = 1) -> list[Series]:
+        """Look up the first departures after parm_datetime, on the same day, with the live scraper."""
+        departures = []
+        live_arrivals = self.scraper.get_schedule(stop_id, parm_datetime.date(), target_route=target_route, target_direction=target_direction)
+        if live_arrivals:
+            _LOGGER.info(f"Found {len(live_arrivals)} arrivals via live scraper for stop {stop_id} on {parm_datetime.date()}")
+            for arrival_obj in live_arrivals:
+                if arrival_obj['arrival_datetime'] > parm_datetime:
+                    # Return a Series-like object compatible with existing code
+                    departures.append(Series({
+                        'arrival_datetime': arrival_obj['arrival_datetime'],
+                        'arrival_time': arrival_obj['arrival_time'],
+                        'route_id': arrival_obj['route_id'],
+                        'trip_headsign': arrival_obj['trip_headsign'],
+                        'retrieve_method': 'live scraper',
+                        'lookahead_days': lookahead_days,
+                    }))
+                    if len(departures) >= limit:
+                        break
+        return departures
+
+    def _departure_row(self, position: int, service_day: datetime.datetime, feed: GtfsFeed | None = None,
+                       lookahead_days: int = 0) -> Series:
+        """Describe one departure of the index as a Series, like a row of the stop schedule.
+
+        The values are laid on the shared DEPARTURE_FIELDS index: building a Series from a dict,
+        or adding fields afterwards, costs several times more.
+        """
+        feed = feed or self._feed
+        index = feed.departure_index
+        arrival_secs = int(index.arrival_secs[position])
+        return Series([
+            index.trip_id(position),
+            format_gtfs_time(arrival_secs),
+            str(index.route_ids[index.route_codes[position]]),
+            str(index.service_ids[index.service_codes[position]]),
+            index.headsign(position),
+            service_day + datetime.timedelta(seconds=arrival_secs),
+            'GTFS',
+            lookahead_days,
+        ], index=DEPARTURE_FIELDS, dtype=object)
+
+    def _get_stop_date_range(self, stop_id: str, feed: GtfsFeed | None = None) -> tuple[int | None, int | None]:
+        """Find the first and last dates (YYYYMMDD) the schedule serves a given stop_id."""
+        feed = feed or self._feed
+        if feed.stop_coverage is None:
+            return None, None
+        return feed.stop_coverage.date_range(feed.departure_index.stop_position(stop_id))
+
+    def get_next_stop(self, stop_id: str, parm_datetime: datetime.datetime, stop_code: str | None = None, is_lookahead: bool = False, target_route: str | None = None, target_direction: str | None = None, live: bool = True) -> Series | None:
+        """Retrieve the next stop information, looking ahead up to GTFS_LOOKAHEAD_DAYS days.
+
+        The returned Series tells in lookahead_days how many days after parm_datetime the
+        departure was found. With is_lookahead, only the day of parm_datetime is searched.
+        """
+        departures = self.get_next_departures(stop_id, parm_datetime, limit=1, stop_code=stop_code, is_lookahead=is_lookahead,
+                                              target_route=target_route, target_direction=target_direction, live=live)
+        return departures[0] if departures else None
+
+    def get_next_departures(self, stop_id: str, parm_datetime: datetime.datetime, limit: int = 1, stop_code: str | None = None, is_lookahead: bool = False, target_route: str | None = None, target_direction: str | None = None, live: bool = True) -> list[Series]:
+        """Retrieve the next departures of a stop after parm_datetime, at most limit, in time order.
+
+        GTFS departures come from one slice of the departure index per service day: the previous
+        service day and the day of parm_datetime, then the following days until limit is reached.
+        The live scraper answers when GTFS has nothing for the day of parm_datetime, then for the
+        next day, unless live is False (see needs_live_lookup). Only after that are the days up to
+        GTFS_LOOKAHEAD_DAYS ahead searched.
+        """
+        # Serve the whole query from one feed, even if a refresh swaps it meanwhile
+        feed = self._feed
+        stop_id = str(stop_id)
 
-                if not next_stop.empty:
-                    result = next_stop.iloc[0].copy()
-                    result['retrieve_method'] = 'GTFS'
-                    return result
+        # If stop_code isn't provided, find it from stop_id for the logs
+        if stop_code is None:
+            stop_code = feed.stop_lookup.stop_code(stop_id)
 
-                _LOGGER.info(f"No more buses matching filters in GTFS for stop {display_stop} after {parm_datetime}")
+        display_stop = f"{stop_code} (ID: {stop_id})" if stop_code else f"ID: {stop_id}"
+        _LOGGER.info(f"Retrieving next {limit} departure(s) for stop {display_stop} at {parm_datetime} (Method: {config.retrieval_method})")
+
+        departures = []
+        use_gtfs = config.retrieval_method != "live" and not feed.stops.empty
+        if use_gtfs:
+            # After-midnight trips of the previous service day compete with those of today
+            departures = self._find_previous_day_departures(stop_id, parm_datetime, target_route, target_direction, feed, limit)
+            try:
+                service_mask = self._get_service_mask(parm_datetime.date(), stop_id, feed)
+
+                departures += self._find_next_departures(stop_id, parm_datetime, service_mask, target_route, target_direction,
+                                                         feed, limit=limit)
+                if not departures:
+                    _LOGGER.info(f"No more buses matching filters in GTFS for stop {display_stop} after {parm_datetime}")
 
             except NoServiceFoundError as e:
                 _LOGGER.info(f"GTFS check failed for {parm_datetime.date()}: {e}")
-                if config.transit == "RTL":
+                if config.transit == "RTL" and not departures:
                     _LOGGER.info("Trying live scraper fallback...")
+
+            departures = sorted(departures, key=lambda departure: departure['arrival_datetime'])[:limit]
+            if len(departures) >= limit:
+                return departures
         else:
             if config.transit == "RTL":
                 _LOGGER.info("Skipping GTFS check as RETRIEVAL_METHOD is 'live'")
@@ -293,31 +668,103 @@ class ParseTransitData:
                 _LOGGER.warning(f"RETRIEVAL_METHOD is 'live' but scraper is not available for {config.transit}. No data will be retrieved.")
 
         # Fallback to Hastus Scraper (RTL Only)
-        if config.transit == "RTL":
-            live_arrivals = self.scraper.get_schedule(stop_id, parm_datetime.date(), target_route=target_route, target_direction=target_direction)
-            if live_arrivals:
-                _LOGGER.info(f"Found {len(live_arrivals)} arrivals via live scraper for stop {display_stop}")
-                for arrival_obj in live_arrivals:
-                    if arrival_obj['arrival_datetime'] > parm_datetime:
-                        # Return a Series-like object compatible with existing code
-                        return Series({
-                            'arrival_datetime': arrival_obj['arrival_datetime'],
-                            'arrival_time': arrival_obj['arrival_time'],
-                            'route_id': arrival_obj['route_id'],
-                            'trip_headsign': arrival_obj['trip_headsign'],
-                            'retrieve_method': 'live scraper'
-                        })
+        if live and config.transit == "RTL" and not departures:
+            departures = self._find_live_departures(stop_id, parm_datetime, target_route, target_direction, limit=limit)
+            if departures:
+                return departures
 
         # --- Look-ahead logic ---
         if not is_lookahead:
-            _LOGGER.info(f"No more buses for {parm_datetime.date()}. Checking next day...")
-            # Create a datetime for the beginning of the next day
-            next_day_start = datetime.datetime.combine(
-                parm_datetime.date() + datetime.timedelta(days=1),
-                datetime.time.min
-            )
-            return self.get_next_stop(stop_id, next_day_start, stop_code=stop_code, is_lookahead=True, target_route=target_route, target_direction=target_direction)
+            # The next day, from GTFS then from the live scraper, as for the day of parm_datetime
+            lookahead_days = GTFS_LOOKAHEAD_DAYS if use_gtfs else 0
+            if lookahead_days > 0:
+                _LOGGER.info(f"No more buses for {parm_datetime.date()}. Checking next day...")
+                departures += self._find_departures_ahead(stop_id, parm_datetime, 1, target_route, target_direction,
+                                                          feed, limit - len(departures))
+
+            if live and config.transit == "RTL" and not departures:
+                _LOGGER.info(f"No more buses for {parm_datetime.date()}. Checking next day with the live scraper...")
+                next_day_start = datetime.datetime.combine(
+                    parm_datetime.date() + datetime.timedelta(days=1),
+                    datetime.time.min
+                )
+                departures = self._find_live_departures(stop_id, next_day_start, target_route, target_direction,
+                                                        lookahead_days=1, limit=limit)
+                if departures:
+                    return departures
+
+            # Only then the following days of the GTFS schedule, in one pass over the service bitmap
+            if lookahead_days > 1 and len(departures) < limit:
+                _LOGGER.info(f"Checking the GTFS schedule up to {lookahead_days} days after {parm_datetime.date()}...")
+                departures += self._find_departures_ahead(stop_id, parm_datetime, lookahead_days, target_route,
+                                                          target_direction, feed, limit - len(departures), first_day=2)
+
+            if departures and departures[0]['lookahead_days'] > 0:
+                _LOGGER.info(f"Found next bus for stop {display_stop} {departures[0]['lookahead_days']} day(s) ahead, on {departures[0]['arrival_datetime'].date()}")
 
-        min_d, max_d = self._get_stop_date_range(stop_id)
-        _LOGGER.error(f"No service found for {parm_datetime.date()} (GTFS & Live). Global GTFS range: {self.min_date} to {self.max_date}. Stop {display_stop} range: {min_d} to {max_d}")
-        return None
\ No newline at end of file
+        if not departures and not self.needs_live_lookup(departures, live):
+            min_d, max_d = self._get_stop_date_range(stop_id, feed)
+            _LOGGER.error(f"No service found for {parm_datetime.date()} (GTFS & Live). Global GTFS range: {feed.min_date} to {feed.max_date}. Stop {display_stop} range: {min_d} to {max_d}")
+        return departures
+
+    @staticmethod
+    def needs_live_lookup(departures: list, live: bool = False) -> bool:
+        """Tell whether the live scraper may change departures found with live=False.
+
+        The scraper is only consulted, for RTL, when GTFS has no departure on the day asked for,
+        so GTFS-only departures that include one from that day are final.
+        """
+        return (not live and config.transit == "RTL"
+                and not any(departure['lookahead_days'] == 0 for departure in departures))
+
+    def get_next_stops(self, stop_requests, at: datetime.datetime, live: bool = True) -> list[Series | None]:
+        """Retrieve the next stop information of many (stop_id, target_route, target_direction) requests.
+
+        Returns one result per request, in order, as get_next_stop would. The GTFS lookups share a
+        single feed and service resolution for the day of at and the previous service day. Only
+        the requests GTFS cannot answer that day go through get_next_stop, for the live scraper and
+        the look-ahead.
+        """
+        feed = self._feed
+        stop_requests = [(str(stop_id), target_route, target_direction)
+                         for stop_id, target_route, target_direction in stop_requests]
+        results = [None] * len(stop_requests)
+
+        if config.retrieval_method != "live" and not feed.stops.empty:
+            index = feed.departure_index
+            service_days = []
+            with ENGINE_STAGE_DURATION.time('service_resolution'):
+                for days_back in (1, 0):
+                    service_date = at.date() - datetime.timedelta(days=days_back)
+                    day_masks = self._get_day_service_masks(service_date, feed)
+                    if day_masks is not None:
+                        service_day = datetime.datetime.combine(service_date, datetime.time.min)
+                        service_days.append((service_day, (at - service_day).total_seconds(), day_masks))
+
+            batch_start = time.perf_counter()
+            for pos, (stop_id, target_route, target_direction) in enumerate(stop_requests):
+                trip_mask = index.trip_filter(target_route, target_direction) if target_route or target_direction else None
+                last_arrival_secs = index.last_arrival_secs(stop_id)
+                best = None
+                for service_day, after_secs, day_masks in service_days:
+                    if last_arrival_secs is None or last_arrival_secs <= after_secs:
+                        continue
+                    service_mask = self._select_service_mask(stop_id, day_masks, feed)
+                    if service_mask is None:
+                        continue
+                    positions = index.next_departures(stop_id, after_secs, service_mask, trip_mask)
+                    if not len(positions):
+                        continue
+                    arrival = service_day + datetime.timedelta(seconds=int(index.arrival_secs[positions[0]]))
+                    if best is None or arrival < best[0]:
+                        best = (arrival, positions[0], service_day)
+                if best is not None:
+                    results[pos] = self._departure_row(best[1], best[2], feed)
+            ENGINE_STAGE_DURATION.observe(time.perf_counter() - batch_start, 'batch_search')
+            _LOGGER.info(f"Answered {sum(result is not None for result in results)} of {len(stop_requests)} next stop requests from GTFS at {at}")
+
+        for pos, (stop_id, target_route, target_direction) in enumerate(stop_requests):
+            if results[pos] is None:
+                results[pos] = self.get_next_stop(stop_id, at, target_route=target_route, target_direction=target_direction,
+                                                  live=live)
+        return results
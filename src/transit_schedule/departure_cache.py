@@ -0,0 +1,53 @@
+import datetime
+import hashlib
+import threading
+
+
+class DepartureCache:
+    """Next departures by (stop_id, target_route, target_direction), valid until the bus leaves.
+
+    The first departure after t0 stays the first departure after any later t until it leaves,
+    so a cached answer only expires at its arrival_datetime, or when the feed it was read from
+    is replaced (feed_version). Only the countdown has to be recomputed per request.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, now: datetime.datetime, feed_version):
+        """Return the cached departure of key if it has not left yet and comes from feed_version, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == feed_version and entry[1].arrival_datetime > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, departure, feed_version) -> None:
+        """Cache the departure of key; None results (no more buses) are not cached."""
+        if departure is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                # Evict the oldest entry, which is also the likeliest to have expired
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (feed_version, departure)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def departure_etag(*parts) -> str:
+    """Derive an entity tag from what identifies a departure, not from its countdown."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+
+
+def seconds_until(departure, now: datetime.datetime) -> int:
+    """Whole seconds until a departure leaves, for Cache-Control max-age."""
+    return max(int((departure.arrival_datetime - now).total_seconds()), 0)
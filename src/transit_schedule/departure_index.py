@@ -0,0 +1,200 @@
+import collections
+import threading
+
+import numpy
+import pandas
+
+# Number of (route, direction) trip filters kept per index
+TRIP_FILTER_CACHE_SIZE = 256
+
+
+def parse_gtfs_times(values) -> numpy.ndarray:
+    """Convert GTFS HH:MM:SS strings to seconds since the start of the service day.
+
+    Hours may exceed 24 for trips running past midnight. Invalid values become -1.
+    Only the distinct strings are parsed, which keeps this cheap on large stop_times tables.
+    """
+    codes, uniques = pandas.factorize(pandas.Series(values, dtype=object))
+    parts = pandas.Series(uniques, dtype=object).astype(str).str.split(':', n=2, expand=True)
+    if parts.shape[1] != 3:
+        return numpy.full(len(codes), -1, dtype=numpy.int32)
+
+    h, m, s = (pandas.to_numeric(parts[i].str.strip(), errors='coerce') for i in range(3))
+    secs = (h * 3600 + m * 60 + s).fillna(-1).to_numpy(dtype=numpy.int64)
+    result = numpy.where(codes >= 0, secs[codes], -1)
+    return result.astype(numpy.int32)
+
+
+def format_gtfs_time(secs: int) -> str:
+    """Format seconds since the start of the service day as a GTFS HH:MM:SS string."""
+    h, rem = divmod(int(secs), 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def _lookup_codes(column) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Split a categorical column into int32 codes (-1 when missing) and its lookup table."""
+    values = pandas.Categorical(column)
+    return values.codes.astype(numpy.int32), numpy.asarray(values.categories.astype(str), dtype=str)
+
+
+def _with_missing(mask: numpy.ndarray) -> numpy.ndarray:
+    """Append a False entry, so that indexing with the missing code -1 never matches."""
+    return numpy.append(mask, False)
+
+
+class DepartureIndex:
+    """Departures of every stop, sorted by arrival time, in CSR layout.
+
+    The departures of the stop at position i of stop_ids are stored contiguously at
+    offsets[i]:offsets[i + 1] of the per-departure arrays, ordered by arrival_secs.
+    route_codes, service_codes and headsign_codes index into the route_ids, service_ids
+    and headsigns lookup tables (-1 when missing), and trip_rows points at the matching
+    row of the trips table, whose trip_ids are kept.
+    """
+
+    # Every attribute is a numpy array, so the index can be saved to and mapped from a feed store
+    ARRAYS = ('stop_ids', 'offsets', 'arrival_secs', 'trip_rows', 'route_codes', 'service_codes', 'headsign_codes',
+              'route_ids', 'service_ids', 'headsigns', 'trip_ids')
+
+    def __init__(self, stop_ids, offsets, arrival_secs, trip_rows, route_codes, service_codes, headsign_codes,
+                 route_ids, service_ids, headsigns, trip_ids):
+        self.stop_ids = stop_ids
+        self.offsets = offsets
+        self.arrival_secs = arrival_secs
+        self.trip_rows = trip_rows
+        self.route_codes = route_codes
+        self.service_codes = service_codes
+        self.headsign_codes = headsign_codes
+        self.route_ids = route_ids
+        self.service_ids = service_ids
+        self.headsigns = headsigns
+        self.trip_ids = trip_ids
+        self._stop_positions = {stop_id: pos for pos, stop_id in enumerate(stop_ids.tolist())}
+        self._trip_filters = collections.OrderedDict()
+        self._trip_filters_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, stop_times: pandas.DataFrame, trips: pandas.DataFrame) -> "DepartureIndex":
+        """Build the index from stop_times and trips.
+
+        stop_times is indexed by stop_id and carries arrival_secs plus the route_id, service_id
+        and trip_headsign of its trip (see ParseTransitData._denormalize_trips).
+        """
+        trip_rows = pandas.Index(trips['trip_id']).get_indexer(stop_times['trip_id'])
+        arrival_secs = stop_times['arrival_secs'].to_numpy()
+        # Rows without a known trip or a valid time can never be served.
+        valid = (trip_rows >= 0) & (arrival_secs >= 0)
+
+        stop_codes, stop_ids = pandas.factorize(stop_times.index[valid], sort=True)
+        order = numpy.lexsort((arrival_secs[valid], stop_codes))
+        offsets = numpy.zeros(len(stop_ids) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(stop_codes, minlength=len(stop_ids)), out=offsets[1:])
+        rows = numpy.flatnonzero(valid)[order]
+
+        route_codes, route_ids = _lookup_codes(stop_times['route_id'])
+        service_codes, service_ids = _lookup_codes(stop_times['service_id'])
+        if 'trip_headsign' in stop_times:
+            headsign_codes, headsigns = _lookup_codes(stop_times['trip_headsign'])
+        else:
+            headsign_codes, headsigns = numpy.full(len(stop_times), -1, dtype=numpy.int32), numpy.array([], dtype=str)
+
+        return cls(
+            stop_ids=numpy.asarray(stop_ids, dtype=str),
+            offsets=offsets,
+            arrival_secs=arrival_secs[rows].astype(numpy.int32),
+            trip_rows=trip_rows[rows].astype(numpy.int32),
+            route_codes=route_codes[rows],
+            service_codes=service_codes[rows],
+            headsign_codes=headsign_codes[rows],
+            route_ids=route_ids,
+            service_ids=service_ids,
+            headsigns=headsigns,
+            trip_ids=numpy.asarray(trips['trip_id'].astype(str), dtype=str),
+        )
+
+    def arrays(self) -> dict[str, numpy.ndarray]:
+        """The arrays of the index, by attribute name."""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def __len__(self) -> int:
+        return len(self.arrival_secs)
+
+    def stop_position(self, stop_id: str) -> int | None:
+        """Return the position of a stop in stop_ids, or None if it has no departures."""
+        return self._stop_positions.get(str(stop_id))
+
+    def stop_range(self, stop_id: str) -> tuple[int, int]:
+        """Return the [start, end) positions of a stop's departures; empty if the stop is unknown."""
+        pos = self.stop_position(stop_id)
+        if pos is None:
+            return 0, 0
+        return int(self.offsets[pos]), int(self.offsets[pos + 1])
+
+    def last_arrival_secs(self, stop_id: str) -> int | None:
+        """Latest arrival of a stop, in seconds from its service day start, or None if it has no departures."""
+        start, end = self.stop_range(stop_id)
+        return int(self.arrival_secs[end - 1]) if end > start else None
+
+    def route_mask(self, route_id: str) -> numpy.ndarray:
+        """Mask over route codes for one route_id."""
+        return _with_missing(self.route_ids == str(route_id))
+
+    def headsign_mask(self, pattern: str) -> numpy.ndarray:
+        """Mask over headsign codes for headsigns containing pattern (case-insensitive, literal text)."""
+        matches = pandas.Series(self.headsigns, dtype=object).str.contains(pattern, case=False, na=False, regex=False)
+        return _with_missing(matches.to_numpy(dtype=bool))
+
+    def trip_id(self, position: int) -> str:
+        """trip_id of the departure at position."""
+        return str(self.trip_ids[self.trip_rows[position]])
+
+    def trip_filter(self, route_id: str | None = None, direction: str | None = None) -> numpy.ndarray:
+        """Mask over trips (trip_rows) of the trips of a route whose headsign contains direction.
+
+        Filters are computed once per (route_id, direction) and cached with the index, so repeated
+        queries with the same stop configuration only do a mask lookup.
+        """
+        key = (route_id and str(route_id), direction)
+        with self._trip_filters_lock:
+            trip_mask = self._trip_filters.get(key)
+            if trip_mask is not None:
+                self._trip_filters.move_to_end(key)
+                return trip_mask
+
+        keep = numpy.ones(len(self), dtype=bool)
+        if route_id:
+            keep &= self.route_mask(route_id)[self.route_codes]
+        if direction:
+            keep &= self.headsign_mask(direction)[self.headsign_codes]
+        trip_mask = numpy.zeros(len(self.trip_ids) + 1, dtype=bool)
+        trip_mask[self.trip_rows[keep]] = True
+
+        with self._trip_filters_lock:
+            self._trip_filters[key] = trip_mask
+            if len(self._trip_filters) > TRIP_FILTER_CACHE_SIZE:
+                self._trip_filters.popitem(last=False)
+        return trip_mask
+
+    def headsign(self, position: int) -> str | None:
+        """Headsign of the departure at position, or None if the trip has none."""
+        code = self.headsign_codes[position]
+        return str(self.headsigns[code]) if code >= 0 else None
+
+    def has_service(self, stop_id: str, service_mask: numpy.ndarray) -> bool:
+        """Tell whether any departure of the stop belongs to a service in the mask."""
+        start, end = self.stop_range(stop_id)
+        return bool(service_mask[self.service_codes[start:end]].any())
+
+    def next_departures(self, stop_id: str, after_secs: float, service_mask: numpy.ndarray,
+                        trip_mask: numpy.ndarray | None = None, limit: int | None = 1) -> numpy.ndarray:
+        """Positions of the first departures strictly after after_secs whose service is in the mask.
+
+        trip_mask (see trip_filter) optionally restricts the trips.
+        """
+        start, end = self.stop_range(stop_id)
+        start += int(numpy.searchsorted(self.arrival_secs[start:end], after_secs, side='right'))
+        keep = service_mask[self.service_codes[start:end]]
+        if trip_mask is not None:
+            keep &= trip_mask[self.trip_rows[start:end]]
+        return start + numpy.flatnonzero(keep)[:limit]
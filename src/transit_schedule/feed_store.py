@@ -0,0 +1,121 @@
+import contextlib
+import json
+import mmap
+import os
+import tempfile
+
+import numpy
+
+from transit_schedule.const import _LOGGER
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+FEED_STORE_VERSION = 1
+_MAGIC = b"TSFEED01"
+# Arrays start on cache line boundaries, so every view is aligned
+_ALIGNMENT = 64
+
+
+def feed_store_path(zip_path: str, variant: str = "") -> str:
+    """Return the feed store location for a GTFS zip, e.g. data/gtfs_stm.compact.feed.
+
+    Unlike snapshots, the name does not depend on the zip content: a refresh replaces the
+    file in place, and the processes mapping it notice the change.
+    """
+    root = os.path.splitext(zip_path)[0]
+    suffix = f".{variant}" if variant else ""
+    return f"{root}{suffix}.feed"
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_feed_store(path: str, arrays: dict[str, numpy.ndarray], meta: dict) -> bool:
+    """Write arrays to a feed store, atomically replacing any previous file.
+
+    The file holds a JSON header followed by the raw, aligned array data, so that
+    open_feed_store can map it without copying.
+    """
+    try:
+        arrays = {name: numpy.ascontiguousarray(array) for name, array in arrays.items()}
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _aligned(offset + array.nbytes)
+        header = json.dumps({"version": FEED_STORE_VERSION, "meta": meta, "arrays": layout}).encode()
+        data_start = _aligned(len(_MAGIC) + 8 + len(header))
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as fdesc:
+                fdesc.write(_MAGIC)
+                fdesc.write(len(header).to_bytes(8, "little"))
+                fdesc.write(header)
+                for name, array in arrays.items():
+                    fdesc.seek(data_start + layout[name]["offset"])
+                    fdesc.write(array.tobytes())
+                fdesc.truncate(data_start + offset)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        _LOGGER.info(f"Saved GTFS feed store to {path}")
+        return True
+    except Exception as e:
+        _LOGGER.warning(f"Could not write GTFS feed store {path}: {e}")
+        return False
+
+
+def open_feed_store(path: str) -> tuple[dict[str, numpy.ndarray], dict] | None:
+    """Map a feed store read-only. Returns (arrays, meta), or None if it is missing or unreadable.
+
+    The arrays are views on the mapping: every process opening the same file shares the
+    same physical pages. They stay valid after the file is replaced.
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as fdesc:
+            if fdesc.read(len(_MAGIC)) != _MAGIC:
+                _LOGGER.info(f"Ignoring {path}, it is not a GTFS feed store")
+                return None
+            header_size = int.from_bytes(fdesc.read(8), "little")
+            header = json.loads(fdesc.read(header_size))
+            if header.get("version") != FEED_STORE_VERSION:
+                _LOGGER.info(f"Ignoring GTFS feed store {path} written by another version")
+                return None
+            mapping = mmap.mmap(fdesc.fileno(), 0, access=mmap.ACCESS_READ)
+
+        data_start = _aligned(len(_MAGIC) + 8 + header_size)
+        arrays = {}
+        for name, layout in header["arrays"].items():
+            dtype = numpy.dtype(layout["dtype"])
+            count = int(numpy.prod(layout["shape"], dtype=numpy.int64))
+            array = numpy.frombuffer(mapping, dtype=dtype, count=count, offset=data_start + layout["offset"])
+            arrays[name] = array.reshape(layout["shape"])
+        return arrays, header["meta"]
+    except Exception as e:
+        _LOGGER.warning(f"Could not read GTFS feed store {path}: {e}")
+        return None
+
+
+@contextlib.contextmanager
+def feed_store_lock(path: str):
+    """Serialize the processes that download and build the same feed store.
+
+    The first one builds the store while the others wait, then find it ready to be mapped.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,140 @@
+import dataclasses
+import datetime
+import time
+
+import numpy
+import pandas
+
+from transit_schedule.departure_index import DepartureIndex
+from transit_schedule.service_calendar import ServiceCalendar, ServiceMatcher
+from transit_schedule.stop_coverage import StopCoverage
+from transit_schedule.stop_lookup import StopLookup
+
+
+@dataclasses.dataclass(frozen=True)
+class GtfsFeed:
+    """One complete, immutable load of the GTFS tables and the structures built from them.
+
+    ParseTransitData serves every query from a single GtfsFeed reference. A refresh builds a
+    new GtfsFeed on the side and swaps the reference, so a query never sees half-replaced data.
+
+    A feed mapped from a feed store only carries what the queries need: the stop codes, the
+    service calendar and the departure index. Its other tables are empty.
+    """
+
+    stops: pandas.DataFrame
+    calendar: pandas.DataFrame
+    stop_times: pandas.DataFrame
+    trips: pandas.DataFrame
+    calendar_dates: pandas.DataFrame
+    service_calendar: ServiceCalendar | None = None
+    departure_index: DepartureIndex | None = None
+    min_date: int | None = None
+    max_date: int | None = None
+    loaded_at: float | None = None
+    # Table layout the feed was loaded with (see ParseTransitData._get_load_variant)
+    variant: str | None = None
+    # Derived from stops, so replacing stops rebuilds it
+    stop_lookup: StopLookup = dataclasses.field(init=False, repr=False)
+    # Derived from the service calendar and the departure index
+    service_matcher: ServiceMatcher | None = dataclasses.field(init=False, repr=False)
+    stop_coverage: StopCoverage | None = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'stop_lookup', StopLookup.build(self.stops))
+        service_matcher = None
+        stop_coverage = None
+        if self.service_calendar is not None and self.departure_index is not None:
+            service_matcher = ServiceMatcher.build(self.service_calendar.service_ids, self.departure_index.service_ids)
+            stop_coverage = StopCoverage.build(self.service_calendar, service_matcher, self.departure_index)
+        object.__setattr__(self, 'service_matcher', service_matcher)
+        object.__setattr__(self, 'stop_coverage', stop_coverage)
+
+    @classmethod
+    def build(cls, tables: dict[str, pandas.DataFrame], variant: str | None = None) -> "GtfsFeed":
+        """Build a feed, with its service calendar and departure index, from the GTFS tables."""
+        return cls(
+            stops=tables['stops'],
+            calendar=tables['calendar'],
+            stop_times=tables['stop_times'],
+            trips=tables['trips'],
+            calendar_dates=tables['calendar_dates'],
+            service_calendar=ServiceCalendar.build(tables['calendar'], tables['calendar_dates']),
+            departure_index=DepartureIndex.build(tables['stop_times'], tables['trips']),
+            # Global schedule range, for diagnostics
+            min_date=tables['calendar']['start_date'].min(),
+            max_date=tables['calendar']['end_date'].max(),
+            loaded_at=time.time(),
+            variant=variant,
+        )
+
+    @classmethod
+    def empty(cls) -> "GtfsFeed":
+        """A feed without any data, used until the first load succeeds."""
+        return cls(
+            stops=pandas.DataFrame(),
+            calendar=pandas.DataFrame(),
+            stop_times=pandas.DataFrame(),
+            trips=pandas.DataFrame(),
+            calendar_dates=pandas.DataFrame(),
+        )
+
+    @classmethod
+    def from_store(cls, arrays: dict[str, numpy.ndarray], meta: dict) -> "GtfsFeed":
+        """Rebuild a feed from the arrays and metadata of a feed store (see store_arrays)."""
+        stop_codes = arrays['stops.stop_code']
+        stops = pandas.DataFrame(
+            {'stop_id': arrays['stops.stop_id']},
+            index=pandas.Index(stop_codes, name='stop_code').where(stop_codes != '', None),
+        )
+        first_date = meta['calendar_first_date']
+        service_calendar = ServiceCalendar(
+            arrays['calendar.service_ids'],
+            datetime.date.fromisoformat(first_date) if first_date else None,
+            arrays['calendar.bitmap'],
+        )
+        departure_index = DepartureIndex(**{name: arrays[f'index.{name}'] for name in DepartureIndex.ARRAYS})
+        empty = cls.empty()
+        return empty.replace(
+            stops=stops,
+            service_calendar=service_calendar,
+            departure_index=departure_index,
+            min_date=meta['min_date'],
+            max_date=meta['max_date'],
+            loaded_at=meta['loaded_at'],
+            variant=meta['variant'],
+        )
+
+    def store_arrays(self) -> tuple[dict[str, numpy.ndarray], dict]:
+        """Describe the feed as the arrays and metadata of a feed store."""
+        arrays = {
+            'stops.stop_code': numpy.asarray(self.stops.index.fillna('').astype(str), dtype=str),
+            'stops.stop_id': numpy.asarray(self.stops['stop_id'].astype(str), dtype=str),
+            'calendar.service_ids': self.service_calendar.service_ids,
+            'calendar.bitmap': self.service_calendar.bitmap,
+        }
+        arrays.update({f'index.{name}': array for name, array in self.departure_index.arrays().items()})
+        first_date = self.service_calendar.first_date
+        meta = {
+            'min_date': _optional_int(self.min_date),
+            'max_date': _optional_int(self.max_date),
+            'calendar_first_date': first_date.isoformat() if first_date else None,
+            'loaded_at': self.loaded_at,
+            'variant': self.variant,
+        }
+        return arrays, meta
+
+    def replace(self, **changes) -> "GtfsFeed":
+        """Return a copy of the feed with some fields replaced."""
+        return dataclasses.replace(self, **changes)
+
+    @property
+    def age(self) -> float | None:
+        """Seconds since this feed was loaded, or None if it never was."""
+        if self.loaded_at is None:
+            return None
+        return time.time() - self.loaded_at
+
+
+def _optional_int(value) -> int | None:
+    return None if pandas.isna(value) else int(value)
@@ -0,0 +1,133 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import numpy
+import pandas
+
+from transit_schedule.const import _LOGGER
+
+SNAPSHOT_VERSION = 4
+
+
+def file_digest(path: str) -> str:
+    """Return the sha256 hex digest of a file, read in chunks."""
+    with open(path, 'rb') as fdesc:
+        return hashlib.file_digest(fdesc, "sha256").hexdigest()
+
+
+def snapshot_path(zip_path: str, digest: str, variant: str = "") -> str:
+    """Return the snapshot location for a GTFS zip, keyed by its content digest.
+
+    The snapshot lives next to the zip, e.g. data/gtfs_stm.<digest>.npz. An optional
+    variant is appended when several table layouts can be built from the same zip.
+    """
+    root = os.path.splitext(zip_path)[0]
+    suffix = f".{variant}" if variant else ""
+    return f"{root}.{digest[:16]}{suffix}.npz"
+
+
+def _encode_column(prefix: str, series: pandas.Series, arrays: dict) -> dict:
+    """Store a column as numpy arrays. Strings become int32 codes plus a categories table."""
+    dtype = series.dtype
+    if isinstance(dtype, pandas.CategoricalDtype) or not pandas.api.types.is_numeric_dtype(dtype):
+        categorical = pandas.Categorical(series)
+        categories = categorical.categories.to_numpy()
+        if categories.dtype == object:
+            categories = categories.astype(str)
+        arrays[f"{prefix}:codes"] = categorical.codes.astype(numpy.int32)
+        arrays[f"{prefix}:categories"] = categories
+        return {"kind": "categorical", "dtype": str(dtype)}
+
+    arrays[f"{prefix}:values"] = series.to_numpy()
+    return {"kind": "values", "dtype": str(dtype)}
+
+
+def _decode_column(prefix: str, column_meta: dict, npz) -> pandas.Series:
+    """Rebuild a column written by _encode_column."""
+    if column_meta["kind"] == "values":
+        return pandas.Series(npz[f"{prefix}:values"])
+
+    categorical = pandas.Categorical.from_codes(npz[f"{prefix}:codes"], npz[f"{prefix}:categories"])
+    series = pandas.Series(categorical)
+    if column_meta["dtype"] != "category":
+        series = series.astype(column_meta["dtype"])
+    return series
+
+
+def save_snapshot(path: str, tables: dict[str, pandas.DataFrame]) -> bool:
+    """Write GTFS tables to a columnar .npz snapshot, atomically replacing any previous file."""
+    try:
+        arrays = {}
+        meta = {"version": SNAPSHOT_VERSION, "pandas": pandas.__version__, "tables": {}}
+        for name, frame in tables.items():
+            index_name = frame.index.name
+            flat = frame.reset_index() if index_name is not None else frame
+            columns = []
+            for pos, column in enumerate(flat.columns):
+                column_meta = _encode_column(f"{name}:{pos}", flat[column], arrays)
+                column_meta["name"] = column
+                columns.append(column_meta)
+            meta["tables"][name] = {"index": index_name, "columns": columns}
+        arrays["__meta__"] = numpy.array(json.dumps(meta))
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as fdesc:
+                numpy.savez(fdesc, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        _LOGGER.info(f"Saved GTFS snapshot to {path}")
+        return True
+    except Exception as e:
+        _LOGGER.warning(f"Could not write GTFS snapshot {path}: {e}")
+        return False
+
+
+def load_snapshot(path: str) -> dict[str, pandas.DataFrame] | None:
+    """Load GTFS tables from a snapshot. Returns None if it is missing, stale or unreadable."""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with numpy.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["__meta__"]))
+            if meta.get("version") != SNAPSHOT_VERSION or meta.get("pandas") != pandas.__version__:
+                _LOGGER.info(f"Ignoring GTFS snapshot {path} written by another version")
+                return None
+
+            tables = {}
+            for name, table_meta in meta["tables"].items():
+                frame = pandas.DataFrame({
+                    column_meta["name"]: _decode_column(f"{name}:{pos}", column_meta, npz)
+                    for pos, column_meta in enumerate(table_meta["columns"])
+                })
+                if table_meta["index"] is not None:
+                    frame = frame.set_index(table_meta["index"])
+                tables[name] = frame
+        return tables
+    except Exception as e:
+        _LOGGER.warning(f"Could not read GTFS snapshot {path}: {e}")
+        return None
+
+
+def remove_stale_snapshots(zip_path: str, keep: str, variant: str = "") -> None:
+    """Delete the snapshots of older versions of the same zip file, in the same variant.
+
+    Snapshots of the other variants stay valid, e.g. for switching back to another load mode.
+    """
+    root = os.path.splitext(zip_path)[0]
+    suffix = f".{variant}" if variant else ""
+    for path in glob.glob(f"{glob.escape(root)}.*{glob.escape(suffix)}.npz"):
+        digest = path[len(root) + 1:-len(f"{suffix}.npz")]
+        if not re.fullmatch(r"[0-9a-f]{16}", digest) or os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            _LOGGER.info(f"Removed stale GTFS snapshot {path}")
+        except OSError as e:
+            _LOGGER.warning(f"Could not remove stale GTFS snapshot {path}: {e}")
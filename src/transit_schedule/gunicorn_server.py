@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+from transit_schedule.const import _LOGGER
+from transit_schedule.metrics import REGISTRY
+from transit_schedule.single_flight import SingleFlight
+
+# Seconds a worker may spend on one request: a scraper fallback with retries can take a while
+WORKER_TIMEOUT = 120
+
+
+def gunicorn_options(port: int, workers: int, threads: int) -> dict:
+    """gunicorn settings for serving the app, preloaded in the master process."""
+    return {
+        'bind': f'0.0.0.0:{port}',
+        'workers': max(workers, 1),
+        'threads': max(threads, 1),
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': WORKER_TIMEOUT,
+    }
+
+
+class GunicornServer(BaseApplication):
+    """Serve the Flask app with gunicorn, loading it once in the master process.
+
+    With preload_app, app_factory (and so the GTFS feed) runs before the workers are forked:
+    they share the feed copy-on-write instead of each loading its own copy. Threads do not
+    survive fork, so each worker starts its own background refresh once forked. The workers
+    share their metrics through a directory created by the master, so that /metrics reports
+    the totals of the server whichever worker answers it.
+    """
+
+    def __init__(self, app_factory, options: dict):
+        self.app_factory = app_factory
+        self.options = options
+        self.application = None
+        self.metrics_dir = None
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('on_starting', self.on_starting)
+        self.cfg.set('post_fork', self.post_fork)
+        self.cfg.set('on_exit', self.on_exit)
+
+    def load(self):
+        if self.application is None:
+            self.application = self.app_factory()
+        return self.application
+
+    def on_starting(self, server):
+        self.metrics_dir = tempfile.mkdtemp(prefix='transit-schedule-metrics-')
+
+    def on_exit(self, server):
+        if self.metrics_dir is not None:
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    def post_fork(self, server, worker):
+        """Share the worker's metrics and start its background refresh of the shared feed."""
+        # Counts recorded by the master, e.g. while warming up, would otherwise be reported by every worker
+        REGISTRY.reset()
+        if self.metrics_dir is not None:
+            REGISTRY.share(self.metrics_dir, worker.pid)
+        transit_data = self.load().extensions.get('transit_data')
+        if transit_data is not None:
+            scraper = getattr(transit_data, 'scraper', None)
+            if scraper is not None:
+                # Drop the connections the master opened, so that workers do not share sockets
+                scraper.session.close()
+                # Fetches the master had in flight have no thread left to finish them, and its counts are not ours
+                scraper.fetches = SingleFlight()
+            _LOGGER.info(f"Worker {worker.pid} starting its GTFS background refresh.")
+            transit_data.start_background_refresh()
@@ -3,6 +3,8 @@ import json
 import logging
 import os
 import re
+import threading
+import urllib.parse
 from typing import Any
 
 import requests
@@ -13,6 +15,8 @@ from urllib3.util.retry import Retry
 
 from transit_schedule.config import config
 from transit_schedule.const import TARGET_DIRECTION, TARGET_ROUTE, TRANSIT
+from transit_schedule.metrics import SCRAPER_CACHE_LOOKUPS, SCRAPER_HTTP_DURATION
+from transit_schedule.single_flight import SingleFlight
 
 _LOGGER = logging.getLogger("transit-schedule")
 _LOGGER.propagate = False # Prevent double logging if parent has a handler
@@ -36,6 +40,12 @@ class HostnameIgnoreAdapter(HTTPAdapter):
             **pool_kwargs
         )
 
+def observe_response_duration(response, *args, **kwargs):
+    """requests response hook recording how long madOper took to answer, by query (the q parameter)."""
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(response.url).query).get('q', ['other'])[0]
+    SCRAPER_HTTP_DURATION.observe(response.elapsed.total_seconds(), query)
+
+
 class HastusScraper:
     BASE_URL = "https://madprep_i.rtl-longueuil.qc.ca/madOper.php"
     CACHE_FILE = "data/hastus_cache.json"
@@ -47,6 +57,9 @@ class HastusScraper:
         self._mappings_fetched = False
         # cache: (stop_id, pattern_id, week_start_date) -> { 'weekday': [...], 'samedi': [...], 'dimanche': [...] }
         self.schedule_cache = {} 
+        # Concurrent requests for the same uncached schedule, or the stop mappings, share one fetch
+        self.fetches = SingleFlight()
+        self._save_lock = threading.Lock()
         
         # Initialize session with custom adapter and retry logic
         self.session = requests.Session()
@@ -59,6 +72,7 @@ class HastusScraper:
         adapter = HostnameIgnoreAdapter(max_retries=retry_strategy)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
+        self.session.hooks['response'].append(observe_response_duration)
         
         if config.force_cache_refresh:
             _LOGGER.info("FORCE_CACHE_REFRESH is enabled. Clearing existing cache file.")
@@ -122,26 +136,32 @@ class HastusScraper:
     def _save_cache(self):
         """Save cache to disk."""
         try:
-            os.makedirs(os.path.dirname(self.CACHE_FILE), exist_ok=True)
-            serializable_data_map = {}
-            for (stop, pattern, week_start), data in self.schedule_cache.items():
-                key_str = f"{stop}|{pattern}|{week_start.isoformat()}"
-                serializable_weekly = {}
-                for cat, times in data.items():
-                    serializable_weekly[cat] = [t.isoformat() for t in times]
-                serializable_data_map[key_str] = serializable_weekly
-            
-            full_cache = {
-                "version": self.CACHE_VERSION,
-                "data": serializable_data_map
-            }
-                
-            with open(self.CACHE_FILE, 'w') as f:
-                json.dump(full_cache, f, indent=2)
-            _LOGGER.info(f"Saved cache (v{self.CACHE_VERSION}) to disk.")
+            with self._save_lock:
+                self._write_cache()
         except Exception as e:
             _LOGGER.error(f"Failed to save cache to disk: {e}")
 
+    def _write_cache(self):
+        """Write the cache file; callers hold _save_lock, so concurrent fetches do not interleave writes."""
+        os.makedirs(os.path.dirname(self.CACHE_FILE), exist_ok=True)
+        serializable_data_map = {}
+        # Other fetches may add entries meanwhile
+        for (stop, pattern, week_start), data in list(self.schedule_cache.items()):
+            key_str = f"{stop}|{pattern}|{week_start.isoformat()}"
+            serializable_weekly = {}
+            for cat, times in data.items():
+                serializable_weekly[cat] = [t.isoformat() for t in times]
+            serializable_data_map[key_str] = serializable_weekly
+
+        full_cache = {
+            "version": self.CACHE_VERSION,
+            "data": serializable_data_map
+        }
+
+        with open(self.CACHE_FILE, 'w') as f:
+            json.dump(full_cache, f, indent=2)
+        _LOGGER.info(f"Saved cache (v{self.CACHE_VERSION}) to disk.")
+
     def fetch_stop_mappings(self):
         """Fetch all stop mappings from the server."""
         try:
@@ -168,10 +188,13 @@ class HastusScraper:
         except Exception as e:
             _LOGGER.error(f"Unexpected error while fetching stop mappings: {e}")
 
+    def _ensure_stop_mappings(self):
+        if not self._mappings_fetched:
+            self.fetches.do('stop_mappings', lambda: self._mappings_fetched or self.fetch_stop_mappings())
+
     def get_stop_code_from_id(self, stop_id: int) -> str | None:
         """Find the public stop code for a given internal stop_id."""
-        if not self._mappings_fetched:
-            self.fetch_stop_mappings()
+        self._ensure_stop_mappings()
         
         target_id_suffix = f":{stop_id}"
         for code, ids in self.stop_mappings.items():
@@ -182,8 +205,7 @@ class HastusScraper:
 
     def get_stop_patterns(self, stop_code: str, stop_id: int | None = None) -> list[dict]:
         """Fetch available patterns/routes for a given stop code."""
-        if not self._mappings_fetched:
-            self.fetch_stop_mappings()
+        self._ensure_stop_mappings()
         
         internal_ids = self.stop_mappings.get(stop_code, [])
         if not internal_ids:
@@ -248,8 +270,13 @@ class HastusScraper:
         def ensure_cached(d):
             week_start = d - datetime.timedelta(days=d.weekday())
             cache_key = (params['stop'], params['pattern'], week_start)
-            if cache_key not in self.schedule_cache:
-                self._fetch_and_cache(params, d, cache_key)
+            if cache_key in self.schedule_cache:
+                SCRAPER_CACHE_LOOKUPS.inc('hit')
+            else:
+                SCRAPER_CACHE_LOOKUPS.inc('miss')
+                # Callers arriving while the week is fetched wait for that fetch instead of repeating it
+                self.fetches.do(cache_key, lambda: cache_key in self.schedule_cache
+                                or self._fetch_and_cache(params, d, cache_key))
             return cache_key
 
         current_key = ensure_cached(date)
@@ -0,0 +1,254 @@
+"""Request handling shared by the HTTP front ends, the Flask app and the asyncio app.
+
+The functions take plain values and return (status, payload, headers) responses, payload being
+None for a 304: each front end only turns them into its own responses, and runs the engine and
+the live scraper its own way.
+"""
+import datetime
+import json
+import re
+
+from transit_schedule.const import _LOGGER
+from transit_schedule.departure_cache import departure_etag, seconds_until
+
+NEXTSTOP_ROUTE = '/transit-schedule/nextstop/<int:stop_code>'
+BATCH_ROUTE = '/transit-schedule/nextstop'
+DEPARTURES_ROUTE = '/transit-schedule/departures/<int:stop_code>'
+# Endpoints polled by probes and scrapers, not logged
+PROBE_ROUTES = ('/health', '/ready', '/metrics')
+
+# Departures returned by /transit-schedule/departures when no limit is given, and the most it returns
+DEFAULT_DEPARTURES_LIMIT = 3
+MAX_DEPARTURES_LIMIT = 20
+# Most stops one /transit-schedule/nextstop batch request may ask for
+MAX_BATCH_STOPS = 100
+
+# Result of a live lookup still running at its deadline
+TIMED_OUT = object()
+# Result of a live lookup refused because too many are queued or running already
+SATURATED = object()
+
+
+def error_response(status: int, message: str) -> tuple:
+    return status, {"error": message}, {}
+
+
+TRANSIT_DATA_MISSING = error_response(500, "Transit data not initialized")
+
+
+def route_pattern(route: str) -> re.Pattern:
+    """Compile a route with <int:name> parameters to a regex matching its paths."""
+    return re.compile(re.sub(r'<int:(\w+)>', r'(?P<\1>\\d+)', route))
+
+
+def log_request(method: str, path: str, remote_addr) -> None:
+    if path not in PROBE_ROUTES:
+        _LOGGER.info(f'Received request: {method} {path} from {remote_addr}')
+
+
+def departure_result(departure, current_datetime: datetime.datetime) -> dict:
+    """Describe a departure for the JSON responses, with its countdown from current_datetime."""
+    difference = departure.arrival_datetime - current_datetime
+    nbr_minutes, nbr_seconds = divmod(difference.total_seconds(), 60)
+    return {
+        'nextstop_nbrmins': int(nbr_minutes),
+        'nextstop_nbrsecs': int(nbr_seconds),
+        'route_id': str(departure.route_id),
+        'arrival_time': str(departure.arrival_time),
+        'trip_headsign': str(departure.trip_headsign),
+    }
+
+
+def stop_lookup(transit_data, stop_code: int):
+    """Return the stop_id of the stop code of a URL and None, or None and the error response."""
+    if stop_code <= 0:
+        return None, error_response(400, "Stop code must be a positive integer")
+    stop_id = transit_data.get_stop_id(stop_code)
+    if stop_id is None:
+        return None, error_response(404, "Stop code not found")
+    return stop_id, None
+
+
+def departures_query(transit_data, stop_code: int, args: dict):
+    """Read a /transit-schedule/departures request with the query string args.
+
+    Returns the stop_id and get_next_departures keyword arguments, or else the error response.
+    """
+    if stop_code <= 0:
+        return None, None, error_response(400, "Stop code must be a positive integer")
+    limit = args.get('limit', str(DEFAULT_DEPARTURES_LIMIT))
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_DEPARTURES_LIMIT:
+        return None, None, error_response(400, f"limit must be an integer between 1 and {MAX_DEPARTURES_LIMIT}")
+    stop_id, error = stop_lookup(transit_data, stop_code)
+    if error:
+        return None, None, error
+    query = {'limit': int(limit), 'stop_code': stop_code, 'target_route': args.get('route') or None,
+             'target_direction': args.get('direction') or None}
+    return stop_id, query, None
+
+
+def stops_from_query(stops: str) -> list[str]:
+    """The stop codes of ?stops=52611,52612."""
+    return [stop for stop in stops.split(',') if stop.strip()]
+
+
+def stops_from_body(body: bytes):
+    """The stops of a JSON body like {"stops": [52611, {"stop_code": 52612, "route": "44"}]}, or None."""
+    try:
+        body = json.loads(body or b'null')
+    except ValueError:
+        return None
+    return body.get('stops') if isinstance(body, dict) else None
+
+
+def batch_stops_error(stops) -> str | None:
+    """Tell what is wrong with the stops list of a batch request, if anything."""
+    if not isinstance(stops, list) or not stops:
+        return "stops must list at least one stop code"
+    if len(stops) > MAX_BATCH_STOPS:
+        return f"At most {MAX_BATCH_STOPS} stops per request"
+    return None
+
+
+def batch_stop_requests(stops, transit_data) -> tuple[list[dict], list[tuple[dict, tuple]]]:
+    """Read the stops of a batch request: stop codes, or dicts with a stop_code and optional route and direction.
+
+    route is a string or an integer and direction a string, matched as plain text in the headsigns.
+    Returns a result per stop, in order, with an error for the invalid or unknown ones, and the
+    (result, (stop_id, route, direction)) pairs of the stops left to look up.
+    """
+    results = []
+    stop_requests = []
+    for stop in stops:
+        stop = stop if isinstance(stop, dict) else {'stop_code': stop}
+        stop_code = str(stop.get('stop_code', '')).strip()
+        result = {'stop_code': int(stop_code) if stop_code.isdigit() else stop_code}
+        results.append(result)
+        if not stop_code.isdigit() or int(stop_code) <= 0:
+            result['error'] = "Stop code must be a positive integer"
+            continue
+        route, direction = stop.get('route'), stop.get('direction')
+        if route is not None and (isinstance(route, bool) or not isinstance(route, (str, int))):
+            result['error'] = "route must be a string or integer"
+            continue
+        if direction is not None and not isinstance(direction, str):
+            result['error'] = "direction must be a string"
+            continue
+        stop_id = transit_data.get_stop_id(int(stop_code))
+        if stop_id is None:
+            result['error'] = "Stop code not found"
+            continue
+        stop_requests.append((result, (stop_id, str(route) if route not in (None, '') else None, direction or None)))
+    return results, stop_requests
+
+
+def lookup_next_stops(transit_data, departure_cache, stop_requests, current_datetime: datetime.datetime,
+                      stop_code=None, live: bool = True):
+    """Next departure of each (stop_id, route, direction), from the cache or else from one engine call.
+
+    stop_code marks a single stop request, looked up with get_next_stop, which also logs it. With
+    live=False the engine answers from GTFS only: the departures that still need the live scraper
+    are not cached, and their positions are returned along the departures.
+    """
+    feed_version = getattr(transit_data, 'loaded_at', None)
+    next_stops = [departure_cache.get(stop_request, current_datetime, feed_version) for stop_request in stop_requests]
+    missing = [pos for pos, next_stop_row in enumerate(next_stops) if next_stop_row is None]
+    if missing and stop_code is not None:
+        stop_id, target_route, target_direction = stop_requests[0]
+        resolved = [transit_data.get_next_stop(stop_id, current_datetime, stop_code=stop_code, target_route=target_route,
+                                               target_direction=target_direction, live=live)]
+    elif missing:
+        resolved = transit_data.get_next_stops([stop_requests[pos] for pos in missing], current_datetime, live=live)
+    else:
+        resolved = []
+    pending = []
+    for pos, next_stop_row in zip(missing, resolved, strict=True):
+        next_stops[pos] = next_stop_row
+        if not live and transit_data.needs_live_lookup([next_stop_row] if next_stop_row is not None else []):
+            pending.append(pos)
+        else:
+            departure_cache.put(stop_requests[pos], next_stop_row, feed_version)
+    return next_stops, pending
+
+
+def live_unavailable(unresolved) -> tuple:
+    """The error response of a request left without its live lookup, TIMED_OUT or SATURATED."""
+    if unresolved is SATURATED:
+        return error_response(503, "Too many live schedule lookups pending")
+    return error_response(504, "Live schedule not available in time")
+
+
+def conditional(payload, departures, current_datetime: datetime.datetime, if_none_match: str, *identity) -> tuple:
+    """Let clients and proxies reuse the response until the first of the departures leaves.
+
+    identity and the departures make the entity tag; a client already holding it gets a 304.
+    """
+    departures = [departure for departure in departures if departure is not None]
+    etag = 'W/"{}"'.format(departure_etag(*identity, *(
+        (departure.route_id, departure.arrival_time, departure.arrival_datetime) for departure in departures
+    )))
+    headers = {'ETag': etag}
+    if departures:
+        headers['Cache-Control'] = f"max-age={min(seconds_until(departure, current_datetime) for departure in departures)}"
+    tags = [tag.strip() for tag in (if_none_match or '').split(',')]
+    if etag in tags or etag[2:] in tags or '*' in tags:
+        return 304, None, headers
+    return 200, payload, headers
+
+
+def next_stop_response(next_stop_row, current_datetime: datetime.datetime, if_none_match: str, stop_code: int,
+                       unresolved=None) -> tuple:
+    """Answer /transit-schedule/nextstop/<stop_code>; unresolved tells why a live lookup is missing, if one is."""
+    if next_stop_row is not None:
+        result = departure_result(next_stop_row, current_datetime)
+        result['current_time'] = str(current_datetime.time())
+        if unresolved is not None:
+            return 200, result, {}
+        return conditional(result, [next_stop_row], current_datetime, if_none_match, stop_code)
+    if unresolved is not None:
+        return live_unavailable(unresolved)
+    return 200, {"error": "No more buses for today"}, {}
+
+
+def next_stops_response(results, stop_requests, next_stops, current_datetime: datetime.datetime, if_none_match: str,
+                        unresolved=None) -> tuple:
+    """Answer a batch request from its batch_stop_requests and the next departure of each stop request."""
+    if unresolved is SATURATED:
+        return live_unavailable(unresolved)
+    for (result, _), next_stop_row in zip(stop_requests, next_stops, strict=True):
+        if next_stop_row is not None:
+            result.update(departure_result(next_stop_row, current_datetime))
+        else:
+            result['error'] = "No more buses for today" if unresolved is None else "Live schedule not available in time"
+    payload = {'current_time': str(current_datetime.time()), 'stops': results}
+    if unresolved is not None:
+        return 200, payload, {}
+    identity = [(result['stop_code'], result.get('error')) for result in results]
+    return conditional(payload, next_stops, current_datetime, if_none_match, *identity)
+
+
+def departures_response(stop_code: int, departures, current_datetime: datetime.datetime) -> tuple:
+    results = []
+    for departure in departures:
+        result = departure_result(departure, current_datetime)
+        result['retrieve_method'] = str(departure.retrieve_method)
+        results.append(result)
+    return 200, {
+        'stop_code': stop_code,
+        'current_time': str(current_datetime.time()),
+        'departures': results,
+    }, {}
+
+
+def health_response(transit_data) -> tuple:
+    result = {"status": "ok"}
+    snapshot_age = getattr(transit_data, 'snapshot_age', None)
+    if isinstance(snapshot_age, datetime.timedelta):
+        result["gtfs_snapshot_age_secs"] = int(snapshot_age.total_seconds())
+    return 200, result, {}
+
+
+def ready_response(warmup) -> tuple:
+    """Ready once the GTFS data is loaded and the warm-up stops are resolved; 503 until then."""
+    result, ready = warmup.status()
+    return 200 if ready else 503, result, {}
@@ -1,23 +1,62 @@
 
 import datetime
 import logging
+import time
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 
 import transit_schedule.data_parser as data_parser
-from transit_schedule.const import _LOGGER
+import transit_schedule.http_api as http_api
+from transit_schedule.const import (
+    _LOGGER,
+    HTTP_CACHE_SIZE,
+    HTTP_PORT,
+    HTTP_SERVER,
+    HTTP_THREADS,
+    HTTP_WARMUP_STOPS,
+    HTTP_WORKERS,
+)
+from transit_schedule.departure_cache import DepartureCache
+from transit_schedule.metrics import CONTENT_TYPE, REGISTRY, REQUEST_DURATION, track_transit_data
+from transit_schedule.warmup import StartupWarmup
 
 
-def create_app(transit_data=None):
+def create_app(transit_data=None, background_refresh=True, warmup_stops=None, background_warmup=True):
+    """Build the Flask app, loading the transit data unless it is given.
+
+    background_refresh=False leaves starting the refresh to the caller, e.g. to each gunicorn
+    worker once forked (see GunicornServer). The warm-up of warmup_stops (HTTP_WARMUP_STOPS by
+    default) runs in the background, or before returning with background_warmup=False.
+    """
     if transit_data is None:
         try:
             transit_data = data_parser.ParseTransitData()
+            if background_refresh:
+                transit_data.start_background_refresh()
         except Exception as e:
             _LOGGER.exception(e)
             # In case of initialization error, we still want to be able to start the server
             # to serve health checks, even if other endpoints fail.
             transit_data = None
     app = Flask(__name__)
+    departure_cache = DepartureCache(HTTP_CACHE_SIZE)
+    app.extensions['departure_cache'] = departure_cache
+    app.extensions['transit_data'] = transit_data
+    if transit_data is not None:
+        track_transit_data(transit_data)
+    warmup = StartupWarmup(transit_data, HTTP_WARMUP_STOPS if warmup_stops is None else warmup_stops)
+    app.extensions['warmup'] = warmup
+    if background_warmup:
+        warmup.start()
+    else:
+        warmup.run()
+
+    def respond(response) -> Response:
+        status, payload, headers = response
+        response = Response(status=status) if payload is None else jsonify(payload)
+        response.status_code = status
+        response.headers.update(headers)
+        return response
 
     if __name__ != '__main__':
         gunicorn_logger = logging.getLogger('gunicorn.error')
@@ -26,45 +65,95 @@ def create_app(transit_data=None):
 
     @app.before_request
     def log_request_info():
-        if request.path == '/health':
-            return
-        _LOGGER.info(f'Received request: {request.method} {request.path} from {request.remote_addr}')
+        g.request_start = time.perf_counter()
+        http_api.log_request(request.method, request.path, request.remote_addr)
 
+    @app.after_request
+    def observe_request_duration(response):
+        if 'request_start' in g:
+            # Label with the route pattern, not the path, to keep one series per endpoint
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_DURATION.observe(time.perf_counter() - g.request_start, route, request.method, str(response.status_code))
+        return response
 
-
-    @app.route("/transit-schedule/nextstop/<int:stop_code>", methods=['GET'])
+    @app.route(http_api.NEXTSTOP_ROUTE, methods=['GET'])
     def get_next_stop(stop_code: int):
         if transit_data is None:
-            return jsonify({"error": "Transit data not initialized"}), 500
-        if stop_code <= 0:
-            return jsonify({"error": "Stop code must be a positive integer"}), 400
-        stop_id = transit_data.get_stop_id(stop_code)
-        if stop_id is None:
-            return jsonify({"error": "Stop code not found"}), 404
+            return respond(http_api.TRANSIT_DATA_MISSING)
+        stop_id, error = http_api.stop_lookup(transit_data, stop_code)
+        if error:
+            return respond(error)
+        current_datetime = datetime.datetime.now().replace(microsecond=0)
+        (next_stop_row,), _ = http_api.lookup_next_stops(transit_data, departure_cache, [(stop_id, None, None)],
+                                                         current_datetime, stop_code=stop_code)
+        return respond(http_api.next_stop_response(next_stop_row, current_datetime,
+                                                   request.headers.get('If-None-Match'), stop_code))
+
+    @app.route(http_api.BATCH_ROUTE, methods=['GET', 'POST'])
+    def get_next_stops():
+        """Next departure of many stops, from ?stops=52611,52612 or a JSON body.
+
+        The JSON body lists stop codes, or objects with a stop_code and optional route and
+        direction: {"stops": [52611, {"stop_code": 52612, "route": "44"}]}. Results come back in
+        the same order, each with either the departure or an error.
+        """
+        if transit_data is None:
+            return respond(http_api.TRANSIT_DATA_MISSING)
+        if request.method == 'POST':
+            stops = http_api.stops_from_body(request.get_data())
+        else:
+            stops = http_api.stops_from_query(request.args.get('stops', ''))
+        error = http_api.batch_stops_error(stops)
+        if error:
+            return respond(http_api.error_response(400, error))
+
+        results, stop_requests = http_api.batch_stop_requests(stops, transit_data)
         current_datetime = datetime.datetime.now().replace(microsecond=0)
-        next_stop_row = transit_data.get_next_stop(stop_id, current_datetime, stop_code=stop_code)
-
-        if next_stop_row is not None:
-            difference = next_stop_row.arrival_datetime - current_datetime
-            nbr_minutes, nbr_seconds = divmod(difference.total_seconds(), 60)
-
-            result = {
-                'nextstop_nbrmins': int(nbr_minutes),
-                'nextstop_nbrsecs': int(nbr_seconds),
-                'route_id': str(next_stop_row.route_id),
-                'arrival_time': str(next_stop_row.arrival_time),
-                'trip_headsign': str(next_stop_row.trip_headsign),
-                'current_time': str(current_datetime.time()),
-            }
-            return jsonify(result)
-        return jsonify({"error": "No more buses for today"})
+        next_stops, _ = http_api.lookup_next_stops(transit_data, departure_cache,
+                                                   [stop_request for _, stop_request in stop_requests], current_datetime)
+        return respond(http_api.next_stops_response(results, stop_requests, next_stops, current_datetime,
+                                                    request.headers.get('If-None-Match')))
+
+    @app.route(http_api.DEPARTURES_ROUTE, methods=['GET'])
+    def get_departures(stop_code: int):
+        if transit_data is None:
+            return respond(http_api.TRANSIT_DATA_MISSING)
+        stop_id, query, error = http_api.departures_query(transit_data, stop_code, request.args)
+        if error:
+            return respond(error)
+        current_datetime = datetime.datetime.now().replace(microsecond=0)
+        departures = transit_data.get_next_departures(stop_id, current_datetime, **query)
+        return respond(http_api.departures_response(stop_code, departures, current_datetime))
 
     @app.route("/health", methods=['GET'])
     def health_check():
-        return jsonify({"status": "ok"}), 200
+        return respond(http_api.health_response(transit_data))
+
+    @app.route("/ready", methods=['GET'])
+    def readiness_check():
+        return respond(http_api.ready_response(warmup))
+
+    @app.route("/metrics", methods=['GET'])
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
     return app
 
 def start_http_server():
-    app = create_app()
-    app.run(host='0.0.0.0', port=80)
+    if HTTP_SERVER == 'flask':
+        app = create_app()
+        app.run(host='0.0.0.0', port=HTTP_PORT)
+        return
+    if HTTP_SERVER == 'asyncio':
+        from transit_schedule.asgi_server import start_asgi_server
+
+        start_asgi_server()
+        return
+    if HTTP_SERVER != 'gunicorn':
+        _LOGGER.error(f"Invalid HTTP_SERVER: {HTTP_SERVER}. Using gunicorn.")
+    from transit_schedule.gunicorn_server import GunicornServer, gunicorn_options
+
+    _LOGGER.info(f"Starting gunicorn on port {HTTP_PORT} with {HTTP_WORKERS} workers of {HTTP_THREADS} threads.")
+    # Load and warm up once in the master, so the workers are forked ready
+    GunicornServer(lambda: create_app(background_refresh=False, background_warmup=False),
+                   gunicorn_options(HTTP_PORT, HTTP_WORKERS, HTTP_THREADS)).run()
@@ -0,0 +1,274 @@
+import bisect
+import datetime
+import functools
+import json
+import math
+import os
+import pathlib
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latencies, from cached answers to live scraper lookups
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Engine stages take microseconds on GTFS, seconds on the live scraper
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.1, 1, 10)
+SCRAPER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20)
+# Seconds between writes of the metrics of a process sharing its registry
+SHARE_INTERVAL = 5
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names, values, extra: str = '') -> str:
+    pairs = ['{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def set_function(self, func, *labelvalues) -> None:
+        """Read the value of labelvalues from func() whenever the metrics are rendered."""
+        self._functions[labelvalues] = func
+
+    def reset(self) -> None:
+        """Forget the recorded values, keeping the functions."""
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self):
+        with self._lock:
+            samples = dict(self._values)
+        for labelvalues, func in self._functions.items():
+            value = func()
+            if value is not None:
+                samples[labelvalues] = value
+        return sorted(samples.items())
+
+    def render(self, samples=None) -> list[str]:
+        """Render the samples of this process, or else the (labelvalues, value) samples given."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for labelvalues, value in self._samples() if samples is None else samples:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value: float, *labelvalues) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labelvalues', 'start')
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+    def __call__(self, func):
+        histogram, labelvalues = self.histogram, self.labelvalues
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *labelvalues)
+        return timed
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues) -> None:
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                # Observations per bucket, the last one for +Inf, then the sum
+                series = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[position] += 1
+            series[-1] += value
+
+    def time(self, *labelvalues) -> _Timer:
+        """Observe the duration of a with block, or of every call of a decorated function."""
+        return _Timer(self, labelvalues)
+
+    def _samples(self):
+        with self._lock:
+            return sorted((labelvalues, list(series)) for labelvalues, series in self._values.items())
+
+    def render(self, samples=None) -> list[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for labelvalues, series in self._samples() if samples is None else samples:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series[:-1], strict=True):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """The metrics of this process, rendered in the Prometheus text exposition format.
+
+    Processes serving the same clients (e.g. gunicorn workers) share their registries through a
+    directory: each writes its counters and histograms there, and renders their sum over every
+    process, including those that exited, so that they never go backwards between scrapes.
+    Gauges describe the process rendering them.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._shared_path = None
+        self._write_lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self) -> None:
+        """Forget the counts and observations, e.g. those a forked process inherited; gauges are kept."""
+        for metric in self._metrics:
+            if metric.type != 'gauge':
+                metric.reset()
+
+    def share(self, directory, process_id, interval: float = SHARE_INTERVAL) -> None:
+        """Sum the metrics with the other processes sharing directory, writing ours every interval seconds."""
+        self._shared_path = pathlib.Path(directory) / f'{process_id}.json'
+        self.write()
+        threading.Thread(target=self._write_every, args=(interval,), name='metrics-share', daemon=True).start()
+
+    def _write_every(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.write()
+            except OSError:
+                # e.g. the directory was removed at shutdown; the next write tries again
+                pass
+
+    def write(self) -> None:
+        """Write the counters and histograms of this process to the shared directory."""
+        samples = {metric.name: [[list(labelvalues), value] for labelvalues, value in metric._samples()]
+                   for metric in self._metrics if metric.type != 'gauge'}
+        with self._write_lock:
+            temp_path = self._shared_path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(samples))
+            os.replace(temp_path, self._shared_path)
+
+    def _collect(self) -> dict:
+        """Sum the samples written by every process sharing the directory, by metric name."""
+        self.write()
+        totals = {}
+        for path in self._shared_path.parent.glob('*.json'):
+            try:
+                samples = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, metric_samples in samples.items():
+                merged = totals.setdefault(name, {})
+                for labelvalues, value in metric_samples:
+                    labelvalues = tuple(labelvalues)
+                    total = merged.get(labelvalues)
+                    if total is None:
+                        merged[labelvalues] = value
+                    elif isinstance(value, list):
+                        # Histogram series: bucket counts, then the sum
+                        merged[labelvalues] = [a + b for a, b in zip(total, value, strict=True)]
+                    else:
+                        merged[labelvalues] = total + value
+        return totals
+
+    def render(self) -> str:
+        shared = self._collect() if self._shared_path is not None else {}
+        lines = []
+        for metric in self._metrics:
+            if self._shared_path is not None and metric.type != 'gauge':
+                lines += metric.render(sorted(shared.get(metric.name, {}).items()))
+            else:
+                lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'transit_schedule_http_request_duration_seconds', 'HTTP request latency by route.',
+    ('route', 'method', 'status')))
+ENGINE_STAGE_DURATION = REGISTRY.register(Histogram(
+    'transit_schedule_engine_stage_duration_seconds', 'Time spent in each stage of the departure lookups.',
+    ('stage',), STAGE_BUCKETS))
+SCRAPER_HTTP_DURATION = REGISTRY.register(Histogram(
+    'transit_schedule_scraper_http_duration_seconds', 'Live scraper HTTP call durations, by madOper query.',
+    ('query',), SCRAPER_BUCKETS))
+SCRAPER_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'transit_schedule_scraper_cache_lookups_total', 'Live scraper weekly schedule cache lookups, by result.',
+    ('result',)))
+SCRAPER_FETCHES = REGISTRY.register(Counter(
+    'transit_schedule_scraper_fetches_total', 'Live scraper fetches run, and callers coalesced onto another fetch.',
+    ('outcome',)))
+FEED_AGE = REGISTRY.register(Gauge(
+    'transit_schedule_gtfs_feed_age_seconds', 'Seconds since the GTFS data being served was loaded.'))
+FEED_LOAD_DURATION = REGISTRY.register(Gauge(
+    'transit_schedule_gtfs_feed_load_duration_seconds', 'Duration of the last GTFS data load.'))
+
+
+def track_transit_data(transit_data) -> None:
+    """Read the feed age and the scraper fetch counts of transit_data whenever the metrics are rendered."""
+    def feed_age():
+        age = getattr(transit_data, 'snapshot_age', None)
+        return age.total_seconds() if isinstance(age, datetime.timedelta) else None
+
+    def scraper_fetches(attribute):
+        def count():
+            value = getattr(getattr(getattr(transit_data, 'scraper', None), 'fetches', None), attribute, None)
+            return value if isinstance(value, int) else None
+        return count
+
+    FEED_AGE.set_function(feed_age)
+    SCRAPER_FETCHES.set_function(scraper_fetches('calls'), 'run')
+    SCRAPER_FETCHES.set_function(scraper_fetches('coalesced'), 'coalesced')
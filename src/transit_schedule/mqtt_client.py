@@ -68,21 +68,17 @@ def publish_hass_discovery_config(client, stop_config, discovery_prefix):
     client.publish(discovery_topic, json.dumps(payload), retain=True)
     _LOGGER.info("Published Home Assistant discovery configuration", extra={"topic": discovery_topic, "payload": payload})
 
-def publish_schedule(client, transit_data, stop_id, stop_config):
-    """Fetches and publishes the next bus stop information."""
-    current_datetime = datetime.datetime.now().replace(microsecond=0)
-    stop_code = stop_config['stop_code']
-    target_route = stop_config.get('route_id')
-    target_direction = stop_config.get('direction')
-
-    next_stop_row = transit_data.get_next_stop(
-        stop_id, 
-        current_datetime, 
-        stop_code=stop_code,
-        target_route=target_route,
-        target_direction=target_direction
+def fetch_next_stops(transit_data, stop_configs_with_ids, current_datetime):
+    """Fetches the next bus of every configured stop, in one batch lookup."""
+    return transit_data.get_next_stops(
+        [(stop_id, stop_config.get('route_id'), stop_config.get('direction'))
+         for stop_config, stop_id in stop_configs_with_ids],
+        current_datetime
     )
-    
+
+def publish_schedule(client, stop_config, next_stop_row, current_datetime):
+    """Publishes the next bus stop information."""
+    stop_code = stop_config['stop_code']
     t = get_translation()
 
     if next_stop_row is not None:
@@ -144,11 +140,13 @@ def start_mqtt_client():
         return
 
     try:
-        transit_data = ParseTransitData()
+        # GTFS_LOAD_MODE=filtered only keeps the departures of the configured stops
+        transit_data = ParseTransitData(stop_codes=[stop_config['stop_code'] for stop_config in config.stops])
     except Exception as e:
         _LOGGER.error(f"Failed to initialize: {e}. Retrying in 30 seconds...")
         time.sleep(30)
         return
+    transit_data.start_background_refresh()
 
     _LOGGER.info("Starting MQTT publisher", extra={"config": config.to_dict()})
     
@@ -192,11 +190,12 @@ def start_mqtt_client():
         while True:
             try:
                 refresh_event.clear()
-                now = datetime.datetime.now()
+                now = datetime.datetime.now().replace(microsecond=0)
                 earliest_next_arrival = None
 
-                for stop_config, stop_id in stop_configs_with_ids:
-                    next_arrival = publish_schedule(client, transit_data, stop_id, stop_config)
+                next_stop_rows = fetch_next_stops(transit_data, stop_configs_with_ids, now)
+                for (stop_config, _), next_stop_row in zip(stop_configs_with_ids, next_stop_rows, strict=True):
+                    next_arrival = publish_schedule(client, stop_config, next_stop_row, now)
                     if next_arrival:
                         if earliest_next_arrival is None or next_arrival < earliest_next_arrival:
                             earliest_next_arrival = next_arrival
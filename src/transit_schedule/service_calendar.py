@@ -0,0 +1,121 @@
+import datetime
+
+import numpy
+import pandas
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def base_service_ids(service_ids) -> numpy.ndarray:
+    """Strip the suffix many agencies append to service_ids in trips.txt, e.g. SEM-B3 -> SEM."""
+    service_ids = numpy.asarray(service_ids, dtype=str)
+    if not len(service_ids):
+        return service_ids
+    return numpy.char.partition(service_ids, '-')[:, 0]
+
+
+def _to_ordinals(gtfs_dates) -> numpy.ndarray:
+    """Convert GTFS YYYYMMDD integers to proleptic Gregorian ordinals."""
+    dates = pandas.to_datetime(pandas.Series(gtfs_dates).astype('int64').astype(str), format='%Y%m%d')
+    return dates.map(datetime.datetime.toordinal).to_numpy(dtype=numpy.int64)
+
+
+class ServiceCalendar:
+    """Service activity bitmap: bitmap[day, service] tells whether a service runs on a day.
+
+    Days are counted from first_date and cover the whole calendar.txt / calendar_dates.txt
+    range, with the calendar_dates.txt additions and removals already applied.
+    """
+
+    def __init__(self, service_ids, first_date: datetime.date | None, bitmap):
+        self.service_ids = service_ids
+        self.first_date = first_date
+        self.bitmap = bitmap
+        self._first_ordinal = first_date.toordinal() if first_date else 0
+
+    @classmethod
+    def build(cls, calendar: pandas.DataFrame, calendar_dates: pandas.DataFrame) -> "ServiceCalendar":
+        """Build the bitmap from calendar.txt and calendar_dates.txt."""
+        service_ids = pandas.Index(
+            pandas.concat([calendar['service_id'], calendar_dates['service_id']]).astype(str).unique()
+        ).sort_values()
+        if calendar.empty and calendar_dates.empty:
+            return cls(numpy.asarray(service_ids, dtype=str), None, numpy.zeros((0, 0), dtype=bool))
+
+        start = _to_ordinals(calendar['start_date'])
+        end = _to_ordinals(calendar['end_date'])
+        exception_days = _to_ordinals(calendar_dates['date'])
+        first = int(min(numpy.concatenate([start, exception_days])))
+        last = int(max(numpy.concatenate([end, exception_days])))
+
+        days = numpy.arange(first, last + 1)
+        # date.fromordinal(n).weekday() == (n - 1) % 7
+        day_weekdays = (days - 1) % 7
+        bitmap = numpy.zeros((len(days), len(service_ids)), dtype=bool)
+
+        # Regular weekly services from calendar.txt
+        if not calendar.empty:
+            weekday_flags = calendar[list(WEEKDAYS)].to_numpy() == 1
+            active = weekday_flags[:, day_weekdays]
+            active &= (days >= start[:, None]) & (days <= end[:, None])
+            codes = service_ids.get_indexer(calendar['service_id'].astype(str))
+            for code, row in zip(codes, active, strict=True):
+                bitmap[:, code] |= row
+
+        # Exceptions from calendar_dates.txt: removals (2) first, so explicit additions (1) win.
+        if not calendar_dates.empty:
+            codes = service_ids.get_indexer(calendar_dates['service_id'].astype(str))
+            day_pos = exception_days - first
+            exception_type = calendar_dates['exception_type'].to_numpy()
+            removed = exception_type == 2
+            bitmap[day_pos[removed], codes[removed]] = False
+            added = exception_type == 1
+            bitmap[day_pos[added], codes[added]] = True
+
+        return cls(numpy.asarray(service_ids, dtype=str), datetime.date.fromordinal(first), bitmap)
+
+    def active_mask(self, date: datetime.date) -> numpy.ndarray:
+        """Boolean mask over service_ids of the services running on a date."""
+        day = date.toordinal() - self._first_ordinal
+        if self.first_date is None or not 0 <= day < len(self.bitmap):
+            return numpy.zeros(len(self.service_ids), dtype=bool)
+        return self.bitmap[day]
+
+
+class ServiceMatcher:
+    """Match the services of the calendar to the service codes of the departure index.
+
+    Both the exact and the base (suffix-less) service_id matches are resolved once, at load, into
+    integer code arrays, so turning the active services of a day into index masks takes no string work.
+    """
+
+    def __init__(self, exact_positions, calendar_base_codes, index_base_codes, n_bases: int):
+        self.exact_positions = exact_positions
+        self.calendar_base_codes = calendar_base_codes
+        self.index_base_codes = index_base_codes
+        self.n_bases = n_bases
+
+    @classmethod
+    def build(cls, calendar_service_ids, index_service_ids) -> "ServiceMatcher":
+        """Link the service_ids of a ServiceCalendar to those of a DepartureIndex."""
+        exact_positions = pandas.Index(calendar_service_ids).get_indexer(index_service_ids)
+        bases = pandas.Index(numpy.unique(numpy.concatenate([
+            base_service_ids(calendar_service_ids), base_service_ids(index_service_ids),
+        ])))
+        return cls(
+            exact_positions=exact_positions.astype(numpy.int32),
+            calendar_base_codes=bases.get_indexer(base_service_ids(calendar_service_ids)).astype(numpy.int32),
+            index_base_codes=bases.get_indexer(base_service_ids(index_service_ids)).astype(numpy.int32),
+            n_bases=len(bases),
+        )
+
+    def exact_mask(self, active: numpy.ndarray) -> numpy.ndarray:
+        """Mask over index service codes (plus one False entry for missing codes) of the active services."""
+        mask = numpy.append(active, False)[self.exact_positions]
+        return numpy.append(mask, False)
+
+    def base_mask(self, active: numpy.ndarray) -> numpy.ndarray:
+        """Like exact_mask, matching the index services on the base of the active service_ids."""
+        active_bases = numpy.zeros(self.n_bases, dtype=bool)
+        active_bases[self.calendar_base_codes[active]] = True
+        return numpy.append(active_bases[self.index_base_codes], False)
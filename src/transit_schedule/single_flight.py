@@ -0,0 +1,99 @@
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Set by submit: the executor future of the call, and how many callers still await it
+        self.future = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run one call per key at a time: concurrent callers of a key wait for the call in flight and share its outcome.
+
+    calls counts the calls actually run, coalesced the callers that waited for another's call instead.
+    Blocking callers use do, event loops submit and release; a key is used through one or the other.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        # Reentrant: cancelling a submitted call runs its done callback, which lands the flight
+        self._lock = threading.RLock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """Return func(), or the result of the call of key already in flight; its exception is raised to every caller."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def submit(self, executor, key, func, limit: int | None = None):
+        """Run func() in executor unless the call of key is in flight already, without waiting for it.
+
+        Returns the concurrent.futures.Future of the call, shared by every caller of the key until it completes,
+        or None when limit calls are in flight already. A caller that stops waiting calls release.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                flight.waiters += 1
+                return flight.future
+            if limit is not None and len(self._flights) >= limit:
+                return None
+            flight = self._flights[key] = _Flight()
+            flight.waiters = 1
+            flight.future = executor.submit(func)
+            self.calls += 1
+        flight.future.add_done_callback(lambda future: self._land(key, flight))
+        return flight.future
+
+    def release(self, key, future) -> bool:
+        """Stop waiting for a submitted call, cancelling it if no other caller waits and it has not started yet.
+
+        Returns whether the call was cancelled.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None or flight.future is not future:
+                return False
+            flight.waiters -= 1
+            return flight.waiters == 0 and future.cancel()
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    def in_flight(self) -> int:
+        """Number of keys with a call running."""
+        with self._lock:
+            return len(self._flights)
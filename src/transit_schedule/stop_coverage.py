@@ -0,0 +1,74 @@
+import datetime
+
+import numpy
+
+from transit_schedule.departure_index import DepartureIndex
+from transit_schedule.service_calendar import ServiceCalendar, ServiceMatcher
+
+# Day offset of stops and services that never run
+NO_DAY = -1
+
+
+class StopCoverage:
+    """First and last day each stop of the departure index has service, built once per feed.
+
+    first_days and last_days are aligned with DepartureIndex.stop_ids and count days from the
+    service calendar first_date, so answering "when does this stop run" is a lookup.
+    """
+
+    def __init__(self, first_date: datetime.date | None, first_days, last_days):
+        self.first_date = first_date
+        self.first_days = first_days
+        self.last_days = last_days
+
+    @classmethod
+    def build(cls, service_calendar: ServiceCalendar, service_matcher: ServiceMatcher,
+              departure_index: DepartureIndex) -> "StopCoverage":
+        """Intersect the service calendar with the services of every stop's departures."""
+        n_stops = len(departure_index.offsets) - 1
+        active = service_calendar.bitmap
+        n_days = len(active)
+        if not n_days:
+            no_days = numpy.full(n_stops, NO_DAY, dtype=numpy.int32)
+            return cls(service_calendar.first_date, no_days, no_days)
+
+        # Day range of each calendar service; services that never run get an empty range
+        ever = active.any(axis=0)
+        calendar_first = numpy.where(ever, active.argmax(axis=0), n_days)
+        calendar_last = numpy.where(ever, n_days - 1 - active[::-1].argmax(axis=0), NO_DAY)
+
+        # Day range of each index service: its calendar service, or else all those with the same base
+        base_first = numpy.full(service_matcher.n_bases, n_days)
+        numpy.minimum.at(base_first, service_matcher.calendar_base_codes, calendar_first)
+        base_last = numpy.full(service_matcher.n_bases, NO_DAY)
+        numpy.maximum.at(base_last, service_matcher.calendar_base_codes, calendar_last)
+        exact = service_matcher.exact_positions
+        service_first = numpy.where(exact >= 0, calendar_first[exact], base_first[service_matcher.index_base_codes])
+        service_last = numpy.where(exact >= 0, calendar_last[exact], base_last[service_matcher.index_base_codes])
+        # Departures without a service (code -1) pick the trailing empty range
+        service_first = numpy.append(service_first, n_days)
+        service_last = numpy.append(service_last, NO_DAY)
+
+        offsets = departure_index.offsets
+        first_days = numpy.full(n_stops, n_days, dtype=numpy.int32)
+        last_days = numpy.full(n_stops, NO_DAY, dtype=numpy.int32)
+        served = offsets[1:] > offsets[:-1]
+        if served.any():
+            starts = offsets[:-1][served]
+            first_days[served] = numpy.minimum.reduceat(service_first[departure_index.service_codes], starts)
+            last_days[served] = numpy.maximum.reduceat(service_last[departure_index.service_codes], starts)
+        first_days[first_days == n_days] = NO_DAY
+        return cls(service_calendar.first_date, first_days, last_days)
+
+    def date_range(self, position: int | None) -> tuple[int | None, int | None]:
+        """First and last service dates (YYYYMMDD) of the stop at a departure index position.
+
+        Returns (None, None) for unknown stops and stops without any service.
+        """
+        if position is None or self.first_days[position] == NO_DAY:
+            return None, None
+        return self._gtfs_date(self.first_days[position]), self._gtfs_date(self.last_days[position])
+
+    def _gtfs_date(self, day) -> int:
+        date = self.first_date + datetime.timedelta(days=int(day))
+        return date.year * 10000 + date.month * 100 + date.day
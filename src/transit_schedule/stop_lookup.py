@@ -0,0 +1,48 @@
+import pandas
+
+from transit_schedule.const import _LOGGER
+
+
+class StopLookup:
+    """Bidirectional stop_code <-> stop_id lookup, built once per feed.
+
+    stops.txt may repeat a stop_code, or give a stop_id several codes: in both directions the
+    first row of stops.txt wins. Stops without a stop_code (e.g. stations) are left out.
+    """
+
+    def __init__(self, stop_ids_by_code: dict[str, str], stop_codes_by_id: dict[str, str]):
+        self._stop_ids_by_code = stop_ids_by_code
+        self._stop_codes_by_id = stop_codes_by_id
+
+    @classmethod
+    def build(cls, stops: pandas.DataFrame) -> "StopLookup":
+        """Build the lookup from stops.txt, indexed by stop_code."""
+        stop_ids_by_code = {}
+        stop_codes_by_id = {}
+        if stops.empty or 'stop_id' not in stops:
+            return cls(stop_ids_by_code, stop_codes_by_id)
+
+        duplicates = 0
+        for stop_code, stop_id in zip(stops.index, stops['stop_id'].astype(str), strict=True):
+            if pandas.isna(stop_code):
+                continue
+            stop_code = str(stop_code)
+            if stop_code in stop_ids_by_code:
+                duplicates += 1
+                continue
+            stop_ids_by_code[stop_code] = stop_id
+            stop_codes_by_id.setdefault(stop_id, stop_code)
+        if duplicates:
+            _LOGGER.info(f"{duplicates} duplicate stop_code rows in stops.txt, the first occurrence is used")
+        return cls(stop_ids_by_code, stop_codes_by_id)
+
+    def __len__(self) -> int:
+        return len(self._stop_ids_by_code)
+
+    def stop_id(self, stop_code) -> str | None:
+        """Return the stop_id of a stop_code, or None if it is unknown."""
+        return self._stop_ids_by_code.get(str(stop_code))
+
+    def stop_code(self, stop_id) -> str | None:
+        """Return the stop_code of a stop_id, or None if it has none."""
+        return self._stop_codes_by_id.get(str(stop_id))
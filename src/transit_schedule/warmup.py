@@ -0,0 +1,87 @@
+import concurrent.futures
+import datetime
+import threading
+import time
+
+from transit_schedule.const import _LOGGER
+
+# Stops resolved at once during the warm-up
+WARMUP_THREADS = 8
+
+
+class StartupWarmup:
+    """Pre-resolve the warm-up stops at startup, and tell whether the instance is ready to serve.
+
+    Each stop is looked up in GTFS and handed to the live scraper, which fills its stop mappings
+    and weekly schedule cache (RTL only), so that the first requests to these stops do no cold
+    work. Stops are resolved in parallel. A stop that fails, e.g. an unknown stop code or the
+    scraper being down, is reported but does not hold readiness back.
+    """
+
+    def __init__(self, transit_data, stops, threads: int = WARMUP_THREADS):
+        self.transit_data = transit_data
+        self.stops = list(stops)
+        self.threads = threads
+        self.warmed = 0
+        self.failed = []
+        self.duration = None
+        self._done = threading.Event()
+
+    def start(self) -> None:
+        """Run the warm-up in a background thread."""
+        if not self.stops:
+            self.run()
+            return
+        threading.Thread(target=self.run, name="warmup", daemon=True).start()
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        try:
+            if self.transit_data is not None and self.stops:
+                _LOGGER.info(f"Warming up {len(self.stops)} stops...")
+                with concurrent.futures.ThreadPoolExecutor(min(self.threads, len(self.stops)),
+                                                           thread_name_prefix='warmup') as pool:
+                    for stop, error in zip(self.stops, pool.map(self._warm_stop, self.stops), strict=True):
+                        if error is None:
+                            self.warmed += 1
+                        else:
+                            self.failed.append({'stop_code': stop['stop_code'], 'error': error})
+        finally:
+            self.duration = time.perf_counter() - start
+            self._done.set()
+        if self.stops:
+            _LOGGER.info(f"Warmed up {self.warmed} of {len(self.stops)} stops in {self.duration:.1f}s")
+
+    def _warm_stop(self, stop: dict) -> str | None:
+        """Resolve one stop; return what went wrong, or None."""
+        try:
+            stop_id = self.transit_data.get_stop_id(int(stop['stop_code']))
+            if stop_id is None:
+                return "Stop code not found"
+            now = datetime.datetime.now()
+            target_route, target_direction = stop.get('route_id') or None, stop.get('direction') or None
+            self.transit_data.get_next_stop(stop_id, now, stop_code=stop['stop_code'], target_route=target_route,
+                                            target_direction=target_direction, live=False)
+            scraper = getattr(self.transit_data, 'scraper', None)
+            if scraper is not None:
+                scraper.get_schedule(stop_id, now.date(), target_route=target_route, target_direction=target_direction)
+        except Exception as e:
+            _LOGGER.error(f"Warm-up of stop {stop['stop_code']} failed: {e}")
+            return str(e)
+        return None
+
+    def status(self) -> tuple[dict, bool]:
+        """The readiness report for /ready, and whether the feed is loaded and the warm-up done."""
+        feed_loaded = self.transit_data is not None and getattr(self.transit_data, 'loaded_at', None) is not None
+        done = not self.stops or self._done.is_set()
+        ready = feed_loaded and done
+        return {
+            'status': 'ready' if ready else 'not_ready',
+            'feed_loaded': feed_loaded,
+            'warmup': {
+                'done': done,
+                'stops': len(self.stops),
+                'warmed': self.warmed,
+                'failed': list(self.failed),
+            },
+        }, ready
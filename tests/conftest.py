@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def disable_gtfs_snapshot(mocker):
+    """Keep tests from writing GTFS snapshots and feed stores next to their throwaway zip files."""
+    mocker.patch('transit_schedule.data_parser.GTFS_SNAPSHOT_ENABLED', False)
+    mocker.patch('transit_schedule.data_parser.GTFS_FEED_STORE_ENABLED', False)
+
+
+@pytest.fixture(autouse=True)
+def isolate_scraper_cache(mocker, tmp_path):
+    """Keep live scraper caches written by tests out of the working tree."""
+    mocker.patch('transit_schedule.hastus_scraper.HastusScraper.CACHE_FILE', str(tmp_path / 'hastus_cache.json'))
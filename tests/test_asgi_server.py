@@ -0,0 +1,213 @@
+import asyncio
+import datetime
+import threading
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from transit_schedule.asgi_server import AsyncTransitApp, create_asgi_app
+from transit_schedule.warmup import StartupWarmup
+
+
+def mock_departure(arrival_datetime, route_id=44, lookahead_days=0):
+    departure = MagicMock()
+    departure.arrival_datetime = arrival_datetime
+    departure.arrival_time = arrival_datetime.strftime('%H:%M:%S')
+    departure.route_id = route_id
+    departure.trip_headsign = "Terminus Panama"
+    departure.retrieve_method = 'GTFS'
+    departure.__getitem__.side_effect = {'lookahead_days': lookahead_days}.__getitem__
+    return departure
+
+
+@pytest.fixture
+def mock_transit_data():
+    transit_data = MagicMock()
+    transit_data.get_stop_id.side_effect = lambda stop_code: f"id-{stop_code}"
+    transit_data.needs_live_lookup.side_effect = lambda departures, live=False: not departures
+    return transit_data
+
+
+def client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.mark.anyio
+async def test_health_without_transit_data(mocker):
+    mocker.patch('transit_schedule.asgi_server.data_parser.ParseTransitData', side_effect=Exception("Failed"))
+    app = create_asgi_app()
+    async with client(app) as http:
+        assert (await http.get('/health')).json() == {"status": "ok"}
+        response = await http.get('/transit-schedule/nextstop/32752')
+    assert response.status_code == 500
+    assert response.json() == {"error": "Transit data not initialized"}
+
+
+@pytest.mark.anyio
+async def test_next_stop_from_gtfs(mock_transit_data):
+    arrival = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(minutes=15)
+    mock_transit_data.get_next_stop.return_value = mock_departure(arrival)
+    app = AsyncTransitApp(mock_transit_data)
+
+    async with client(app) as http:
+        response = await http.get('/transit-schedule/nextstop/32752')
+        assert response.status_code == 200
+        assert response.json()['route_id'] == '44'
+        assert 0 < int(response.headers['cache-control'].removeprefix('max-age=')) <= 900
+        revalidated = await http.get('/transit-schedule/nextstop/32752',
+                                     headers={'If-None-Match': response.headers['etag']})
+    assert revalidated.status_code == 304
+    # GTFS answered without the live scraper, and the second request came from the cache
+    mock_transit_data.get_next_stop.assert_called_once()
+    assert mock_transit_data.get_next_stop.call_args.kwargs['live'] is False
+
+
+@pytest.mark.anyio
+async def test_next_stop_from_live_scraper(mock_transit_data):
+    arrival = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(minutes=5)
+    mock_transit_data.get_next_stop.side_effect = lambda *args, live=True, **kwargs: (
+        mock_departure(arrival) if live else None)
+    app = AsyncTransitApp(mock_transit_data)
+
+    async with client(app) as http:
+        response = await http.get('/transit-schedule/nextstop/32752')
+    assert response.status_code == 200
+    assert response.json()['arrival_time'] == arrival.strftime('%H:%M:%S')
+    assert [call.kwargs.get('live', True) for call in mock_transit_data.get_next_stop.call_args_list] == [False, True]
+
+
+@pytest.mark.anyio
+async def test_slow_live_scraper_does_not_block_gtfs(mock_transit_data):
+    """Lookups stuck on the scraper time out at their deadline while GTFS requests keep being served."""
+    release = threading.Event()
+    arrival = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(minutes=10)
+
+    def get_next_stop(stop_id, *args, live=True, **kwargs):
+        if stop_id == 'id-1':
+            if live:
+                release.wait(5)
+            return None
+        return mock_departure(arrival)
+
+    mock_transit_data.get_next_stop.side_effect = get_next_stop
+    app = AsyncTransitApp(mock_transit_data, live_deadline=0.2, live_threads=1, cache_size=0)
+    try:
+        async with client(app) as http:
+            responses = await asyncio.gather(
+                *(http.get('/transit-schedule/nextstop/1') for _ in range(5)),
+                *(http.get(f'/transit-schedule/nextstop/{stop_code}') for stop_code in range(2, 202)),
+            )
+    finally:
+        release.set()
+
+    assert [response.status_code for response in responses[:5]] == [504] * 5
+    assert all(response.status_code == 200 for response in responses[5:])
+
+
+@pytest.mark.anyio
+async def test_live_lookups_are_shared_cancelled_and_capped(mock_transit_data):
+    """Requests for one stop share a lookup, queued lookups nobody awaits are cancelled, and the backlog is capped."""
+    release = threading.Event()
+    live_stops = []
+
+    def get_next_stop(stop_id, *args, live=True, **kwargs):
+        if live:
+            live_stops.append(stop_id)
+            release.wait(5)
+        return None
+
+    mock_transit_data.get_next_stop.side_effect = get_next_stop
+    app = AsyncTransitApp(mock_transit_data, live_deadline=0.2, live_threads=1, cache_size=0, live_max_pending=2)
+    try:
+        async with client(app) as http:
+            responses = await asyncio.gather(*(http.get(f'/transit-schedule/nextstop/{stop_code}')
+                                               for stop_code in (1, 1, 1, 2, 3)))
+    finally:
+        release.set()
+
+    # Stop 1 holds the only thread, stop 2 queued behind it and stop 3 went past the cap
+    assert [response.status_code for response in responses] == [504, 504, 504, 504, 503]
+    assert responses[4].json() == {"error": "Too many live schedule lookups pending"}
+    app.live_executor.shutdown(wait=True)
+    assert live_stops == ['id-1']
+    assert (app.live_flights.calls, app.live_flights.coalesced, app.live_flights.in_flight()) == (2, 2, 0)
+
+
+@pytest.mark.anyio
+async def test_departures_fall_back_to_gtfs_lookahead(mock_transit_data):
+    release = threading.Event()
+    tomorrow = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(days=1)
+    ahead = [mock_departure(tomorrow, lookahead_days=1)]
+
+    def get_next_departures(*args, live=True, **kwargs):
+        if live:
+            release.wait(5)
+        return ahead
+
+    mock_transit_data.get_next_departures.side_effect = get_next_departures
+    mock_transit_data.needs_live_lookup.side_effect = lambda departures, live=False: True
+    app = AsyncTransitApp(mock_transit_data, live_deadline=0.1)
+    try:
+        async with client(app) as http:
+            response = await http.get('/transit-schedule/departures/32752?limit=2&route=44')
+    finally:
+        release.set()
+
+    assert response.status_code == 200
+    assert [departure['retrieve_method'] for departure in response.json()['departures']] == ['GTFS']
+    assert mock_transit_data.get_next_departures.call_args.kwargs['target_route'] == '44'
+
+
+@pytest.mark.anyio
+async def test_batch_next_stops(mock_transit_data):
+    arrival = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(minutes=3)
+    mock_transit_data.get_next_stops.side_effect = lambda stop_requests, at, live=True: [
+        mock_departure(arrival) if stop_id == 'id-52611' else None for stop_id, _, _ in stop_requests
+    ]
+    mock_transit_data.get_next_stop.return_value = None
+    mock_transit_data.needs_live_lookup.side_effect = lambda departures, live=False: False
+    app = AsyncTransitApp(mock_transit_data)
+
+    async with client(app) as http:
+        response = await http.post('/transit-schedule/nextstop', json={"stops": [52611, {"stop_code": 52612}, "abc",
+                                                                         {"stop_code": 52613, "route": 4.5}]})
+        invalid = await http.get('/transit-schedule/nextstop')
+
+    stops = response.json()['stops']
+    assert stops[0]['route_id'] == '44'
+    assert stops[1] == {'stop_code': 52612, 'error': "No more buses for today"}
+    assert stops[2]['error'] == "Stop code must be a positive integer"
+    assert stops[3]['error'] == "route must be a string or integer"
+    assert invalid.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_metrics(mock_transit_data):
+    app = AsyncTransitApp(mock_transit_data)
+    async with client(app) as http:
+        await http.get('/transit-schedule/departures/32752?limit=0')
+        response = await http.get('/metrics')
+
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert ('transit_schedule_http_request_duration_seconds_count'
+            '{route="/transit-schedule/departures/<int:stop_code>",method="GET",status="400"}') in response.text
+
+
+@pytest.mark.anyio
+async def test_ready_after_warmup(mock_transit_data):
+    mock_transit_data.loaded_at = datetime.datetime.now()
+    warmup = StartupWarmup(mock_transit_data, [{"stop_code": "52611"}])
+    app = AsyncTransitApp(mock_transit_data, warmup=warmup)
+
+    async with client(app) as http:
+        assert (await http.get('/ready')).status_code == 503
+        warmup.run()
+        response = await http.get('/ready')
+    assert response.status_code == 200
+    assert response.json()['warmup'] == {'done': True, 'stops': 1, 'warmed': 1, 'failed': []}
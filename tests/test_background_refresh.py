@@ -0,0 +1,91 @@
+import datetime
+import threading
+from unittest.mock import patch
+from zipfile import ZipFile
+
+import pytest
+
+from transit_schedule.data_parser import ParseTransitData
+
+
+def write_feed(path, headsign):
+    with ZipFile(path, 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code\nS1,123')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1,1,1,1,1,1,1,1,20250101,20251231')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n1,10:00:00,10:00:00,S1,1')
+        zf.writestr('trips.txt', f'route_id,service_id,trip_id,trip_headsign\n44,1,1,{headsign}')
+
+
+@pytest.fixture
+def parser(tmp_path):
+    write_feed(tmp_path / 'gtfs_test.zip', 'Panama')
+    with patch('transit_schedule.data_parser.config') as mock_config, \
+            patch('transit_schedule.data_parser.HastusScraper'), \
+            patch('transit_schedule.data_parser.is_file_expired', return_value=False) as mock_is_file_expired:
+        mock_config.retrieval_method = 'gtfs'
+        mock_config.transit = 'STM'
+        mock_config.gtfs_zip_file = 'gtfs_test.zip'
+        mock_config.gtfs_data_dir = str(tmp_path)
+        parser = ParseTransitData()
+        parser.mock_is_file_expired = mock_is_file_expired
+        yield parser
+        parser.stop_background_refresh()
+
+
+def test_queries_do_not_check_expiry(parser):
+    parser.mock_is_file_expired.reset_mock()
+    assert parser.get_stop_id(123) == 'S1'
+    assert parser.get_next_stop('S1', datetime.datetime(2025, 9, 29, 9, 0, 0)).trip_headsign == 'Panama'
+    parser.mock_is_file_expired.assert_not_called()
+
+
+def test_refresh_serves_old_feed_until_swap(parser, tmp_path):
+    now = datetime.datetime(2025, 9, 29, 9, 0, 0)
+    old_feed = parser._feed
+    reading = threading.Event()
+    release = threading.Event()
+    read_gtfs_tables = parser._read_gtfs_tables
+
+    def slow_read():
+        reading.set()
+        release.wait(5)
+        return read_gtfs_tables()
+
+    write_feed(tmp_path / 'gtfs_test.zip', 'Longueuil')
+    with patch.object(parser, '_read_gtfs_tables', side_effect=slow_read), \
+            patch.object(parser, '_download_gtfs_file'):
+        refresher = threading.Thread(target=parser.refresh, kwargs={'force': True})
+        refresher.start()
+        assert reading.wait(5)
+
+        # The new feed is still being built: queries use the complete old one
+        assert parser._feed is old_feed
+        assert parser.get_next_stop('S1', now).trip_headsign == 'Panama'
+
+        release.set()
+        refresher.join(5)
+
+    assert parser._feed is not old_feed
+    assert parser.get_next_stop('S1', now).trip_headsign == 'Longueuil'
+
+
+def test_background_refresh_survives_errors(parser):
+    calls = threading.Semaphore(0)
+
+    def failing_refresh(force=False):
+        calls.release()
+        raise OSError("network down")
+
+    with patch.object(parser, 'refresh', side_effect=failing_refresh):
+        parser.start_background_refresh(interval=0.01)
+        assert calls.acquire(timeout=5)
+        assert calls.acquire(timeout=5)
+        parser.stop_background_refresh()
+
+    assert parser.get_stop_id(123) == 'S1'
+
+
+def test_snapshot_age(parser):
+    assert datetime.timedelta(0) <= parser.snapshot_age < datetime.timedelta(minutes=1)
+    with patch('transit_schedule.gtfs_feed.time.time', return_value=parser._feed.loaded_at + 7200):
+        assert parser.snapshot_age == datetime.timedelta(hours=2)
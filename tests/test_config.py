@@ -33,3 +33,9 @@ def test_config_to_dict():
     assert isinstance(d, dict)
     assert "transit" in d
     assert all(not k.startswith('_') for k in d.keys())
+
+def test_config_warmup_stops():
+    with patch.dict(os.environ, {"STOP_CODE": "52611"}, clear=True):
+        assert [stop['stop_code'] for stop in Config().http_warmup_stops] == ["52611"]
+    with patch.dict(os.environ, {"STOP_CODE": "52611", "HTTP_WARMUP_STOPS": "52612, abc,,52613"}, clear=True):
+        assert [stop['stop_code'] for stop in Config().http_warmup_stops] == ["52612", "52613"]
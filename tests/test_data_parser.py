@@ -1,4 +1,5 @@
 import datetime
+import io
 import os
 from unittest.mock import MagicMock, patch
 from zipfile import ZipFile
@@ -8,6 +9,7 @@ import pytest
 
 from transit_schedule.const import GTFS_ZIP_FILE, TARGET_DIRECTION
 from transit_schedule.data_parser import ParseTransitData
+from transit_schedule.metrics import REGISTRY
 
 
 @pytest.fixture
@@ -55,8 +57,175 @@ def test_get_next_stop_lookahead(mock_is_file_expired, mock_hastus_scraper, mock
     assert next_stop.arrival_time == '06:00:00'
     # Date should be Tuesday (30th)
     assert next_stop.arrival_datetime.date() == datetime.date(2025, 9, 30)
+    assert next_stop.lookahead_days == 1
     assert next_stop.retrieve_method == 'GTFS'
 
+@pytest.fixture
+def weekend_gtfs_zip_file():
+    # Saturday-only route, with a cancelled Saturday
+    with ZipFile(GTFS_ZIP_FILE, 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code,stop_name\n1,123,Test Stop 1')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n'
+                                    'SAM,0,0,0,0,0,1,0,20250101,20251231')
+        zf.writestr('calendar_dates.txt', 'service_id,date,exception_type\nSAM,20251011,2')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n1,10:00:00,10:00:30,1,1')
+        zf.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign\n101,SAM-B1,1,Panama')
+    yield
+    if os.path.exists(GTFS_ZIP_FILE):
+        os.remove(GTFS_ZIP_FILE)
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_stop_multi_day_lookahead(mock_is_file_expired, mock_hastus_scraper, mock_config, weekend_gtfs_zip_file):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'RTL'
+    mock_hastus_scraper.return_value.get_schedule.return_value = []
+    parser = ParseTransitData()
+
+    # Monday: the next bus is on Saturday
+    next_stop = parser.get_next_stop('1', datetime.datetime(2025, 9, 29, 9, 0, 0))
+    assert next_stop.arrival_datetime == datetime.datetime(2025, 10, 4, 10, 0, 0)
+    assert next_stop.lookahead_days == 5
+    assert next_stop.retrieve_method == 'GTFS'
+    # The live scraper was asked about today and the next day before the GTFS look-ahead
+    assert mock_hastus_scraper.return_value.get_schedule.call_count == 2
+
+    # Saturday after the bus: the next Saturday is cancelled, two weeks ahead is out of reach
+    with patch('transit_schedule.data_parser.GTFS_LOOKAHEAD_DAYS', 7):
+        assert parser.get_next_stop('1', datetime.datetime(2025, 10, 4, 11, 0, 0)) is None
+    with patch('transit_schedule.data_parser.GTFS_LOOKAHEAD_DAYS', 14):
+        assert parser.get_next_stop('1', datetime.datetime(2025, 10, 4, 11, 0, 0)).lookahead_days == 14
+
+    # Past the last day of service
+    with patch('transit_schedule.data_parser.GTFS_LOOKAHEAD_DAYS', 14):
+        assert parser.get_next_stop('1', datetime.datetime(2025, 12, 27, 11, 0, 0)) is None
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_stop_live_next_day_before_lookahead(mock_is_file_expired, mock_hastus_scraper, mock_config, weekend_gtfs_zip_file):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'RTL'
+    tuesday_bus = datetime.datetime(2025, 9, 30, 8, 0, 0)
+    mock_hastus_scraper.return_value.get_schedule.side_effect = lambda stop_id, date, **kwargs: [{
+        'arrival_datetime': tuesday_bus, 'arrival_time': '08:00:00', 'route_id': '101', 'trip_headsign': 'Panama',
+    }] if date == tuesday_bus.date() else []
+    parser = ParseTransitData()
+
+    # Monday: the live scraper knows a Tuesday bus, which wins over the Saturday one of GTFS
+    next_stop = parser.get_next_stop('1', datetime.datetime(2025, 9, 29, 9, 0, 0))
+    assert next_stop.arrival_datetime == tuesday_bus
+    assert next_stop.lookahead_days == 1
+    assert next_stop.retrieve_method == 'live scraper'
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_stop_without_live_scraper(mock_is_file_expired, mock_hastus_scraper, mock_config, gtfs_zip_file):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'RTL'
+    parser = ParseTransitData()
+
+    # Monday 23:45: GTFS only knows Tuesday's bus, which the live scraper could precede
+    next_stop = parser.get_next_stop('1', datetime.datetime(2025, 9, 29, 23, 45, 0), live=False)
+    assert next_stop.lookahead_days == 1
+    assert parser.needs_live_lookup([next_stop])
+    mock_hastus_scraper.return_value.get_schedule.assert_not_called()
+
+    # A departure of the day asked for is final
+    next_stop = parser.get_next_stop('1', datetime.datetime(2025, 9, 29, 7, 0, 0), live=False)
+    assert not parser.needs_live_lookup([next_stop])
+    assert parser.needs_live_lookup([])
+    mock_config.transit = 'STM'
+    assert not parser.needs_live_lookup([])
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_stop_previous_service_day(mock_is_file_expired, mock_hastus_scraper, mock_config):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'STM'
+    with ZipFile(GTFS_ZIP_FILE, 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code\n1,123')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n'
+                                    'SEM,1,1,1,1,1,0,0,20250101,20251231\nSAM,0,0,0,0,0,1,0,20250101,20251231')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n'
+                                      '1,00:40:00,00:40:00,1,1\n2,24:30:00,24:30:00,1,1\n3,25:10:00,25:10:00,1,1')
+        zf.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign\n44,SEM,1,Panama\n44,SEM,2,Panama\n44,SAM,3,Panama')
+
+    try:
+        parser = ParseTransitData()
+        # Tuesday 00:10: Monday's 24:30 trip leaves before Tuesday's 00:40 one
+        next_stop = parser.get_next_stop('1', datetime.datetime(2025, 9, 30, 0, 10, 0))
+        assert next_stop.trip_id == '2'
+        assert next_stop.arrival_time == '24:30:00'
+        assert next_stop.arrival_datetime == datetime.datetime(2025, 9, 30, 0, 30, 0)
+        assert next_stop.lookahead_days == 0
+        assert parser.get_next_stop('1', datetime.datetime(2025, 9, 30, 0, 35, 0)).trip_id == '1'
+        # Sunday 01:00 has no service of its own, Saturday's 25:10 trip is still to come
+        next_stop = parser.get_next_stop('1', datetime.datetime(2025, 10, 5, 1, 0, 0))
+        assert next_stop.trip_id == '3'
+        assert next_stop.arrival_datetime == datetime.datetime(2025, 10, 5, 1, 10, 0)
+    finally:
+        os.remove(GTFS_ZIP_FILE)
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_stops_batch(mock_is_file_expired, mock_hastus_scraper, mock_config, gtfs_zip_file):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'STM'
+    parser = ParseTransitData()
+    stop_requests = [('1', None, None), (1, '101', None), ('1', '999', None), ('2', None, None)]
+
+    # Monday 09:00: the 10:00 bus for the first two, nothing for an unknown route or a stop without trips
+    results = parser.get_next_stops(stop_requests, datetime.datetime(2025, 9, 29, 9, 0, 0))
+    assert [result.trip_id if result is not None else None for result in results] == ['1', '1', None, None]
+    assert results[0].retrieve_method == 'GTFS'
+
+    # Monday 23:00: answered by the look-ahead of get_next_stop, like single requests
+    at = datetime.datetime(2025, 9, 29, 23, 0, 0)
+    with patch.object(parser, 'get_next_stop', wraps=parser.get_next_stop) as get_next_stop:
+        results = parser.get_next_stops(stop_requests[:2], at)
+        assert get_next_stop.call_count == 2
+    assert [result.arrival_datetime for result in results] == [datetime.datetime(2025, 9, 30, 6, 0, 0)] * 2
+    assert results[0].equals(parser.get_next_stop('1', at))
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_departures(mock_is_file_expired, mock_hastus_scraper, mock_config, gtfs_zip_file):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'STM'
+    parser = ParseTransitData()
+
+    # Monday 05:00: today's 06:00 and 10:00 buses, then Tuesday's from the look-ahead
+    departures = parser.get_next_departures('1', datetime.datetime(2025, 9, 29, 5, 0, 0), limit=3)
+    assert [departure.arrival_datetime for departure in departures] == [
+        datetime.datetime(2025, 9, 29, 6, 0, 0),
+        datetime.datetime(2025, 9, 29, 10, 0, 0),
+        datetime.datetime(2025, 9, 30, 6, 0, 0),
+    ]
+    assert [departure.lookahead_days for departure in departures] == [0, 0, 1]
+
+    departures = parser.get_next_departures('1', datetime.datetime(2025, 9, 29, 5, 0, 0), limit=1)
+    assert len(departures) == 1
+    assert departures[0].equals(parser.get_next_stop('1', datetime.datetime(2025, 9, 29, 5, 0, 0)))
+    assert parser.get_next_departures('1', datetime.datetime(2025, 9, 29, 5, 0, 0), limit=5, target_route='999') == []
+
 @patch('transit_schedule.data_parser.config')
 @patch('transit_schedule.data_parser.HastusScraper')
 @patch('transit_schedule.data_parser.is_file_expired', return_value=False)
@@ -74,6 +243,23 @@ def test_get_next_stop(mock_is_file_expired, mock_hastus_scraper, mock_config, g
     assert next_stop.arrival_time == '10:00:00'
     assert next_stop.retrieve_method == 'GTFS'
 
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_stop_stage_metrics(mock_is_file_expired, mock_hastus_scraper, mock_config, gtfs_zip_file):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'STM'
+    parser = ParseTransitData()
+    parser.get_next_stop('1', datetime.datetime(2025, 9, 29, 9, 0, 0), target_route='101')
+    parser.refresh()
+
+    metrics = REGISTRY.render()
+    for stage in ('refresh_check', 'service_resolution', 'filtering', 'departure_search', 'arrival_computation'):
+        assert f'transit_schedule_engine_stage_duration_seconds_count{{stage="{stage}"}}' in metrics
+    assert 'transit_schedule_gtfs_feed_load_duration_seconds ' in metrics
+
 @patch('transit_schedule.data_parser.config')
 @patch('transit_schedule.data_parser.HastusScraper')
 @patch('transit_schedule.data_parser.is_file_expired', return_value=False)
@@ -132,14 +318,18 @@ def test_load_data_bad_zip(mock_config, mocker):
         ParseTransitData()
 
 @patch('transit_schedule.data_parser.requests.get')
-def test_download_gtfs_file(mock_get, mocker):
-    mock_res = MagicMock()
-    mock_res.content = b'fake zip content'
-    mock_get.return_value = mock_res
-    
-    mocker.patch('builtins.open', mocker.mock_open())
-    ParseTransitData._download_gtfs_file('fake_path.zip')
+def test_download_gtfs_file(mock_get, tmp_path):
+    zip_buffer = io.BytesIO()
+    with ZipFile(zip_buffer, 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code\nS1,123')
+    mock_res = mock_get.return_value.__enter__.return_value
+    mock_res.status_code = 200
+    mock_res.headers = {'ETag': '"v1"'}
+    mock_res.iter_content.return_value = [zip_buffer.getvalue()]
+
+    assert ParseTransitData._download_gtfs_file(str(tmp_path / 'fake_path.zip'))
     mock_get.assert_called_once()
+    assert (tmp_path / 'fake_path.zip').read_bytes() == zip_buffer.getvalue()
 
 @patch('transit_schedule.data_parser.config')
 @patch('transit_schedule.data_parser.is_file_expired', return_value=False)
@@ -188,30 +378,14 @@ def test_get_service_id_with_exceptions(mock_is_file_expired, mock_config, mocke
     
     parser = ParseTransitData()
     # 2025-09-29 is Monday. Regular service 1 is removed, service 2 is added.
-    service_ids = parser._get_service_ids(datetime.date(2025, 9, 29))
+    calendar = parser.service_calendar
+    service_ids = calendar.service_ids[calendar.active_mask(datetime.date(2025, 9, 29))].tolist()
     assert '2' in service_ids
     assert '1' not in service_ids
     
     if os.path.exists(GTFS_ZIP_FILE):
         os.remove(GTFS_ZIP_FILE)
 
-@patch('transit_schedule.data_parser.config')
-@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
-def test_calculate_arrival_datetimes_midnight(mock_is_file_expired, mock_config, gtfs_zip_file):
-    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
-    mock_config.gtfs_data_dir = '.'
-    parser = ParseTransitData()
-    df = pd.DataFrame({
-        'arrival_time': ['24:15:00', '08:00:00'],
-        'trip_id': ['1', '2']
-    })
-    date = datetime.date(2025, 9, 29)
-    result = parser._calculate_arrival_datetimes(df, date)
-    # 08:00:00 today comes first
-    assert result.iloc[0]['arrival_datetime'] == datetime.datetime(2025, 9, 29, 8, 0, 0)
-    # 24:15:00 becomes 00:15:00 next day (tomorrow)
-    assert result.iloc[1]['arrival_datetime'] == datetime.datetime(2025, 9, 30, 0, 15, 0)
-
 @patch('transit_schedule.data_parser.config')
 @patch('transit_schedule.data_parser.is_file_expired', return_value=False)
 def test_get_stop_date_range(mock_is_file_expired, mock_config, gtfs_zip_file):
@@ -262,17 +436,6 @@ def test_no_service_found_error():
     with pytest.raises(NoServiceFoundError):
         raise NoServiceFoundError("Test")
 
-@patch('transit_schedule.data_parser.config')
-@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
-def test_calculate_arrival_datetimes_error(mock_is_file_expired, mock_config, gtfs_zip_file):
-    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
-    mock_config.gtfs_data_dir = '.'
-    parser = ParseTransitData()
-    # Provide invalid time format to trigger error handling
-    df = pd.DataFrame({'arrival_time': ['invalid_time'], 'trip_id': ['1']})
-    result = parser._calculate_arrival_datetimes(df, datetime.date(2025, 9, 29))
-    assert result.empty
-
 @patch('transit_schedule.data_parser.config')
 @patch('transit_schedule.data_parser.is_file_expired', return_value=False)
 def test_get_stop_date_range_empty(mock_is_file_expired, mock_config, gtfs_zip_file):
@@ -328,31 +491,23 @@ def test_get_next_stop_total_failure(mock_is_file_expired, mock_config, mocker):
 
 @patch('transit_schedule.data_parser.config')
 @patch('transit_schedule.data_parser.is_file_expired', return_value=False)
-def test_get_today_schedule_key_error(mock_is_file_expired, mock_config, gtfs_zip_file):
-    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
-    mock_config.gtfs_data_dir = '.'
-    parser = ParseTransitData()
-    # stop_id 'NONEXISTENT' triggers KeyError
-    result = parser._get_today_schedule(['1'], 'NONEXISTENT')
-    assert result.empty
-
-@patch('transit_schedule.data_parser.config')
-@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
-def test_get_today_schedule_fuzzy_match(mock_is_file_expired, mock_config, mocker):
+def test_get_next_stop_fuzzy_service_match(mock_is_file_expired, mock_config, mocker):
+    mock_config.retrieval_method = 'gtfs'
     mock_config.gtfs_zip_file = GTFS_ZIP_FILE
     mock_config.gtfs_data_dir = '.'
+    mock_config.transit = 'STM'
     
     with ZipFile(GTFS_ZIP_FILE, 'w') as zf:
         zf.writestr('stops.txt', 'stop_id,stop_code\nS1,123')
-        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1-EXTRA,1,1,1,1,1,1,1,20250101,20251231')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1,1,1,1,1,1,1,1,20250101,20251231')
         zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n1,10:00:00,10:00:30,S1,1')
         zf.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign\n101,1-EXTRA,1,Panama')
 
     parser = ParseTransitData()
-    # Searching for '1' should fuzzy match '1-EXTRA'
-    result = parser._get_today_schedule(['1'], 'S1')
-    assert not result.empty
-    assert result.iloc[0]['service_id'] == '1-EXTRA'
+    # The calendar service '1' should fuzzy match the trips of '1-EXTRA'
+    result = parser.get_next_stop('S1', datetime.datetime(2025, 9, 29, 9, 0, 0))
+    assert result is not None
+    assert result['service_id'] == '1-EXTRA'
     
     if os.path.exists(GTFS_ZIP_FILE):
         os.remove(GTFS_ZIP_FILE)
@@ -377,3 +532,87 @@ def test_load_data_no_calendar_dates(mock_is_file_expired, mock_config, mocker):
     
     if os.path.exists(GTFS_ZIP_FILE):
         os.remove(GTFS_ZIP_FILE)
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_load_data_compact_mode(mock_is_file_expired, mock_config, gtfs_zip_file):
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    with patch('transit_schedule.data_parser.GTFS_LOAD_MODE', 'compact'):
+        parser = ParseTransitData()
+
+    assert list(parser.stop_times.columns) == ['trip_id', 'arrival_secs', 'route_id', 'service_id', 'trip_headsign']
+    assert parser.stop_times['arrival_secs'].dtype == 'int32'
+    assert parser.stop_times['arrival_secs'].tolist() == [36000, 21600]
+    assert isinstance(parser.stop_times['trip_id'].dtype, pd.CategoricalDtype)
+    assert set(parser.trips.columns) == {'route_id', 'service_id', 'trip_id', 'trip_headsign'}
+    for column in ('route_id', 'service_id', 'trip_headsign'):
+        assert isinstance(parser.trips[column].dtype, pd.CategoricalDtype)
+        assert isinstance(parser.stop_times[column].dtype, pd.CategoricalDtype)
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_load_data_full_mode(mock_is_file_expired, mock_hastus_scraper, mock_config, gtfs_zip_file):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = GTFS_ZIP_FILE
+    mock_config.gtfs_data_dir = '.'
+    with patch('transit_schedule.data_parser.GTFS_LOAD_MODE', 'full'):
+        parser = ParseTransitData()
+
+    assert 'departure_time' in parser.stop_times.columns
+    assert parser.stop_times['arrival_time'].tolist() == ['10:00:00', '06:00:00']
+    next_stop = parser.get_next_stop('1', datetime.datetime(2025, 9, 29, 9, 0, 0))
+    assert next_stop.arrival_time == '10:00:00'
+
+@pytest.fixture
+def filtered_gtfs_dir(tmp_path):
+    with ZipFile(tmp_path / 'gtfs_test.zip', 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code\nS1,123\nS2,456\nS3,789')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n'
+                                    'SEM,1,1,1,1,1,0,0,20250101,20251231\nSAM,0,0,0,0,0,1,0,20250101,20251231')
+        zf.writestr('calendar_dates.txt', 'service_id,date,exception_type\nSEM,20251013,2\nSAM,20251013,1')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n'
+                                      '1,10:00:00,10:00:00,S1,1\n1,10:05:00,10:05:00,S2,2\n'
+                                      '2,11:00:00,11:00:00,S3,1\n3,12:00:00,12:00:00,S2,1')
+        zf.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign\n44,SEM-1,1,Panama\n8,SAM,2,Longueuil\n44,SAM,3,Panama')
+    return tmp_path
+
+@patch('transit_schedule.data_parser.GTFS_LOAD_MODE', 'filtered')
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_load_data_filtered_mode(mock_is_file_expired, mock_hastus_scraper, mock_config, filtered_gtfs_dir):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = 'gtfs_test.zip'
+    mock_config.gtfs_data_dir = str(filtered_gtfs_dir)
+    parser = ParseTransitData(stop_codes=[123])
+
+    assert parser.stop_times.index.tolist() == ['S1']
+    assert parser.trips['trip_id'].tolist() == ['1']
+    assert parser.calendar['service_id'].tolist() == ['SEM']
+    assert parser.calendar_dates['service_id'].tolist() == ['SEM']
+    # Every stop can still be resolved
+    assert parser.get_stop_id(789) == 'S3'
+    assert parser.get_next_stop('S1', datetime.datetime(2025, 9, 29, 9, 0, 0)).trip_id == '1'
+
+    # A changed stop list, on restart, loads its own variant
+    parser = ParseTransitData(stop_codes=[456, 123])
+    assert parser.stop_codes == ['123', '456']
+    assert sorted(parser.stop_times.index.tolist()) == ['S1', 'S2', 'S2']
+    assert sorted(parser.trips['trip_id'].tolist()) == ['1', '3']
+    assert parser.get_next_stop('S2', datetime.datetime(2025, 10, 4, 9, 0, 0)).trip_id == '3'
+
+@patch('transit_schedule.data_parser.GTFS_LOAD_MODE', 'filtered')
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_load_data_filtered_mode_without_stops(mock_is_file_expired, mock_hastus_scraper, mock_config, filtered_gtfs_dir):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = 'gtfs_test.zip'
+    mock_config.gtfs_data_dir = str(filtered_gtfs_dir)
+    parser = ParseTransitData()
+
+    assert len(parser.stop_times) == 4
+    assert parser._get_load_variant() == 'compact'
+    assert ParseTransitData(stop_codes=['456', '123'])._get_load_variant() != ParseTransitData(stop_codes=['123'])._get_load_variant()
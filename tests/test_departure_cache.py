@@ -0,0 +1,46 @@
+import datetime
+from types import SimpleNamespace
+
+from transit_schedule.departure_cache import DepartureCache, departure_etag, seconds_until
+
+NOW = datetime.datetime(2026, 3, 16, 8, 0, 0)
+
+
+def departure(minutes):
+    return SimpleNamespace(arrival_datetime=NOW + datetime.timedelta(minutes=minutes))
+
+
+def test_departure_cache_valid_until_departure():
+    cache = DepartureCache()
+    cache.put(('S1', None, None), departure(15), 'v1')
+
+    assert cache.get(('S1', None, None), NOW, 'v1').arrival_datetime == NOW + datetime.timedelta(minutes=15)
+    assert cache.get(('S1', None, None), NOW + datetime.timedelta(minutes=14, seconds=59), 'v1') is not None
+    # The bus left, or the feed was replaced
+    assert cache.get(('S1', None, None), NOW + datetime.timedelta(minutes=15), 'v1') is None
+    assert cache.get(('S1', None, None), NOW, 'v2') is None
+    assert cache.get(('S1', '44', None), NOW, 'v1') is None
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_departure_cache_bounds():
+    cache = DepartureCache(max_entries=2)
+    cache.put(('S1', None, None), None, 'v1')
+    assert len(cache) == 0
+
+    for stop_id in ('S1', 'S2', 'S3'):
+        cache.put((stop_id, None, None), departure(5), 'v1')
+    assert len(cache) == 2
+    assert cache.get(('S1', None, None), NOW, 'v1') is None
+    assert cache.get(('S3', None, None), NOW, 'v1') is not None
+
+    disabled = DepartureCache(max_entries=0)
+    disabled.put(('S1', None, None), departure(5), 'v1')
+    assert len(disabled) == 0
+
+
+def test_etag_and_max_age():
+    assert departure_etag(52611, '44', '08:15:00') == departure_etag(52611, '44', '08:15:00')
+    assert departure_etag(52611, '44', '08:15:00') != departure_etag(52611, '44', '08:30:00')
+    assert seconds_until(departure(15), NOW) == 900
+    assert seconds_until(departure(-1), NOW) == 0
@@ -0,0 +1,132 @@
+import datetime
+from unittest.mock import patch
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transit_schedule.data_parser import ParseTransitData
+from transit_schedule.departure_index import DepartureIndex, format_gtfs_time, parse_gtfs_times
+from transit_schedule.service_calendar import ServiceMatcher
+
+
+@pytest.fixture
+def index():
+    stop_times = pd.DataFrame({
+        'stop_id': ['A', 'A', 'A', 'B', 'A', 'A'],
+        'trip_id': ['t3', 't1', 't2', 't1', 't4', 'unknown'],
+        'arrival_secs': [3600, 7200, 5400, 7300, 90000, 100],
+    }).set_index('stop_id')
+    trips = pd.DataFrame({
+        'trip_id': ['t1', 't2', 't3', 't4'],
+        'route_id': ['44', '144', '44', '44'],
+        'service_id': ['SEM', 'SEM', 'SAM-1', 'SEM'],
+        'trip_headsign': ['Panama', 'Longueuil', 'Panama', None],
+    })
+    ParseTransitData._denormalize_trips(stop_times, trips)
+    return DepartureIndex.build(stop_times, trips)
+
+
+def service_mask(index, service_ids, base=False):
+    """Index mask of calendar services all active on a day, matched like ParseTransitData does."""
+    matcher = ServiceMatcher.build(np.array(sorted(service_ids)), index.service_ids)
+    active = np.ones(len(service_ids), dtype=bool)
+    return matcher.base_mask(active) if base else matcher.exact_mask(active)
+
+
+def test_parse_gtfs_times():
+    secs = parse_gtfs_times(pd.Series(['08:00:00', '25:30:15', '6:05:00', 'invalid', None, '08:00:00']))
+    assert secs.dtype == np.int32
+    assert secs.tolist() == [28800, 91815, 21900, -1, -1, 28800]
+
+
+def test_format_gtfs_time():
+    assert format_gtfs_time(91815) == '25:30:15'
+    assert format_gtfs_time(21900) == '06:05:00'
+
+
+def test_build_sorts_departures_per_stop(index):
+    assert index.stop_ids.tolist() == ['A', 'B']
+    assert index.offsets.tolist() == [0, 4, 5]
+    # Unknown trips are dropped, the rest is ordered by arrival time
+    assert index.arrival_secs[0:4].tolist() == [3600, 5400, 7200, 90000]
+    assert index.route_ids[index.route_codes[0:4]].tolist() == ['44', '144', '44', '44']
+
+
+def test_next_departures(index):
+    sem = service_mask(index, ['SEM'])
+    positions = index.next_departures('A', 5400, sem, limit=None)
+    assert index.arrival_secs[positions].tolist() == [7200, 90000]
+
+    first = index.next_departures('A', 0, sem)
+    assert index.arrival_secs[first].tolist() == [5400]
+
+    positions = index.next_departures('A', 0, sem, index.trip_filter('44'), limit=None)
+    assert index.arrival_secs[positions].tolist() == [7200, 90000]
+
+    positions = index.next_departures('A', 0, sem, index.trip_filter(direction='panama'), limit=None)
+    assert index.arrival_secs[positions].tolist() == [7200]
+
+
+def test_trip_filter(index):
+    # t1: 44 Panama, t2: 144 Longueuil, t3: 44 Panama, t4: 44 without headsign
+    assert index.trip_ids[index.trip_filter('44', 'PANAMA')[:-1]].tolist() == ['t1', 't3']
+    assert index.trip_ids[index.trip_filter('144')[:-1]].tolist() == ['t2']
+    assert not index.trip_filter('144', 'panama').any()
+    assert index.trip_filter('44', 'PANAMA') is index.trip_filter(44, 'PANAMA')
+
+
+def test_headsign_mask_is_literal(index):
+    # Client-supplied directions are plain text, never regular expressions
+    assert not index.headsign_mask('(')[:-1].any()
+    assert not index.headsign_mask('pan.ma')[:-1].any()
+    assert index.headsigns[index.headsign_mask('NAM')[:-1]].tolist() == ['Panama']
+
+
+def test_denormalized_headsigns(index):
+    assert [index.headsign(pos) for pos in range(4)] == ['Panama', 'Longueuil', 'Panama', None]
+
+
+def test_next_departures_unknown_stop(index):
+    assert len(index.next_departures('Z', 0, service_mask(index, ['SEM']))) == 0
+    assert not index.has_service('Z', service_mask(index, ['SEM']))
+
+
+def test_last_arrival_secs(index):
+    assert index.last_arrival_secs('A') == index.arrival_secs[slice(*index.stop_range('A'))].max()
+    assert index.last_arrival_secs('Z') is None
+
+
+def test_base_service_match(index):
+    assert not index.has_service('A', service_mask(index, ['SAM']))
+    assert index.has_service('A', service_mask(index, ['SAM'], base=True))
+
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_next_stop_filters(mock_is_file_expired, mock_hastus_scraper, mock_config, tmp_path):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = 'gtfs_test.zip'
+    mock_config.gtfs_data_dir = str(tmp_path)
+    mock_config.transit = 'STM'
+    with ZipFile(tmp_path / 'gtfs_test.zip', 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code\nS1,123')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1,1,1,1,1,1,1,1,20250101,20251231')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n'
+                                      '1,10:00:00,10:00:00,S1,1\n2,10:10:00,10:10:00,S1,1\n3,10:20:00,10:20:00,S1,1')
+        zf.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign\n'
+                                 '44,1,1,Terminus Panama\n144,1,2,Terminus Panama\n44,1,3,Terminus Longueuil')
+
+    parser = ParseTransitData()
+    now = datetime.datetime(2025, 9, 29, 9, 0, 0)
+
+    assert parser.get_next_stop('S1', now).trip_id == '1'
+    assert parser.get_next_stop('S1', now, target_route='144').trip_id == '2'
+    next_stop = parser.get_next_stop('S1', now, target_route='44', target_direction='longueuil')
+    assert next_stop.trip_id == '3'
+    assert next_stop.arrival_time == '10:20:00'
+    assert next_stop.arrival_datetime == datetime.datetime(2025, 9, 29, 10, 20, 0)
+    # A direction is matched as plain text, even with regex metacharacters
+    assert parser.get_next_stop('S1', now, target_direction='(') is None
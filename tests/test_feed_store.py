@@ -0,0 +1,111 @@
+import datetime
+import os
+from unittest.mock import patch
+from zipfile import ZipFile
+
+import numpy as np
+import pytest
+
+from transit_schedule.data_parser import ParseTransitData
+from transit_schedule.feed_store import feed_store_path, open_feed_store, write_feed_store
+
+
+def write_feed(path, headsign):
+    with ZipFile(path, 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code,stop_name\nS1,123,Test Stop 1\nS2,,Station')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1,1,1,1,1,1,0,0,20250101,20251231')
+        zf.writestr('calendar_dates.txt', 'service_id,date,exception_type\n1,20250929,2')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n'
+                                      '1,10:00:00,10:00:00,S1,1\n2,25:10:00,25:10:00,S1,1')
+        zf.writestr('trips.txt', f'route_id,service_id,trip_id,trip_headsign\n44,1,1,{headsign}\n44,1,2,{headsign}')
+
+
+@pytest.fixture
+def gtfs_env(tmp_path):
+    write_feed(tmp_path / 'gtfs_test.zip', 'Panama')
+    with patch('transit_schedule.data_parser.GTFS_FEED_STORE_ENABLED', True), \
+            patch('transit_schedule.data_parser.config') as mock_config, \
+            patch('transit_schedule.data_parser.HastusScraper'), \
+            patch('transit_schedule.data_parser.is_file_expired', return_value=False):
+        mock_config.retrieval_method = 'gtfs'
+        mock_config.transit = 'STM'
+        mock_config.gtfs_zip_file = 'gtfs_test.zip'
+        mock_config.gtfs_data_dir = str(tmp_path)
+        yield tmp_path
+
+
+def test_feed_store_round_trip(tmp_path):
+    arrays = {
+        'ids': np.array(['A', 'BB', 'CCC']),
+        'secs': np.array([1, 2, 3], dtype=np.int32),
+        'bitmap': np.array([[True, False], [False, True]]),
+        'empty': np.array([], dtype=np.int64),
+    }
+    path = str(tmp_path / 'test.feed')
+    assert write_feed_store(path, arrays, {'zip_digest': 'abc'})
+
+    loaded, meta = open_feed_store(path)
+    assert meta == {'zip_digest': 'abc'}
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+        assert loaded[name].ctypes.data % 64 == 0
+        assert not loaded[name].flags.writeable
+
+
+def test_feed_store_survives_replacement(tmp_path):
+    path = str(tmp_path / 'test.feed')
+    write_feed_store(path, {'secs': np.array([1, 2, 3])}, {})
+    loaded, _ = open_feed_store(path)
+
+    write_feed_store(path, {'secs': np.array([4, 5])}, {})
+    assert loaded['secs'].tolist() == [1, 2, 3]
+    assert open_feed_store(path)[0]['secs'].tolist() == [4, 5]
+
+
+def test_open_feed_store_missing_or_foreign(tmp_path):
+    assert open_feed_store(str(tmp_path / 'missing.feed')) is None
+    (tmp_path / 'foreign.feed').write_bytes(b'PK\x03\x04 not a feed store')
+    assert open_feed_store(str(tmp_path / 'foreign.feed')) is None
+
+
+def test_feed_store_path():
+    assert feed_store_path('data/gtfs_stm.zip', 'compact') == 'data/gtfs_stm.compact.feed'
+
+
+def test_parsers_share_the_feed_store(gtfs_env):
+    builder = ParseTransitData()
+    assert os.path.isfile(feed_store_path(str(gtfs_env / 'gtfs_test.zip'), 'compact'))
+
+    with patch.object(ParseTransitData, '_read_gtfs_tables') as mock_read:
+        worker = ParseTransitData()
+        mock_read.assert_not_called()
+
+    now = datetime.datetime(2025, 9, 30, 9, 0, 0)
+    for parser in (builder, worker):
+        assert parser.get_stop_id(123) == 'S1'
+        assert parser.get_stop_id(456) is None
+        next_stop = parser.get_next_stop('S1', now)
+        assert next_stop.trip_id == '1'
+        assert next_stop.trip_headsign == 'Panama'
+        assert parser.get_next_stop('S1', datetime.datetime(2025, 9, 30, 11, 0, 0)).arrival_time == '25:10:00'
+        assert parser.min_date == 20250101
+        # The calendar_dates.txt removal is part of the mapped service bitmap: look ahead to the next day
+        assert parser.get_next_stop('S1', datetime.datetime(2025, 9, 29, 9, 0, 0)).arrival_datetime.date() == now.date()
+        assert not parser.departure_index.arrival_secs.flags.writeable
+
+
+def test_worker_picks_up_replaced_feed_store(gtfs_env):
+    worker = ParseTransitData()
+    builder = ParseTransitData()
+    assert not worker._feed_store_replaced()
+
+    write_feed(gtfs_env / 'gtfs_test.zip', 'Longueuil')
+    with patch.object(ParseTransitData, '_download_gtfs_file'):
+        builder.refresh(force=True)
+    assert worker._feed_store_replaced()
+
+    with patch.object(ParseTransitData, '_read_gtfs_tables') as mock_read:
+        worker.refresh()
+        mock_read.assert_not_called()
+    assert worker.get_next_stop('S1', datetime.datetime(2025, 9, 30, 9, 0, 0)).trip_headsign == 'Longueuil'
@@ -0,0 +1,126 @@
+import io
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from transit_schedule.data_parser import ParseTransitData
+from transit_schedule.util import settings_from_file
+
+LAST_MODIFIED = 'Mon, 29 Sep 2025 08:00:00 GMT'
+
+
+def make_zip(headsign='Panama') -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code\nS1,123')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1,1,1,1,1,1,1,1,20250101,20251231')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n1,10:00:00,10:00:00,S1,1')
+        zf.writestr('trips.txt', f'route_id,service_id,trip_id,trip_headsign\n44,1,1,{headsign}')
+    return buffer.getvalue()
+
+
+class FeedServer(ThreadingHTTPServer):
+    """Stand-in for the agency web server, answering conditional requests like a CDN would."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FeedHandler)
+        self.body = make_zip()
+        self.etag = '"v1"'
+        self.requests = []
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/gtfs.zip'
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(server.body)))
+        self.send_header('ETag', server.etag)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(server.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    server = FeedServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with patch('transit_schedule.data_parser.GTFS_URL', server.url):
+        yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_writes_zip_and_metadata(feed_server, tmp_path):
+    zip_path = str(tmp_path / 'gtfs.zip')
+    assert ParseTransitData._download_gtfs_file(zip_path)
+
+    with open(zip_path, 'rb') as fdesc:
+        assert fdesc.read() == feed_server.body
+    assert settings_from_file(f'{zip_path}.meta.json') == {'etag': '"v1"', 'last_modified': LAST_MODIFIED}
+    assert 'If-None-Match' not in feed_server.requests[0]
+    assert sorted(os.listdir(tmp_path)) == ['gtfs.zip', 'gtfs.zip.meta.json']
+
+
+def test_unchanged_feed_is_not_downloaded_again(feed_server, tmp_path):
+    zip_path = str(tmp_path / 'gtfs.zip')
+    ParseTransitData._download_gtfs_file(zip_path)
+    os.utime(zip_path, (0, 0))
+
+    assert not ParseTransitData._download_gtfs_file(zip_path)
+    assert feed_server.requests[1]['If-None-Match'] == '"v1"'
+    assert feed_server.requests[1]['If-Modified-Since'] == LAST_MODIFIED
+    # The expiry clock restarts, the content is untouched
+    assert os.path.getmtime(zip_path) > 0
+    with open(zip_path, 'rb') as fdesc:
+        assert fdesc.read() == feed_server.body
+
+
+def test_corrupted_download_keeps_current_file(feed_server, tmp_path):
+    zip_path = str(tmp_path / 'gtfs.zip')
+    ParseTransitData._download_gtfs_file(zip_path)
+
+    feed_server.etag = '"v2"'
+    feed_server.body = feed_server.body[:len(feed_server.body) // 2]
+    with pytest.raises(zipfile.BadZipFile):
+        ParseTransitData._download_gtfs_file(zip_path)
+
+    with open(zip_path, 'rb') as fdesc:
+        assert fdesc.read() == make_zip()
+    assert sorted(os.listdir(tmp_path)) == ['gtfs.zip', 'gtfs.zip.meta.json']
+
+
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+def test_refresh_skips_reparse_when_not_modified(mock_hastus_scraper, mock_config, feed_server, tmp_path):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = 'gtfs.zip'
+    mock_config.gtfs_data_dir = str(tmp_path)
+    parser = ParseTransitData()
+    feed = parser._feed
+
+    parser.refresh(force=True)
+    assert parser._feed is feed
+
+    feed_server.etag = '"v2"'
+    feed_server.body = make_zip('Longueuil')
+    parser.refresh(force=True)
+    assert parser._feed is not feed
+    assert parser.trips['trip_headsign'].tolist() == ['Longueuil']
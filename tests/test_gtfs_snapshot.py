@@ -0,0 +1,115 @@
+import os
+from unittest.mock import patch
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transit_schedule.data_parser import ParseTransitData
+from transit_schedule.gtfs_snapshot import (
+    file_digest,
+    load_snapshot,
+    remove_stale_snapshots,
+    save_snapshot,
+    snapshot_path,
+)
+
+
+@pytest.fixture
+def gtfs_dir(tmp_path):
+    with ZipFile(tmp_path / 'gtfs_test.zip', 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code,stop_name\n1,123,Test Stop 1\n2,,Station')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1,1,1,1,1,1,0,0,20250101,20251231')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n1,10:00:00,10:00:30,1,1\n2,25:10:00,25:10:30,1,1')
+        zf.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign\n101,1,1,Panama\n101,1,2,')
+    return tmp_path
+
+
+def test_snapshot_round_trip(tmp_path):
+    tables = {
+        'stops': pd.DataFrame({'stop_code': ['123', None], 'stop_id': ['1', '2'], 'stop_lat': [45.5, 45.6]}).set_index('stop_code'),
+        'trips': pd.DataFrame({'trip_id': ['1', '2'], 'route_id': pd.Categorical(['44', '44'])}),
+        'calendar_dates': pd.DataFrame(columns=['service_id', 'date', 'exception_type']),
+    }
+    path = str(tmp_path / 'snap.npz')
+    assert save_snapshot(path, tables)
+
+    loaded = load_snapshot(path)
+    assert loaded['stops'].index.name == 'stop_code'
+    assert loaded['stops'].index[0] == '123'
+    assert pd.isna(loaded['stops'].index[1])
+    assert loaded['stops']['stop_lat'].tolist() == [45.5, 45.6]
+    assert loaded['trips']['trip_id'].tolist() == ['1', '2']
+    assert isinstance(loaded['trips']['route_id'].dtype, pd.CategoricalDtype)
+    assert loaded['calendar_dates'].empty
+    assert list(loaded['calendar_dates'].columns) == ['service_id', 'date', 'exception_type']
+
+
+def test_load_snapshot_missing_or_foreign(tmp_path):
+    assert load_snapshot(str(tmp_path / 'missing.npz')) is None
+
+    path = str(tmp_path / 'foreign.npz')
+    np.savez(path, __meta__=np.array('{"version": 0}'))
+    assert load_snapshot(path) is None
+
+
+def test_snapshot_path_is_keyed_by_content(gtfs_dir):
+    zip_path = str(gtfs_dir / 'gtfs_test.zip')
+    digest = file_digest(zip_path)
+    assert snapshot_path(zip_path, digest) == str(gtfs_dir / f'gtfs_test.{digest[:16]}.npz')
+
+
+def test_remove_stale_snapshots(gtfs_dir):
+    zip_path = str(gtfs_dir / 'gtfs_test.zip')
+    old = gtfs_dir / 'gtfs_test.aaaaaaaaaaaaaaaa.compact.npz'
+    keep = gtfs_dir / 'gtfs_test.bbbbbbbbbbbbbbbb.compact.npz'
+    other_variants = [gtfs_dir / 'gtfs_test.aaaaaaaaaaaaaaaa.npz',
+                      gtfs_dir / 'gtfs_test.aaaaaaaaaaaaaaaa.full.npz',
+                      gtfs_dir / 'gtfs_test.aaaaaaaaaaaaaaaa.filtered-0123456789ab.npz']
+    other = gtfs_dir / 'gtfs_other.aaaaaaaaaaaaaaaa.compact.npz'
+    for path in (old, keep, other, *other_variants):
+        path.write_bytes(b'')
+
+    remove_stale_snapshots(zip_path, keep=str(keep), variant='compact')
+    assert not old.exists()
+    assert keep.exists()
+    assert other.exists()
+    assert all(path.exists() for path in other_variants)
+
+
+def test_remove_stale_snapshots_without_variant(gtfs_dir):
+    zip_path = str(gtfs_dir / 'gtfs_test.zip')
+    old = gtfs_dir / 'gtfs_test.aaaaaaaaaaaaaaaa.npz'
+    keep = gtfs_dir / 'gtfs_test.bbbbbbbbbbbbbbbb.npz'
+    compact = gtfs_dir / 'gtfs_test.aaaaaaaaaaaaaaaa.compact.npz'
+    for path in (old, keep, compact):
+        path.write_bytes(b'')
+
+    remove_stale_snapshots(zip_path, keep=str(keep))
+    assert not old.exists()
+    assert keep.exists()
+    assert compact.exists()
+
+
+@patch('transit_schedule.data_parser.GTFS_SNAPSHOT_ENABLED', True)
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_parser_writes_then_uses_snapshot(mock_is_file_expired, mock_hastus_scraper, mock_config, gtfs_dir):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = 'gtfs_test.zip'
+    mock_config.gtfs_data_dir = str(gtfs_dir)
+
+    cold = ParseTransitData()
+    snapshots = [name for name in os.listdir(gtfs_dir) if name.endswith('.npz')]
+    assert len(snapshots) == 1
+
+    with patch.object(ParseTransitData, '_read_gtfs_tables') as mock_read:
+        warm = ParseTransitData()
+        mock_read.assert_not_called()
+
+    assert warm.stops.index.tolist() == cold.stops.index.tolist()
+    assert warm.stop_times['arrival_secs'].tolist() == [36000, 90600]
+    assert warm.trips['trip_headsign'].isna().tolist() == [False, True]
+    assert warm.min_date == 20250101
@@ -0,0 +1,65 @@
+import os
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from transit_schedule.gunicorn_server import GunicornServer, gunicorn_options
+
+
+def test_gunicorn_options():
+    options = gunicorn_options(8080, 3, 0)
+    assert options['bind'] == '0.0.0.0:8080'
+    assert options['workers'] == 3
+    assert options['threads'] == 1
+    assert options['preload_app'] is True
+
+
+def test_gunicorn_server_loads_app_once():
+    app = Flask(__name__)
+    app_factory = MagicMock(return_value=app)
+    server = GunicornServer(app_factory, gunicorn_options(8080, 4, 2))
+
+    assert server.cfg.preload_app is True
+    assert server.cfg.workers == 4
+    assert server.cfg.threads == 2
+    assert server.wsgi() is app
+    assert server.wsgi() is app
+    app_factory.assert_called_once()
+
+
+def test_post_fork_starts_background_refresh():
+    app = Flask(__name__)
+    transit_data = MagicMock()
+    app.extensions['transit_data'] = transit_data
+    server = GunicornServer(lambda: app, gunicorn_options(8080, 2, 1))
+    server.wsgi()
+
+    server.cfg.post_fork(MagicMock(), MagicMock(pid=1234))
+
+    transit_data.start_background_refresh.assert_called_once()
+    transit_data.scraper.session.close.assert_called_once()
+    assert transit_data.scraper.fetches.calls == 0
+
+
+def test_workers_share_metrics(mocker):
+    registry = mocker.patch('transit_schedule.gunicorn_server.REGISTRY')
+    app = Flask(__name__)
+    app.extensions['transit_data'] = None
+    server = GunicornServer(lambda: app, gunicorn_options(8080, 2, 1))
+
+    server.cfg.on_starting(MagicMock())
+    server.cfg.post_fork(MagicMock(), MagicMock(pid=1234))
+
+    registry.reset.assert_called_once()
+    registry.share.assert_called_once_with(server.metrics_dir, 1234)
+    assert os.path.isdir(server.metrics_dir)
+    server.cfg.on_exit(MagicMock())
+    assert not os.path.exists(server.metrics_dir)
+
+
+def test_post_fork_without_transit_data():
+    app = Flask(__name__)
+    app.extensions['transit_data'] = None
+    server = GunicornServer(lambda: app, gunicorn_options(8080, 2, 1))
+
+    server.cfg.post_fork(MagicMock(), MagicMock(pid=1234))
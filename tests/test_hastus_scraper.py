@@ -1,12 +1,15 @@
 
+import concurrent.futures
 import datetime
 import json
+import threading
+import time
 from unittest.mock import MagicMock
 
 import pytest
 import requests
 
-from transit_schedule.hastus_scraper import HastusScraper
+from transit_schedule.hastus_scraper import HastusScraper, observe_response_duration
 
 
 @pytest.fixture
@@ -261,3 +264,57 @@ def test_parse_html_weekly_schedule_all_categories(scraper):
     assert datetime.time(8, 0) in data['semaine']
     assert datetime.time(1, 0) in data['samedi']
     assert datetime.time(1, 0) in data['dimanche']
+
+def test_get_schedule_by_params_coalesces_concurrent_fetches(scraper, mocker):
+    """Concurrent requests for an uncached week wait for one fetch and share its result."""
+    scraper.buildtime = "20260408"
+    mocker.patch.object(scraper, '_get_now', return_value=datetime.datetime(2026, 4, 22, 10, 0))
+    release = threading.Event()
+    week = {'semaine': [datetime.time(10, 30)], 'samedi': [], 'dimanche': []}
+
+    def fetch(params, date, cache_key):
+        release.wait(5)
+        scraper.schedule_cache[cache_key] = week
+
+    mock_fetch = mocker.patch.object(scraper, '_fetch_and_cache', side_effect=fetch)
+    params = {"stop": "2752", "pattern": "P1", "ligne": " 44 Direction Panama"}
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        results = [pool.submit(scraper.get_schedule_by_params, params, datetime.date(2026, 4, 22)) for _ in range(8)]
+        while scraper.fetches.coalesced < 7:
+            time.sleep(0.01)
+        release.set()
+        arrivals = [result.result() for result in results]
+
+    mock_fetch.assert_called_once()
+    assert scraper.fetches.calls == 1
+    assert all(arrival == [datetime.datetime(2026, 4, 22, 10, 30)] for arrival in arrivals)
+    # Once cached, the week is not fetched again
+    scraper.get_schedule_by_params(params, datetime.date(2026, 4, 23))
+    assert scraper.fetches.calls == 1
+
+
+def test_get_schedule_by_params_cache_metrics(scraper, mocker):
+    scraper.buildtime = "20260408"
+    mocker.patch.object(scraper, '_get_now', return_value=datetime.datetime(2026, 4, 22, 10, 0))
+    mock_lookups = mocker.patch('transit_schedule.hastus_scraper.SCRAPER_CACHE_LOOKUPS')
+    week_start = datetime.date(2026, 4, 20)
+    scraper.schedule_cache[("2752", "P1", week_start)] = {'semaine': [], 'samedi': [], 'dimanche': []}
+    mocker.patch.object(scraper, '_fetch_and_cache', side_effect=lambda params, date, cache_key:
+                        scraper.schedule_cache.setdefault(cache_key, {'semaine': [], 'samedi': [], 'dimanche': []}))
+    params = {"stop": "2752", "pattern": "P1", "ligne": " 44 Direction Panama"}
+
+    scraper.get_schedule_by_params(params, datetime.date(2026, 4, 22))
+    scraper.get_schedule_by_params(params, datetime.date(2026, 4, 29))
+
+    assert [call.args for call in mock_lookups.inc.call_args_list] == [('hit',), ('miss',)]
+
+
+def test_observe_response_duration(mocker):
+    mock_histogram = mocker.patch('transit_schedule.hastus_scraper.SCRAPER_HTTP_DURATION')
+    response = MagicMock()
+    response.url = "https://madprep_i.rtl-longueuil.qc.ca/madOper.php?q=stops_patterns&p=15:2752&s=RTL"
+    response.elapsed = datetime.timedelta(milliseconds=250)
+
+    observe_response_duration(response)
+
+    mock_histogram.observe.assert_called_once_with(0.25, 'stops_patterns')
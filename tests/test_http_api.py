@@ -0,0 +1,94 @@
+import datetime
+from unittest.mock import MagicMock
+
+from transit_schedule import http_api
+from transit_schedule.departure_cache import DepartureCache
+
+NOW = datetime.datetime(2026, 3, 16, 8, 0, 0)
+
+
+def mock_departure(arrival_datetime, route_id=44):
+    departure = MagicMock()
+    departure.arrival_datetime = arrival_datetime
+    departure.arrival_time = arrival_datetime.strftime('%H:%M:%S')
+    departure.route_id = route_id
+    departure.trip_headsign = "Terminus Panama"
+    return departure
+
+
+def test_route_pattern():
+    pattern = http_api.route_pattern(http_api.DEPARTURES_ROUTE)
+    assert pattern.fullmatch('/transit-schedule/departures/32752').groupdict() == {'stop_code': '32752'}
+    assert pattern.fullmatch('/transit-schedule/departures/abc') is None
+
+
+def test_conditional():
+    departure = mock_departure(NOW + datetime.timedelta(minutes=5))
+    status, payload, headers = http_api.conditional({'a': 1}, [departure, None], NOW, None, 32752)
+    assert (status, payload) == (200, {'a': 1})
+    assert headers['Cache-Control'] == 'max-age=300'
+    etag = headers['ETag']
+    assert etag.startswith('W/"')
+
+    # Weak, strong and wildcard tags all match
+    for if_none_match in (etag, etag[2:], f'"other", {etag}', '*'):
+        assert http_api.conditional({'a': 1}, [departure], NOW, if_none_match, 32752)[:2] == (304, None)
+    # The tag depends on the departure, not on the countdown
+    later = http_api.conditional({'a': 2}, [departure], NOW + datetime.timedelta(minutes=1), None, 32752)
+    assert later[2]['ETag'] == etag
+    assert http_api.conditional({}, [departure], NOW, None, 32753)[2]['ETag'] != etag
+
+
+def test_departures_query():
+    transit_data = MagicMock()
+    transit_data.get_stop_id.return_value = 'id1'
+    assert http_api.departures_query(transit_data, 32752, {'route': '44'}) == (
+        'id1', {'limit': 3, 'stop_code': 32752, 'target_route': '44', 'target_direction': None}, None)
+
+    assert http_api.departures_query(transit_data, 0, {})[2][0] == 400
+    assert http_api.departures_query(transit_data, 32752, {'limit': '21'})[2][0] == 400
+    transit_data.get_stop_id.return_value = None
+    assert http_api.departures_query(transit_data, 32752, {})[2] == (404, {"error": "Stop code not found"}, {})
+
+
+def test_stops_from_body():
+    assert http_api.stops_from_body(b'{"stops": [52611, {"stop_code": 52612}]}') == [52611, {'stop_code': 52612}]
+    assert http_api.stops_from_body(b'not json') is None
+    assert http_api.stops_from_body(b'[52611]') is None
+    assert http_api.stops_from_body(b'') is None
+    assert http_api.stops_from_query('52611,,52612, ') == ['52611', '52612']
+
+
+def test_lookup_next_stops_leaves_live_lookups_uncached():
+    transit_data = MagicMock()
+    transit_data.loaded_at = 1000.0
+    gtfs = mock_departure(NOW + datetime.timedelta(minutes=5))
+    transit_data.get_next_stops.return_value = [gtfs, None]
+    transit_data.needs_live_lookup.side_effect = lambda departures: not departures
+    cache = DepartureCache()
+    stop_requests = [('id1', None, None), ('id2', None, None)]
+
+    next_stops, pending = http_api.lookup_next_stops(transit_data, cache, stop_requests, NOW, live=False)
+
+    assert (next_stops, pending) == ([gtfs, None], [1])
+    transit_data.get_next_stops.assert_called_once_with(stop_requests, NOW, live=False)
+    assert len(cache) == 1
+    # The cached stop is not looked up again
+    transit_data.get_next_stops.return_value = [None]
+    assert http_api.lookup_next_stops(transit_data, cache, stop_requests, NOW, live=False)[0] == [gtfs, None]
+    transit_data.get_next_stops.assert_called_with([('id2', None, None)], NOW, live=False)
+
+
+def test_next_stops_response():
+    results = [{'stop_code': 52611}, {'stop_code': 52612}]
+    stop_requests = [(results[0], ('id1', None, None)), (results[1], ('id2', None, None))]
+    departure = mock_departure(NOW + datetime.timedelta(minutes=5))
+
+    status, payload, headers = http_api.next_stops_response(results, stop_requests, [departure, None], NOW, None,
+                                                            http_api.TIMED_OUT)
+    assert (status, headers) == (200, {})
+    assert payload['stops'][0]['nextstop_nbrmins'] == 5
+    assert payload['stops'][1]['error'] == "Live schedule not available in time"
+
+    assert http_api.next_stops_response(results, stop_requests, [departure, None], NOW, None,
+                                        http_api.SATURATED)[0] == 503
@@ -1,9 +1,11 @@
 import datetime
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+from zipfile import ZipFile
 
 import pytest
 from freezegun import freeze_time
 
+from transit_schedule.data_parser import ParseTransitData
 from transit_schedule.http_server import create_app
 
 
@@ -42,11 +44,47 @@ def test_start_http_server(mocker):
     from transit_schedule.http_server import start_http_server
     mock_app = MagicMock()
     mocker.patch('transit_schedule.http_server.create_app', return_value=mock_app)
+    mocker.patch('transit_schedule.http_server.HTTP_SERVER', 'flask')
     
     start_http_server()
     mock_app.run.assert_called_once_with(host='0.0.0.0', port=80)
 
 
+def test_start_http_server_gunicorn(mocker):
+    """By default the app is preloaded in gunicorn, without a refresh thread in the master."""
+    from transit_schedule.http_server import start_http_server
+    mocker.patch('transit_schedule.http_server.HTTP_SERVER', 'gunicorn')
+    mock_create_app = mocker.patch('transit_schedule.http_server.create_app')
+    mock_server = mocker.patch('transit_schedule.gunicorn_server.GunicornServer')
+
+    start_http_server()
+
+    app_factory, options = mock_server.call_args.args
+    assert options['preload_app'] is True
+    assert options['bind'] == '0.0.0.0:80'
+    mock_server.return_value.run.assert_called_once()
+    app_factory()
+    mock_create_app.assert_called_once_with(background_refresh=False, background_warmup=False)
+
+
+def test_start_http_server_asyncio(mocker):
+    from transit_schedule.http_server import start_http_server
+    mocker.patch('transit_schedule.http_server.HTTP_SERVER', 'asyncio')
+    mock_start = mocker.patch('transit_schedule.asgi_server.start_asgi_server')
+
+    start_http_server()
+    mock_start.assert_called_once_with()
+
+
+def test_create_app_without_background_refresh(mocker):
+    mock_parser = mocker.patch('transit_schedule.http_server.data_parser.ParseTransitData')
+
+    app = create_app(background_refresh=False)
+
+    assert app.extensions['transit_data'] is mock_parser.return_value
+    mock_parser.return_value.start_background_refresh.assert_not_called()
+
+
 @freeze_time("2026-03-16 08:00:00")
 def test_get_next_stop_success(client, mock_transit_data):
     stop_code = 32752
@@ -88,3 +126,235 @@ def test_get_next_stop_no_more_buses(client, mock_transit_data):
     response = client.get('/transit-schedule/nextstop/32752')
     assert response.status_code == 200
     assert response.get_json() == {"error": "No more buses for today"}
+
+@freeze_time("2026-03-16 08:00:00")
+def test_get_departures(client, mock_transit_data):
+    mock_transit_data.get_stop_id.return_value = "stop_id_123"
+    departures = []
+    for minutes in (5, 20):
+        departure = MagicMock()
+        departure.arrival_datetime = datetime.datetime(2026, 3, 16, 8, minutes, 30)
+        departure.arrival_time = f"08:{minutes:02d}:30"
+        departure.route_id = 44
+        departure.trip_headsign = "Terminus Panama"
+        departure.retrieve_method = "GTFS"
+        departures.append(departure)
+    mock_transit_data.get_next_departures.return_value = departures
+
+    response = client.get('/transit-schedule/departures/32752?limit=2&route=44&direction=Panama')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['stop_code'] == 32752
+    assert data['current_time'] == '08:00:00'
+    assert [(d['nextstop_nbrmins'], d['nextstop_nbrsecs']) for d in data['departures']] == [(5, 30), (20, 30)]
+    assert data['departures'][0]['route_id'] == '44'
+    assert data['departures'][0]['retrieve_method'] == 'GTFS'
+
+    args, kwargs = mock_transit_data.get_next_departures.call_args
+    assert args == ("stop_id_123", datetime.datetime(2026, 3, 16, 8, 0, 0))
+    assert kwargs == {'limit': 2, 'stop_code': 32752, 'target_route': '44', 'target_direction': 'Panama'}
+
+
+def test_get_departures_defaults_and_validation(client, mock_transit_data):
+    mock_transit_data.get_stop_id.return_value = "stop_id_123"
+    mock_transit_data.get_next_departures.return_value = []
+
+    response = client.get('/transit-schedule/departures/32752')
+    assert response.status_code == 200
+    assert response.get_json()['departures'] == []
+    _, kwargs = mock_transit_data.get_next_departures.call_args
+    assert kwargs['limit'] == 3
+    assert kwargs['target_route'] is None
+
+    for limit in ('0', '21', 'abc'):
+        assert client.get(f'/transit-schedule/departures/32752?limit={limit}').status_code == 400
+
+    mock_transit_data.get_stop_id.return_value = None
+    assert client.get('/transit-schedule/departures/99999').status_code == 404
+
+
+@freeze_time("2025-09-29 09:00:00")
+@patch('transit_schedule.data_parser.config')
+@patch('transit_schedule.data_parser.HastusScraper')
+@patch('transit_schedule.data_parser.is_file_expired', return_value=False)
+def test_get_departures_direction_is_plain_text(mock_is_file_expired, mock_hastus_scraper, mock_config, tmp_path):
+    mock_config.retrieval_method = 'gtfs'
+    mock_config.gtfs_zip_file = 'gtfs_test.zip'
+    mock_config.gtfs_data_dir = str(tmp_path)
+    mock_config.transit = 'STM'
+    with ZipFile(tmp_path / 'gtfs_test.zip', 'w') as zf:
+        zf.writestr('stops.txt', 'stop_id,stop_code\nS1,123')
+        zf.writestr('calendar.txt', 'service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n1,1,1,1,1,1,1,1,20250101,20251231')
+        zf.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n1,10:00:00,10:00:00,S1,1')
+        zf.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign\n44,1,1,Terminus (Panama)')
+    client = create_app(transit_data=ParseTransitData(), warmup_stops=[]).test_client()
+
+    # Regex metacharacters in the direction are matched literally instead of failing the request
+    response = client.get('/transit-schedule/departures/123?limit=1&direction=(')
+    assert response.status_code == 200
+    assert [departure['trip_headsign'] for departure in response.get_json()['departures']] == ['Terminus (Panama)']
+    response = client.get('/transit-schedule/departures/123?direction=.*')
+    assert response.status_code == 200
+    assert response.get_json()['departures'] == []
+
+
+def mock_departure(arrival_datetime, route_id=44):
+    departure = MagicMock()
+    departure.arrival_datetime = arrival_datetime
+    departure.arrival_time = arrival_datetime.strftime('%H:%M:%S')
+    departure.route_id = route_id
+    departure.trip_headsign = "Terminus Panama"
+    return departure
+
+
+@freeze_time("2026-03-16 08:00:00")
+def test_get_next_stops_batch(client, mock_transit_data):
+    stop_ids = {52611: "id1", 52612: "id2", 52613: "id3"}
+    mock_transit_data.get_stop_id.side_effect = stop_ids.get
+    mock_transit_data.get_next_stops.return_value = [
+        mock_departure(datetime.datetime(2026, 3, 16, 8, 10, 0)), None, mock_departure(datetime.datetime(2026, 3, 16, 8, 2, 0)),
+    ]
+
+    response = client.get('/transit-schedule/nextstop?stops=52611,52612,99999,abc,52613')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['current_time'] == '08:00:00'
+    assert [stop['stop_code'] for stop in data['stops']] == [52611, 52612, 99999, 'abc', 52613]
+    assert data['stops'][0]['nextstop_nbrmins'] == 10
+    assert data['stops'][1]['error'] == "No more buses for today"
+    assert data['stops'][2]['error'] == "Stop code not found"
+    assert data['stops'][3]['error'] == "Stop code must be a positive integer"
+    assert data['stops'][4]['nextstop_nbrmins'] == 2
+
+    # One engine call for every known stop
+    mock_transit_data.get_next_stops.assert_called_once_with(
+        [("id1", None, None), ("id2", None, None), ("id3", None, None)], datetime.datetime(2026, 3, 16, 8, 0, 0), live=True)
+
+
+def test_get_next_stops_batch_post(client, mock_transit_data):
+    mock_transit_data.get_stop_id.return_value = "id1"
+    mock_transit_data.get_next_stops.return_value = [None, None]
+
+    response = client.post('/transit-schedule/nextstop',
+                           json={'stops': [52611, {'stop_code': 52611, 'route': '44', 'direction': 'Panama'}]})
+    assert response.status_code == 200
+    stop_requests, _ = mock_transit_data.get_next_stops.call_args.args
+    assert stop_requests == [("id1", None, None), ("id1", '44', 'Panama')]
+
+
+def test_get_next_stops_batch_validation(client, mock_transit_data):
+    assert client.get('/transit-schedule/nextstop').status_code == 400
+    assert client.post('/transit-schedule/nextstop', data='not json').status_code == 400
+    assert client.post('/transit-schedule/nextstop', json={'stops': 52611}).status_code == 400
+    too_many = ','.join(str(52611 + n) for n in range(101))
+    assert client.get(f'/transit-schedule/nextstop?stops={too_many}').status_code == 400
+    mock_transit_data.get_next_stops.assert_not_called()
+
+
+def test_get_next_stops_batch_invalid_filters(client, mock_transit_data):
+    mock_transit_data.get_stop_id.return_value = "id1"
+    mock_transit_data.get_next_stops.return_value = [None]
+
+    response = client.post('/transit-schedule/nextstop', json={'stops': [
+        {'stop_code': 100, 'route': [1]},
+        {'stop_code': 100, 'route': True},
+        {'stop_code': 100, 'route': 4.5},
+        {'stop_code': 100, 'direction': 5},
+        {'stop_code': 100, 'direction': {'$regex': '('}},
+        {'stop_code': 100, 'route': 44, 'direction': '('},
+    ]})
+    assert response.status_code == 200
+    errors = [stop.get('error') for stop in response.get_json()['stops']]
+    assert errors == ["route must be a string or integer"] * 3 + ["direction must be a string"] * 2 + ["No more buses for today"]
+    # Only the valid stop reaches the engine, with its route as a string
+    mock_transit_data.get_next_stops.assert_called_once()
+    stop_requests, _ = mock_transit_data.get_next_stops.call_args.args
+    assert stop_requests == [("id1", '44', '(')]
+
+
+def test_get_next_stop_cached_until_departure(client, mock_transit_data):
+    mock_transit_data.get_stop_id.return_value = "stop_id_123"
+    mock_transit_data.loaded_at = 1000.0
+    mock_transit_data.get_next_stop.return_value = mock_departure(datetime.datetime(2026, 3, 16, 8, 15, 0))
+
+    with freeze_time("2026-03-16 08:00:00"):
+        first = client.get('/transit-schedule/nextstop/32752')
+    with freeze_time("2026-03-16 08:05:00"):
+        second = client.get('/transit-schedule/nextstop/32752')
+    assert mock_transit_data.get_next_stop.call_count == 1
+    # Only the countdown moves
+    assert (first.get_json()['nextstop_nbrmins'], second.get_json()['nextstop_nbrmins']) == (15, 10)
+    assert first.headers['Cache-Control'] == 'max-age=900'
+    assert second.headers['Cache-Control'] == 'max-age=600'
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.headers['ETag'].startswith('W/')
+
+    # Clients that already have the departure get a 304
+    with freeze_time("2026-03-16 08:06:00"):
+        response = client.get('/transit-schedule/nextstop/32752', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 304
+
+    # The bus left: resolved again
+    with freeze_time("2026-03-16 08:15:00"):
+        client.get('/transit-schedule/nextstop/32752')
+    assert mock_transit_data.get_next_stop.call_count == 2
+
+    # A new feed was swapped in: resolved again
+    mock_transit_data.get_next_stop.return_value = mock_departure(datetime.datetime(2026, 3, 16, 8, 45, 0))
+    mock_transit_data.loaded_at = 2000.0
+    with freeze_time("2026-03-16 08:16:00"):
+        response = client.get('/transit-schedule/nextstop/32752')
+    assert mock_transit_data.get_next_stop.call_count == 3
+    assert response.get_json()['nextstop_nbrmins'] == 29
+    assert response.headers['ETag'] != first.headers['ETag']
+
+
+@freeze_time("2026-03-16 08:00:00")
+def test_get_next_stops_batch_only_resolves_missing(client, mock_transit_data):
+    mock_transit_data.get_stop_id.side_effect = {52611: "id1", 52612: "id2"}.get
+    mock_transit_data.loaded_at = 1000.0
+    mock_transit_data.get_next_stop.return_value = mock_departure(datetime.datetime(2026, 3, 16, 8, 10, 0))
+    client.get('/transit-schedule/nextstop/52611')
+
+    mock_transit_data.get_next_stops.return_value = [mock_departure(datetime.datetime(2026, 3, 16, 8, 5, 0))]
+    response = client.get('/transit-schedule/nextstop?stops=52611,52612')
+    mock_transit_data.get_next_stops.assert_called_once_with([("id2", None, None)], datetime.datetime(2026, 3, 16, 8, 0, 0),
+                                                            live=True)
+    assert [stop['nextstop_nbrmins'] for stop in response.get_json()['stops']] == [10, 5]
+    assert response.headers['Cache-Control'] == 'max-age=300'
+
+
+@freeze_time("2026-03-16 08:00:00")
+def test_metrics(client, mock_transit_data):
+    mock_transit_data.get_stop_id.return_value = "stop_id_123"
+    mock_transit_data.get_next_stop.return_value = mock_departure(datetime.datetime(2026, 3, 16, 8, 15, 0))
+    client.get('/transit-schedule/nextstop/32752')
+    client.get('/transit-schedule/unknown')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    metrics = response.get_data(as_text=True)
+    assert ('transit_schedule_http_request_duration_seconds_count'
+            '{route="/transit-schedule/nextstop/<int:stop_code>",method="GET",status="200"}') in metrics
+    assert 'transit_schedule_http_request_duration_seconds_count{route="unmatched",method="GET",status="404"}' in metrics
+    assert '# TYPE transit_schedule_engine_stage_duration_seconds histogram' in metrics
+
+
+def test_ready(mocker):
+    transit_data = MagicMock(loaded_at=None)
+    transit_data.get_stop_id.return_value = "stop_id_123"
+    transit_data.get_next_stop.return_value = None
+    app = create_app(transit_data=transit_data, warmup_stops=[{"stop_code": "52611"}], background_warmup=False)
+    client = app.test_client()
+
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.json['feed_loaded'] is False
+
+    transit_data.loaded_at = datetime.datetime(2026, 3, 16, 8, 0, 0)
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json['status'] == 'ready'
+    assert response.json['warmup']['warmed'] == 1
+    transit_data.scraper.get_schedule.assert_called_once()
@@ -0,0 +1,118 @@
+import datetime
+from unittest.mock import MagicMock
+
+from transit_schedule.metrics import Counter, Gauge, Histogram, Registry, track_transit_data
+
+
+def test_histogram_render():
+    histogram = Histogram('request_seconds', 'Latency.', ('route',), buckets=(0.1, 1))
+    histogram.observe(0.05, '/a')
+    histogram.observe(0.1, '/a')
+    histogram.observe(5, '/a')
+
+    assert histogram.render() == [
+        '# HELP request_seconds Latency.',
+        '# TYPE request_seconds histogram',
+        'request_seconds_bucket{route="/a",le="0.1"} 2',
+        'request_seconds_bucket{route="/a",le="1"} 2',
+        'request_seconds_bucket{route="/a",le="+Inf"} 3',
+        'request_seconds_sum{route="/a"} 5.15',
+        'request_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_histogram_timer():
+    histogram = Histogram('stage_seconds', 'Stages.', ('stage',))
+
+    @histogram.time('decorated')
+    def work(value):
+        return value * 2
+
+    assert work(21) == 42
+    with histogram.time('block'):
+        pass
+    rendered = '\n'.join(histogram.render())
+    assert 'stage_seconds_count{stage="decorated"} 1' in rendered
+    assert 'stage_seconds_count{stage="block"} 1' in rendered
+
+
+def test_counter_gauge_and_functions():
+    registry = Registry()
+    counter = registry.register(Counter('lookups_total', 'Lookups.', ('result',)))
+    gauge = registry.register(Gauge('age_seconds', 'Age.'))
+    counter.inc('hit')
+    counter.inc('hit', amount=2)
+    counter.set_function(lambda: 4, 'miss')
+    gauge.set(1.5)
+
+    lines = registry.render().splitlines()
+    assert 'lookups_total{result="hit"} 3' in lines
+    assert 'lookups_total{result="miss"} 4' in lines
+    assert 'age_seconds 1.5' in lines
+    assert '# TYPE age_seconds gauge' in lines
+
+
+def test_shared_registries_sum_counters_and_histograms(tmp_path):
+    def worker_registry(process_id, hits):
+        registry = Registry()
+        counter = registry.register(Counter('lookups_total', 'Lookups.', ('result',)))
+        histogram = registry.register(Histogram('request_seconds', 'Latency.', buckets=(1,)))
+        gauge = registry.register(Gauge('age_seconds', 'Age.'))
+        counter.inc('hit', amount=hits)
+        histogram.observe(0.5)
+        gauge.set(process_id)
+        registry.share(tmp_path, process_id, interval=3600)
+        return registry, counter
+
+    first, first_counter = worker_registry(1, 2)
+    second, _ = worker_registry(2, 3)
+    first_counter.inc('miss')
+    first.write()
+
+    lines = second.render().splitlines()
+    assert 'lookups_total{result="hit"} 5' in lines
+    assert 'lookups_total{result="miss"} 1' in lines
+    assert 'request_seconds_count 2' in lines
+    assert 'request_seconds_bucket{le="1"} 2' in lines
+    # Gauges come from the process answering
+    assert 'age_seconds 2' in lines
+
+    # The counts of a replaced worker stay in the totals, so that they never go backwards
+    worker_registry(3, 1)
+    assert 'lookups_total{result="hit"} 6' in second.render().splitlines()
+
+
+def test_reset_keeps_gauges_and_functions():
+    registry = Registry()
+    counter = registry.register(Counter('lookups_total', 'Lookups.', ('result',)))
+    gauge = registry.register(Gauge('age_seconds', 'Age.'))
+    counter.inc('hit')
+    counter.set_function(lambda: 4, 'miss')
+    gauge.set(1.5)
+
+    registry.reset()
+
+    lines = registry.render().splitlines()
+    assert 'lookups_total{result="hit"} 1' not in lines
+    assert 'lookups_total{result="miss"} 4' in lines
+    assert 'age_seconds 1.5' in lines
+
+
+def test_label_values_are_escaped():
+    counter = Counter('errors_total', 'Errors.', ('message',))
+    counter.inc('say "hi"\n')
+    assert counter.render()[-1] == 'errors_total{message="say \\"hi\\"\\n"} 1'
+
+
+def test_track_transit_data(mocker):
+    feed_age = mocker.patch('transit_schedule.metrics.FEED_AGE', Gauge('feed_age', 'Age.'))
+    fetches = mocker.patch('transit_schedule.metrics.SCRAPER_FETCHES', Counter('fetches_total', 'Fetches.', ('outcome',)))
+    transit_data = MagicMock()
+    transit_data.snapshot_age = datetime.timedelta(minutes=2)
+    transit_data.scraper.fetches.calls = 3
+    transit_data.scraper.fetches.coalesced = 5
+
+    track_transit_data(transit_data)
+
+    assert feed_age.render()[-1] == 'feed_age 120'
+    assert fetches.render()[2:] == ['fetches_total{outcome="coalesced"} 5', 'fetches_total{outcome="run"} 3']
@@ -29,7 +29,6 @@ def test_publish_schedule_success(mock_cfg_inst):
     mock_cfg_inst.language = "fr"
     
     mock_client = MagicMock()
-    mock_transit_data = MagicMock()
     mock_next_stop = MagicMock()
     mock_next_stop.arrival_datetime = datetime.datetime.now() + datetime.timedelta(minutes=5)
     mock_next_stop.arrival_time = "12:00:00"
@@ -37,10 +36,8 @@ def test_publish_schedule_success(mock_cfg_inst):
     mock_next_stop.trip_headsign = "Panama"
     mock_next_stop.retrieve_method = "live scraper"
     
-    mock_transit_data.get_next_stop.return_value = mock_next_stop
-    
     stop_config = {'stop_code': '12345'}
-    publish_schedule(mock_client, mock_transit_data, "stop_id", stop_config)
+    publish_schedule(mock_client, stop_config, mock_next_stop, datetime.datetime.now().replace(microsecond=0))
     
     args, kwargs = mock_client.publish.call_args
     assert kwargs.get('retain') is True
@@ -53,13 +50,11 @@ def test_publish_schedule_method_fallback(mock_cfg_inst):
     mock_cfg_inst.get_mqtt_state_topic.return_value = "topic"
     mock_cfg_inst.language = "fr"
     mock_client = MagicMock()
-    mock_transit_data = MagicMock()
     mock_next_stop = MagicMock()
     mock_next_stop.arrival_datetime = datetime.datetime.now() + datetime.timedelta(minutes=5)
     mock_next_stop.retrieve_method = "unknown"
-    mock_transit_data.get_next_stop.return_value = mock_next_stop
     stop_config = {'stop_code': '12345'}
-    publish_schedule(mock_client, mock_transit_data, "stop_id", stop_config)
+    publish_schedule(mock_client, stop_config, mock_next_stop, datetime.datetime.now().replace(microsecond=0))
     args, _ = mock_client.publish.call_args
     payload = json.loads(args[1])
     assert payload['retrieve_method'] == "unknown"
@@ -95,6 +90,7 @@ def test_start_mqtt_client_loop_error(mock_parser, mock_mqtt_client, mock_cfg_in
     mock_cfg_inst.get_mqtt_state_topic.return_value = "topic"
     mock_cfg_inst.hass_discovery_prefix = "homeassistant"
     mock_cfg_inst.hass_discovery_enabled = True
+    mock_parser.return_value.get_next_stops.return_value = [None]
     
     mocker.patch('transit_schedule.mqtt_client.publish_schedule', side_effect=[Exception("Loop error"), KeyboardInterrupt])
     mocker.patch('transit_schedule.mqtt_client.time.sleep')
@@ -156,10 +152,8 @@ def test_publish_schedule_no_bus(mock_cfg_inst):
     mock_cfg_inst.stop_code = "12345"
     mock_cfg_inst.get_mqtt_state_topic.return_value = "topic"
     mock_client = MagicMock()
-    mock_transit_data = MagicMock()
-    mock_transit_data.get_next_stop.return_value = None
     stop_config = {'stop_code': '12345'}
-    publish_schedule(mock_client, mock_transit_data, "stop_id", stop_config)
+    publish_schedule(mock_client, stop_config, None, datetime.datetime.now())
     mock_client.publish.assert_not_called()
 
 @patch('transit_schedule.mqtt_client.config')
@@ -190,6 +184,7 @@ def test_start_mqtt_client_loop(mock_sleep, mock_event_wait, mock_rtl_parser, mo
     mock_cfg_inst.mqtt_refresh_topic = "refresh"
     mock_cfg_inst.mqtt_hass_status_topic = "status"
     mock_cfg_inst.get_mqtt_state_topic.return_value = "state"
+    mock_rtl_parser.return_value.get_next_stops.return_value = [None]
     
     try:
         start_mqtt_client()
@@ -36,7 +36,7 @@ def test_mqtt_loop_interval_bus_upcoming(mock_event_wait, mock_parser, mock_mqtt
     mock_next_stop.trip_headsign = "Test"
     mock_next_stop.retrieve_method = "GTFS"
     
-    parser_inst.get_next_stop.return_value = mock_next_stop
+    parser_inst.get_next_stops.return_value = [mock_next_stop]
     
     # We want to break the loop after one iteration
     mock_event_wait.side_effect = KeyboardInterrupt()
@@ -74,7 +74,7 @@ def test_mqtt_loop_interval_fallback(mock_event_wait, mock_parser, mock_mqtt_cli
     parser_inst.get_stop_id.return_value = "stop_id"
     
     # No bus found
-    parser_inst.get_next_stop.return_value = None
+    parser_inst.get_next_stops.return_value = [None]
     
     # We want to break the loop after one iteration
     mock_event_wait.side_effect = KeyboardInterrupt()
@@ -119,7 +119,7 @@ def test_mqtt_loop_interval_no_cap(mock_event_wait, mock_parser, mock_mqtt_clien
     mock_next_stop.trip_headsign = "Test"
     mock_next_stop.retrieve_method = "GTFS"
     
-    parser_inst.get_next_stop.return_value = mock_next_stop
+    parser_inst.get_next_stops.return_value = [mock_next_stop]
     
     # We want to break the loop after one iteration
     mock_event_wait.side_effect = KeyboardInterrupt()
@@ -173,8 +173,8 @@ def test_mqtt_loop_interval_multiple_stops(mock_event_wait, mock_parser, mock_mq
     mock_stop2.arrival_datetime = arrival2
     mock_stop2.retrieve_method = "GTFS"
     
-    # Side effect for get_next_stop: first call for stop1, second for stop2
-    parser_inst.get_next_stop.side_effect = [mock_stop1, mock_stop2]
+    # One batch lookup answers both stops, in order
+    parser_inst.get_next_stops.return_value = [mock_stop1, mock_stop2]
     
     mock_event_wait.side_effect = KeyboardInterrupt()
     
@@ -187,5 +187,8 @@ def test_mqtt_loop_interval_multiple_stops(mock_event_wait, mock_parser, mock_mq
     # refresh_event.wait is called with min(110, 60) = 60
     mock_event_wait.assert_called_with(timeout=60)
     
-    # Verify that get_next_stop was called for both stops
-    assert parser_inst.get_next_stop.call_count == 2
+    # Verify that both stops were looked up in a single batch
+    parser_inst.get_next_stops.assert_called_once()
+    stop_requests, _ = parser_inst.get_next_stops.call_args.args
+    assert stop_requests == [("id1", "14", None), ("id2", "44", None)]
+    parser_inst.get_next_stop.assert_not_called()
@@ -51,6 +51,7 @@ def test_on_message_hass_status(mock_sleep, mock_event_wait, mock_publish_discov
 
     mock_parser_inst = mock_rtl_parser.return_value
     mock_parser_inst.get_stop_id.return_value = "stop_id_123"
+    mock_parser_inst.get_next_stops.return_value = [None]
 
     # Capture the on_message callback
     client_inst = mock_mqtt_client.return_value
@@ -0,0 +1,74 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transit_schedule.service_calendar import ServiceCalendar, ServiceMatcher, base_service_ids
+
+
+@pytest.fixture
+def service_calendar():
+    calendar = pd.DataFrame({
+        'service_id': ['SEM', 'SAM', 'OLD'],
+        'monday': [1, 0, 1], 'tuesday': [1, 0, 1], 'wednesday': [1, 0, 1], 'thursday': [1, 0, 1],
+        'friday': [1, 0, 1], 'saturday': [0, 1, 0], 'sunday': [0, 0, 0],
+        'start_date': [20250901, 20250901, 20250101],
+        'end_date': [20251231, 20251231, 20250831],
+    })
+    calendar_dates = pd.DataFrame({
+        'service_id': ['SEM', 'FETE', 'SAM'],
+        'date': [20251013, 20251013, 20260103],
+        'exception_type': [2, 1, 1],
+    })
+    return ServiceCalendar.build(calendar, calendar_dates)
+
+
+def services_on(service_calendar, date):
+    return service_calendar.service_ids[service_calendar.active_mask(date)].tolist()
+
+
+def test_weekly_service(service_calendar):
+    assert services_on(service_calendar, datetime.date(2025, 9, 29)) == ['SEM']  # Monday
+    assert services_on(service_calendar, datetime.date(2025, 10, 4)) == ['SAM']  # Saturday
+    assert services_on(service_calendar, datetime.date(2025, 10, 5)) == []  # Sunday
+
+
+def test_service_date_bounds(service_calendar):
+    assert services_on(service_calendar, datetime.date(2025, 8, 29)) == ['OLD']
+    assert services_on(service_calendar, datetime.date(2025, 9, 1)) == ['SEM']
+
+
+def test_calendar_dates_exceptions(service_calendar):
+    # Thanksgiving Monday: regular service removed, holiday service added
+    assert services_on(service_calendar, datetime.date(2025, 10, 13)) == ['FETE']
+    # Addition outside of calendar.txt range extends the bitmap
+    assert services_on(service_calendar, datetime.date(2026, 1, 3)) == ['SAM']
+
+
+def test_dates_outside_feed(service_calendar):
+    assert services_on(service_calendar, datetime.date(2024, 12, 31)) == []
+    assert services_on(service_calendar, datetime.date(2030, 1, 1)) == []
+    assert not service_calendar.active_mask(datetime.date(2030, 1, 1)).any()
+
+
+def test_empty_calendar():
+    service_calendar = ServiceCalendar.build(
+        pd.DataFrame(columns=['service_id', 'start_date', 'end_date']),
+        pd.DataFrame(columns=['service_id', 'date', 'exception_type']),
+    )
+    assert services_on(service_calendar, datetime.date(2025, 9, 29)) == []
+
+
+def test_base_service_ids():
+    assert base_service_ids(['SEM-B3', 'SAM', 'DIM-B1-X']).tolist() == ['SEM', 'SAM', 'DIM']
+    assert base_service_ids(np.array([], dtype=str)).tolist() == []
+
+
+def test_service_matcher():
+    matcher = ServiceMatcher.build(np.array(['SEM', 'SAM', 'DIM']), np.array(['SEM-B1', 'SAM', 'SEM-B2', 'X']))
+    active = np.array([True, True, False])
+    # One entry per index service code, plus the False entry for missing codes
+    assert matcher.exact_mask(active).tolist() == [False, True, False, False, False]
+    assert matcher.base_mask(active).tolist() == [True, True, True, False, False]
+    assert not matcher.base_mask(np.zeros(3, dtype=bool)).any()
@@ -0,0 +1,95 @@
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from transit_schedule.single_flight import SingleFlight
+
+
+def wait_for_waiters(flight, count):
+    while flight.coalesced < count:
+        time.sleep(0.01)
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'schedule'
+
+    with concurrent.futures.ThreadPoolExecutor(5) as pool:
+        results = [pool.submit(flight.do, 'key', fetch) for _ in range(5)]
+        wait_for_waiters(flight, 4)
+        assert flight.in_flight() == 1
+        release.set()
+        assert [result.result() for result in results] == ['schedule'] * 5
+
+    assert len(calls) == 1
+    assert (flight.calls, flight.coalesced, flight.in_flight()) == (1, 4, 0)
+
+
+def test_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    # A finished call is not remembered
+    assert flight.do('a', lambda: 3) == 3
+    assert (flight.calls, flight.coalesced) == (3, 0)
+
+
+def test_error_is_raised_to_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise ValueError("Scraping failed")
+
+    with concurrent.futures.ThreadPoolExecutor(3) as pool:
+        results = [pool.submit(flight.do, 'key', fetch) for _ in range(3)]
+        wait_for_waiters(flight, 2)
+        release.set()
+        for result in results:
+            with pytest.raises(ValueError):
+                result.result()
+    assert flight.in_flight() == 0
+
+
+def test_submit_shares_the_call_and_cancels_it_once_released():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        release.wait(5)
+        return key
+
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        running = flight.submit(pool, 'a', lambda: fetch('a'))
+        queued = flight.submit(pool, 'b', lambda: fetch('b'))
+        assert flight.submit(pool, 'b', lambda: fetch('b')) is queued
+        # Past the limit, only keys already in flight are accepted
+        assert flight.submit(pool, 'c', lambda: fetch('c'), limit=2) is None
+        assert flight.submit(pool, 'a', lambda: fetch('a'), limit=2) is running
+
+        # The queued call is cancelled once its last caller stops waiting
+        assert not flight.release('b', queued)
+        assert flight.release('b', queued)
+        assert queued.cancelled()
+        # A running call is not
+        while not calls:
+            time.sleep(0.01)
+        assert not flight.release('a', running)
+        assert not flight.release('a', running)
+        assert not running.cancelled()
+        release.set()
+        assert running.result() == 'a'
+
+    assert calls == ['a']
+    assert (flight.calls, flight.coalesced, flight.in_flight()) == (2, 2, 0)
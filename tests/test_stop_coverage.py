@@ -0,0 +1,63 @@
+import datetime
+
+import pandas as pd
+
+from transit_schedule.gtfs_feed import GtfsFeed
+
+
+def build_feed(calendar, stop_times, trips, calendar_dates=None):
+    stop_times = stop_times.set_index('stop_id')
+    trip_rows = pd.Index(trips['trip_id']).get_indexer(stop_times['trip_id'])
+    for column in ('route_id', 'service_id'):
+        stop_times[column] = pd.Categorical(trips[column].to_numpy()[trip_rows])
+    return GtfsFeed.build({
+        'stops': pd.DataFrame({'stop_id': ['A', 'B', 'C']}, index=pd.Index(['1', '2', '3'], name='stop_code')),
+        'calendar': calendar,
+        'stop_times': stop_times,
+        'trips': trips,
+        'calendar_dates': calendar_dates if calendar_dates is not None
+        else pd.DataFrame(columns=['service_id', 'date', 'exception_type']),
+    })
+
+
+def calendar_row(service_id, weekdays, start_date, end_date):
+    days = dict(zip(('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'), weekdays, strict=True))
+    return {'service_id': service_id, **days, 'start_date': start_date, 'end_date': end_date}
+
+
+def test_stop_coverage():
+    calendar = pd.DataFrame([
+        calendar_row('SEM', (1, 1, 1, 1, 1, 0, 0), 20250901, 20251231),
+        calendar_row('SAM', (0, 0, 0, 0, 0, 1, 0), 20250901, 20251031),
+    ])
+    calendar_dates = pd.DataFrame({'service_id': ['SAM'], 'date': [20260110], 'exception_type': [1]})
+    # RTL-style trips: service_ids suffixed, only matched on their base
+    trips = pd.DataFrame({'route_id': ['44', '44'], 'service_id': ['SEM-B1', 'SAM-B2'], 'trip_id': ['t1', 't2']})
+    stop_times = pd.DataFrame({
+        'trip_id': ['t1', 't2', 't2'],
+        'arrival_secs': [3600, 7200, 3600],
+        'stop_id': ['A', 'A', 'B'],
+    })
+    feed = build_feed(calendar, stop_times, trips, calendar_dates)
+
+    # calendar.txt ranges are narrowed to the days actually served: 20250901 is a Monday, 20251231 a Wednesday
+    assert feed.stop_coverage.date_range(feed.departure_index.stop_position('A')) == (20250901, 20260110)
+    # First Saturday of the SAM service
+    assert feed.stop_coverage.date_range(feed.departure_index.stop_position('B')) == (20250906, 20260110)
+    # Stop C has no departures at all
+    assert feed.departure_index.stop_position('C') is None
+    assert feed.stop_coverage.date_range(None) == (None, None)
+
+
+def test_stop_coverage_without_running_service():
+    calendar = pd.DataFrame([calendar_row('OLD', (0, 0, 0, 0, 0, 0, 0), 20250101, 20250131)])
+    trips = pd.DataFrame({'route_id': ['44'], 'service_id': ['OLD'], 'trip_id': ['t1']})
+    stop_times = pd.DataFrame({'trip_id': ['t1'], 'arrival_secs': [3600], 'stop_id': ['A']})
+    feed = build_feed(calendar, stop_times, trips)
+
+    assert feed.stop_coverage.date_range(feed.departure_index.stop_position('A')) == (None, None)
+    assert feed.service_calendar.first_date == datetime.date(2025, 1, 1)
+
+
+def test_empty_feed_has_no_coverage():
+    assert GtfsFeed.empty().stop_coverage is None
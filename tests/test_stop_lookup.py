@@ -0,0 +1,32 @@
+import pandas as pd
+
+from transit_schedule.stop_lookup import StopLookup
+
+
+def test_stop_lookup_both_directions():
+    stops = pd.DataFrame({'stop_code': ['123', None, '456'], 'stop_id': [1, 2, 3]}).set_index('stop_code')
+    lookup = StopLookup.build(stops)
+
+    assert len(lookup) == 2
+    assert lookup.stop_id(123) == '1'
+    assert lookup.stop_id('456') == '3'
+    assert lookup.stop_code('3') == '456'
+    # Stations without a stop_code are only known by stop_id
+    assert lookup.stop_code(2) is None
+    assert lookup.stop_id('999') is None
+
+
+def test_stop_lookup_duplicates_first_row_wins():
+    stops = pd.DataFrame({'stop_code': ['123', '123', '789', '790'], 'stop_id': ['A', 'B', 'C', 'C']}).set_index('stop_code')
+    lookup = StopLookup.build(stops)
+
+    assert lookup.stop_id('123') == 'A'
+    assert lookup.stop_code('B') is None
+    assert lookup.stop_id('790') == 'C'
+    assert lookup.stop_code('C') == '789'
+
+
+def test_stop_lookup_empty():
+    lookup = StopLookup.build(pd.DataFrame())
+    assert len(lookup) == 0
+    assert lookup.stop_id('123') is None
@@ -0,0 +1,54 @@
+import datetime
+import threading
+from unittest.mock import MagicMock
+
+from transit_schedule.warmup import StartupWarmup
+
+
+def stops(*stop_codes):
+    return [{"stop_code": stop_code, "route_id": None, "direction": None} for stop_code in stop_codes]
+
+
+def test_warmup_resolves_stops_in_parallel():
+    barrier = threading.Barrier(3, timeout=5)
+    transit_data = MagicMock(loaded_at=datetime.datetime.now())
+    transit_data.get_stop_id.side_effect = lambda stop_code: f"id-{stop_code}"
+    # Each lookup waits for the two others: this only completes if the three run at once
+    transit_data.get_next_stop.side_effect = lambda *args, **kwargs: barrier.wait()
+    warmup = StartupWarmup(transit_data, stops("1", "2", "3"))
+
+    warmup.run()
+
+    result, ready = warmup.status()
+    assert ready
+    assert result['warmup'] == {'done': True, 'stops': 3, 'warmed': 3, 'failed': []}
+    assert all(call.kwargs['live'] is False for call in transit_data.get_next_stop.call_args_list)
+    assert transit_data.scraper.get_schedule.call_count == 3
+
+
+def test_warmup_failures_do_not_hold_readiness():
+    transit_data = MagicMock(loaded_at=datetime.datetime.now())
+    transit_data.get_stop_id.side_effect = lambda stop_code: None if stop_code == 2 else f"id-{stop_code}"
+    transit_data.scraper.get_schedule.side_effect = [Exception("Scraper down")]
+    warmup = StartupWarmup(transit_data, stops("1", "2"))
+
+    warmup.run()
+
+    result, ready = warmup.status()
+    assert ready
+    assert result['warmup']['warmed'] == 0
+    assert sorted(failed['error'] for failed in result['warmup']['failed']) == ["Scraper down", "Stop code not found"]
+
+
+def test_not_ready_until_feed_loaded_and_warmed_up():
+    transit_data = MagicMock(loaded_at=None)
+    warmup = StartupWarmup(transit_data, stops("1"))
+    assert warmup.status()[1] is False
+
+    transit_data.loaded_at = datetime.datetime.now()
+    assert warmup.status()[0]['warmup']['done'] is False
+    assert warmup.status()[1] is False
+
+    warmup.run()
+    assert warmup.status()[1] is True
+    assert StartupWarmup(None, []).status()[0]['status'] == 'not_ready'